@@ -72,19 +72,25 @@ class AvisoScheduler(QObject):
 
             if scheduled_time == current_time_str and current_day_of_week_pt in scheduled_days:
                 logging.info(f"Aviso agendado '{notification_id}' acionado para envio.")
-                for number in numbers:
-                    try:
-                        # Usar o método send_message do WhatsApp manager
-                        result = self.whatsapp_manager.send_message(number, message, message_type='system_automatic')
-                        if not result.get('success', False):
-                            error_msg = result.get('error', 'Erro desconhecido')
-                            logging.error(f"Falha ao enviar aviso agendado para {number}: {error_msg}")
-                            self.notification_failed.emit(f"Aviso agendado falhou para {number}: {error_msg}")
-                            continue
-                        log_msg = f"Aviso '{notification_id}' enviado para {number} (Remetente: {sender})."
-                        logging.info(log_msg)
-                        self.notification_sent.emit(log_msg)
-                    except Exception as e:
-                        error_msg = f"Falha ao enviar aviso '{notification_id}' para {number}: {e}"
-                        logging.error(error_msg, exc_info=True)
-                        self.notification_failed.emit(error_msg)
+                if not numbers:
+                    continue
+                try:
+                    # Um único broadcast para todos os números, compassado pelo bridge
+                    result = self.whatsapp_manager.send_broadcast(numbers, message, message_type='system_automatic',
+                                                                  priority=WhatsAppManager.PRIORITY_BULK)
+                    for number, reason in result.get('skipped', []):
+                        logging.error(f"Falha ao enviar aviso agendado para {number}: {reason}")
+                        self.notification_failed.emit(f"Aviso agendado falhou para {number}: {reason}")
+                    if not result.get('success', False):
+                        error_msg = result.get('error', 'Erro desconhecido')
+                        logging.error(f"Falha ao enviar aviso agendado '{notification_id}': {error_msg}")
+                        self.notification_failed.emit(f"Aviso agendado '{notification_id}' falhou: {error_msg}")
+                        continue
+                    log_msg = (f"Aviso '{notification_id}' enviado para {result['queued']} números "
+                               f"(Remetente: {sender}).")
+                    logging.info(log_msg)
+                    self.notification_sent.emit(log_msg)
+                except Exception as e:
+                    error_msg = f"Falha ao enviar aviso '{notification_id}': {e}"
+                    logging.error(error_msg, exc_info=True)
+                    self.notification_failed.emit(error_msg)
@@ -0,0 +1,268 @@
+import json
+import calendar
+import sqlite3
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from .connection import get_db_connection
+from utils import to_reais
+
+# Bases de comparação disponíveis para o relatório comparativo
+COMPARISON_BASELINES = {
+    'dia_semana': 'Média do mesmo dia da semana (últimas 4 semanas)',
+    'semana': 'Mesmo período da semana anterior',
+    'mes': 'Mesmo período do mês anterior',
+    'ano': 'Mesmo período do ano anterior',
+}
+
+# Quantidade de semanas usadas na média da base 'dia_semana'
+WEEKDAY_BASELINE_WEEKS = 4
+
+
+def _parse_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _shift_months(day, months):
+    """Desloca uma data em N meses, ajustando para o último dia do mês quando necessário."""
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _empty_day():
+    return {'sales_count': 0, 'revenue_cents': 0, 'items_count': 0, 'weight_kg': 0.0, 'hourly_cents': [0] * 24}
+
+
+def _accumulate(totals, day_stats):
+    totals['sales_count'] += day_stats['sales_count']
+    totals['revenue_cents'] += day_stats['revenue_cents']
+    totals['items_count'] += day_stats['items_count']
+    totals['weight_kg'] += day_stats['weight_kg']
+    for hour, cents in enumerate(day_stats['hourly_cents']):
+        totals['hourly_cents'][hour] += cents
+
+
+def _aggregate_days_live(conn, start_day, end_day):
+    """Agrega as vendas do período diretamente das tabelas de vendas, por dia."""
+    params = (f'{start_day.isoformat()} 00:00:00', f'{end_day.isoformat()} 23:59:59')
+    days = {}
+
+    rows = conn.execute('''
+        SELECT DATE(sale_date) AS day,
+               CAST(strftime('%H', sale_date) AS INTEGER) AS hour,
+               COUNT(*) AS sales_count,
+               COALESCE(SUM(total_amount), 0) AS revenue_cents
+        FROM sales
+        WHERE sale_date BETWEEN ? AND ? AND training_mode = 0
+        GROUP BY day, hour
+    ''', params).fetchall()
+    for row in rows:
+        stats = days.setdefault(row['day'], _empty_day())
+        stats['sales_count'] += row['sales_count']
+        stats['revenue_cents'] += row['revenue_cents']
+        stats['hourly_cents'][row['hour']] += row['revenue_cents']
+
+    rows = conn.execute('''
+        SELECT DATE(s.sale_date) AS day,
+               COUNT(si.id) AS items_count,
+               COALESCE(SUM(si.peso_kg), 0) AS weight_kg
+        FROM sale_items si
+        JOIN sales s ON si.sale_id = s.id
+        WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+        GROUP BY day
+    ''', params).fetchall()
+    for row in rows:
+        stats = days.setdefault(row['day'], _empty_day())
+        stats['items_count'] += row['items_count']
+        stats['weight_kg'] += row['weight_kg']
+
+    return days
+
+
+def _last_stat_day(conn):
+    row = conn.execute("SELECT MAX(stat_day) FROM sales_daily_stats").fetchone()
+    return _parse_day(row[0]) if row and row[0] else None
+
+
+def _sum_period(conn, start_day, end_day, last_stat_day):
+    """
+    Soma as métricas de um período. Dias já pré-calculados são lidos de
+    sales_daily_stats; os demais (hoje ou ainda não calculados) vêm das vendas.
+    """
+    totals = _empty_day()
+    live_start = start_day
+
+    if last_stat_day and start_day <= last_stat_day:
+        stored_end = min(end_day, last_stat_day)
+        rows = conn.execute('''
+            SELECT sales_count, revenue_cents, items_count, weight_kg, hourly_cents
+            FROM sales_daily_stats
+            WHERE stat_day BETWEEN ? AND ?
+        ''', (start_day.isoformat(), stored_end.isoformat())).fetchall()
+        for row in rows:
+            _accumulate(totals, {
+                'sales_count': row['sales_count'],
+                'revenue_cents': row['revenue_cents'],
+                'items_count': row['items_count'],
+                'weight_kg': row['weight_kg'],
+                'hourly_cents': json.loads(row['hourly_cents'] or '[]')
+            })
+        live_start = last_stat_day + timedelta(days=1)
+
+    if live_start <= end_day:
+        for day_stats in _aggregate_days_live(conn, live_start, end_day).values():
+            _accumulate(totals, day_stats)
+
+    return totals
+
+
+def _build_metrics(totals, divisor=1):
+    """Converte os totais em métricas do relatório (média por período quando divisor > 1)."""
+    sales_count = totals['sales_count']
+    revenue = (to_reais(totals['revenue_cents']) / divisor).quantize(Decimal('0.01'))
+    average_ticket = to_reais(totals['revenue_cents']) / sales_count if sales_count else Decimal('0.00')
+    return {
+        'revenue': revenue,
+        'sales_count': round(sales_count / divisor, 1) if divisor > 1 else sales_count,
+        'average_ticket': average_ticket.quantize(Decimal('0.01')),
+        'items_per_sale': round(totals['items_count'] / sales_count, 2) if sales_count else 0.0,
+        'weight_kg': round(totals['weight_kg'] / divisor, 3),
+        'hourly': [(to_reais(cents) / divisor).quantize(Decimal('0.01')) for cents in totals['hourly_cents']],
+    }
+
+
+def _variation(current, baseline):
+    """Variação percentual entre o período atual e a base (None se a base for zero)."""
+    if not baseline:
+        return None
+    return round(float((Decimal(str(current)) - Decimal(str(baseline))) / Decimal(str(baseline)) * 100), 1)
+
+
+def get_baseline_periods(start_date, end_date, baseline):
+    """Retorna a lista de períodos (início, fim) que compõem a base de comparação."""
+    start_day, end_day = _parse_day(start_date), _parse_day(end_date)
+    if baseline == 'dia_semana':
+        return [(start_day - timedelta(weeks=k), end_day - timedelta(weeks=k))
+                for k in range(1, WEEKDAY_BASELINE_WEEKS + 1)]
+    if baseline == 'semana':
+        return [(start_day - timedelta(weeks=1), end_day - timedelta(weeks=1))]
+    if baseline == 'mes':
+        return [(_shift_months(start_day, -1), _shift_months(end_day, -1))]
+    if baseline == 'ano':
+        return [(_shift_months(start_day, -12), _shift_months(end_day, -12))]
+    raise ValueError(f"Base de comparação inválida: {baseline}")
+
+
+def get_comparative_report(start_date, end_date, baseline='semana'):
+    """
+    Compara um período com uma base (mesmo dia da semana, semana, mês ou ano anterior).
+
+    Returns:
+        dict: {'start_date', 'end_date', 'baseline', 'baseline_label', 'baseline_periods',
+               'current', 'baseline_metrics', 'variation'}
+        Métricas: revenue, sales_count, average_ticket, items_per_sale, weight_kg e
+        hourly (faturamento por hora, 24 posições).
+    """
+    start_day, end_day = _parse_day(start_date), _parse_day(end_date)
+    periods = get_baseline_periods(start_day, end_day, baseline)
+
+    conn = get_db_connection()
+    try:
+        last_stat_day = _last_stat_day(conn)
+        current_totals = _sum_period(conn, start_day, end_day, last_stat_day)
+
+        baseline_totals = _empty_day()
+        for period_start, period_end in periods:
+            _accumulate(baseline_totals, _sum_period(conn, period_start, period_end, last_stat_day))
+    finally:
+        conn.close()
+
+    current = _build_metrics(current_totals)
+    baseline_metrics = _build_metrics(baseline_totals, divisor=len(periods))
+    variation = {
+        key: _variation(current[key], baseline_metrics[key])
+        for key in ('revenue', 'sales_count', 'average_ticket', 'items_per_sale', 'weight_kg')
+    }
+
+    return {
+        'start_date': start_day.isoformat(),
+        'end_date': end_day.isoformat(),
+        'baseline': baseline,
+        'baseline_label': COMPARISON_BASELINES[baseline],
+        'baseline_periods': [(s.isoformat(), e.isoformat()) for s, e in periods],
+        'current': current,
+        'baseline_metrics': baseline_metrics,
+        'variation': variation,
+    }
+
+
+def refresh_daily_stats():
+    """
+    Pré-calcula as estatísticas diárias (tarefa noturna).
+
+    Grava os dias já encerrados que ainda não estão em sales_daily_stats e
+    recalcula os dias cujo total divergiu de sales_daily_rollup (ex: venda
+    excluída ou editada depois do cálculo). O dia atual nunca é gravado.
+
+    Returns:
+        int: Quantidade de dias gravados (None em caso de erro)
+    """
+    conn = get_db_connection()
+    try:
+        yesterday = date.today() - timedelta(days=1)
+        last_stat_day = _last_stat_day(conn)
+
+        if last_stat_day:
+            start_day = last_stat_day + timedelta(days=1)
+        else:
+            first_sale = conn.execute("SELECT MIN(sale_date) FROM sales WHERE training_mode = 0").fetchone()[0]
+            start_day = _parse_day(first_sale) if first_sale else yesterday + timedelta(days=1)
+
+        days = {}
+        if start_day <= yesterday:
+            live = _aggregate_days_live(conn, start_day, yesterday)
+            day = start_day
+            while day <= yesterday:
+                days[day] = live.get(day.isoformat(), _empty_day())
+                day += timedelta(days=1)
+
+        stale_rows = conn.execute('''
+            SELECT st.stat_day
+            FROM sales_daily_stats st
+            LEFT JOIN sales_daily_rollup r ON r.sale_day = st.stat_day
+            WHERE st.sales_count != COALESCE(r.sales_count, 0)
+               OR st.revenue_cents != COALESCE(r.total_cents, 0)
+        ''').fetchall()
+        for row in stale_rows:
+            day = _parse_day(row['stat_day'])
+            days[day] = _aggregate_days_live(conn, day, day).get(day.isoformat(), _empty_day())
+
+        if not days:
+            return 0
+
+        computed_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.executemany('''
+            INSERT OR REPLACE INTO sales_daily_stats
+                (stat_day, weekday, sales_count, revenue_cents, items_count, weight_kg, hourly_cents, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (day.isoformat(), int(day.strftime('%w')), stats['sales_count'], stats['revenue_cents'],
+             stats['items_count'], stats['weight_kg'], json.dumps(stats['hourly_cents']), computed_at)
+            for day, stats in sorted(days.items())
+        ])
+        conn.commit()
+        logging.info(f"Estatísticas diárias pré-calculadas: {len(days)} dia(s) ({len(stale_rows)} recalculado(s)).")
+        return len(days)
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        logging.error(f"Erro ao pré-calcular estatísticas diárias: {e}", exc_info=True)
+        return None
+    finally:
+        conn.close()
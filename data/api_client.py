@@ -1,6 +1,56 @@
+import gzip
 import logging
 from config_manager import ConfigManager
 
+# Corpo mínimo (bytes) para compactar uma requisição quando supabase.gzip_uploads estiver ativo
+GZIP_MIN_BYTES = 64 * 1024
+
+# URL do Supabase local (data/fake_supabase.py): "local://<arquivo .db>" ou "local://" (em memória)
+LOCAL_URL_PREFIX = "local://"
+
+def _gzip_upload_options():
+    """
+    Opções do cliente Supabase que compactam (Content-Encoding: gzip) os lotes grandes
+    enviados ao PostgREST. Só deve ser ativado (config supabase.gzip_uploads) quando o
+    servidor ou o proxy à frente dele aceitar corpos compactados. As respostas já chegam
+    compactadas, pois o httpx negocia Accept-Encoding por padrão.
+
+    A compactação fica num transporte do httpx.Client passado via ClientOptions, que o
+    supabase-py reaproveita quando recria o cliente PostgREST (login e renovação de token).
+    """
+    try:
+        import httpx
+        from supabase.lib.client_options import SyncClientOptions
+
+        class GzipUploadTransport(httpx.BaseTransport):
+            """Transporte que reenvia POST/PATCH grandes com o corpo compactado."""
+
+            def __init__(self):
+                self._transport = httpx.HTTPTransport(http2=True)
+
+            def handle_request(self, request):
+                if request.method in ('POST', 'PATCH') and 'content-encoding' not in request.headers:
+                    body = request.read()
+                    if len(body) >= GZIP_MIN_BYTES:
+                        compressed = gzip.compress(body)
+                        headers = request.headers.copy()
+                        headers['Content-Encoding'] = 'gzip'
+                        headers['Content-Length'] = str(len(compressed))
+                        request = httpx.Request(request.method, request.url, headers=headers,
+                                                content=compressed, extensions=request.extensions)
+                return self._transport.handle_request(request)
+
+            def close(self):
+                self._transport.close()
+
+        http_client = httpx.Client(transport=GzipUploadTransport(), timeout=120, follow_redirects=True)
+        logging.info("SupabaseAPIClient: Compactação gzip dos envios ativada.")
+        return SyncClientOptions(httpx_client=http_client)
+    except Exception as e:
+        logging.warning(f"SupabaseAPIClient: Não foi possível ativar a compactação gzip dos envios: {e}")
+        return None
+
+
 class SupabaseAPIClient:
     """
     Cliente para comunicação com a API do Supabase.
@@ -20,21 +70,32 @@ class SupabaseAPIClient:
             return
         
         try:
-            from supabase import create_client, Client
-            
             config = self.config_manager.get_config()
             supabase_config = config.get("supabase", {})
 
             supabase_url = supabase_config.get("url")
             supabase_key = supabase_config.get("key")
 
+            if supabase_url and supabase_url.startswith(LOCAL_URL_PREFIX):
+                # Supabase local em processo (desenvolvimento e testes de carga, sem internet)
+                from .fake_supabase import FakeSupabaseClient
+                self.client = FakeSupabaseClient(supabase_url[len(LOCAL_URL_PREFIX):] or ':memory:')
+                logging.info(f"SupabaseAPIClient: Usando Supabase local ({self.client.path}).")
+                return
+
+            from supabase import create_client, Client
+
             if not supabase_url or not supabase_key:
                 logging.debug("SupabaseAPIClient: URL ou chave do Supabase não configuradas (isso é normal se não usar sync).")
                 self.client = None
                 self._initialized = True
                 return
 
-            self.client = create_client(supabase_url, supabase_key)
+            options = None
+            if supabase_config.get("gzip_uploads"):
+                options = _gzip_upload_options()
+
+            self.client = create_client(supabase_url, supabase_key, options=options)
             logging.info("SupabaseAPIClient: Cliente Supabase inicializado com sucesso.")
 
         except Exception as e:
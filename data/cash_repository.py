@@ -5,6 +5,7 @@ from datetime import datetime
 import pytz
 from .connection import get_db_connection
 from .audit_repository import log_audit
+from .terminal import get_terminal_id
 from utils import to_cents, to_reais
 
 def open_cash_session(user_id, initial_amount):
@@ -12,11 +13,13 @@ def open_cash_session(user_id, initial_amount):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Verifica se já existe caixa aberto
+    # Verifica se já existe caixa aberto neste terminal
+    # (sessões sem terminal_id são anteriores à identificação dos terminais)
+    terminal_id = get_terminal_id()
     existing = cursor.execute('''
         SELECT id FROM cash_sessions 
-        WHERE status = 'open'
-    ''').fetchone()
+        WHERE status = 'open' AND (terminal_id = ? OR terminal_id IS NULL)
+    ''', (terminal_id,)).fetchone()
     
     if existing:
         conn.close()
@@ -25,9 +28,9 @@ def open_cash_session(user_id, initial_amount):
     initial_amount_decimal = Decimal(str(initial_amount)).quantize(Decimal('0.01'))
     initial_amount_cents = to_cents(initial_amount_decimal)
     cursor.execute('''
-        INSERT INTO cash_sessions (user_id, initial_amount) 
-        VALUES (?, ?)
-    ''', (user_id, initial_amount_cents))
+        INSERT INTO cash_sessions (user_id, initial_amount, terminal_id) 
+        VALUES (?, ?, ?)
+    ''', (user_id, initial_amount_cents, terminal_id))
     
     session_id = cursor.lastrowid
     conn.commit()
@@ -64,8 +67,8 @@ def get_current_cash_session():
         SELECT cs.*, u.username 
         FROM cash_sessions cs
         JOIN users u ON cs.user_id = u.id
-        WHERE cs.status = 'open'
-    ''').fetchone()
+        WHERE cs.status = 'open' AND (cs.terminal_id = ? OR cs.terminal_id IS NULL)
+    ''', (get_terminal_id(),)).fetchone()
     conn.close()
     if row:
         session = dict(row)
@@ -0,0 +1,203 @@
+import csv
+import logging
+import os
+from .connection import get_db_connection
+from utils import to_reais
+
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# Quantidade de linhas lidas do cursor por vez (controla o uso de memória)
+EXPORT_BATCH_SIZE = 1000
+
+# Definição dos conjuntos de dados exportáveis.
+# Cada entrada tem o rótulo exibido na UI, o cabeçalho do arquivo, a consulta
+# (filtrada por período) e as colunas que estão em centavos.
+EXPORT_DATASETS = {
+    'sales': {
+        'label': 'Vendas',
+        'headers': ['ID', 'ID Sessão', 'Data', 'Cliente', 'Operador', 'Sessão de Caixa',
+                    'Total (R$)', 'Troco (R$)', 'Desconto (R$)'],
+        'query': '''
+            SELECT s.id, s.session_sale_id, s.sale_date, s.customer_name, u.username,
+                   s.cash_session_id, s.total_amount, s.change_amount, s.discount_value
+            FROM sales s
+            LEFT JOIN users u ON s.user_id = u.id
+            WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+            ORDER BY s.sale_date, s.id
+        ''',
+        'count_query': '''
+            SELECT COUNT(*) FROM sales s
+            WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+        ''',
+        'cents_columns': {'total_amount', 'change_amount'},
+    },
+    'sale_items': {
+        'label': 'Itens Vendidos',
+        'headers': ['ID Item', 'ID Venda', 'Data', 'Produto', 'Código de Barras', 'Tipo',
+                    'Quantidade', 'Peso (kg)', 'Vl. Unit. (R$)', 'Vl. Total (R$)'],
+        'query': '''
+            SELECT si.id, si.sale_id, s.sale_date, p.description, p.barcode, p.sale_type,
+                   si.quantity, si.peso_kg, si.unit_price, si.total_price
+            FROM sale_items si
+            JOIN sales s ON si.sale_id = s.id
+            LEFT JOIN products p ON si.product_id = p.id
+            WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+            ORDER BY s.sale_date, si.sale_id, si.id
+        ''',
+        'count_query': '''
+            SELECT COUNT(*) FROM sale_items si
+            JOIN sales s ON si.sale_id = s.id
+            WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+        ''',
+        'cents_columns': {'unit_price', 'total_price'},
+    },
+    'sale_payments': {
+        'label': 'Pagamentos',
+        'headers': ['ID Pagamento', 'ID Venda', 'Data', 'Forma de Pagamento', 'Valor (R$)'],
+        'query': '''
+            SELECT sp.id, sp.sale_id, s.sale_date,
+                   COALESCE(pm.name, sp.payment_method) AS payment_method, sp.amount
+            FROM sale_payments sp
+            JOIN sales s ON sp.sale_id = s.id
+            LEFT JOIN payment_methods pm ON sp.payment_method = pm.id
+            WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+            ORDER BY s.sale_date, sp.sale_id, sp.id
+        ''',
+        'count_query': '''
+            SELECT COUNT(*) FROM sale_payments sp
+            JOIN sales s ON sp.sale_id = s.id
+            WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
+        ''',
+        'cents_columns': {'amount'},
+    },
+}
+
+
+class ExportCancelled(Exception):
+    """Levantada quando a exportação é cancelada pelo usuário."""
+    pass
+
+
+def _period_params(start_date, end_date):
+    return (f'{start_date} 00:00:00', f'{end_date} 23:59:59')
+
+
+def count_export_rows(dataset, start_date, end_date):
+    """Conta as linhas de um conjunto de dados no período (usado para o progresso)."""
+    definition = EXPORT_DATASETS[dataset]
+    conn = get_db_connection()
+    try:
+        return conn.execute(definition['count_query'], _period_params(start_date, end_date)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def iter_export_rows(dataset, start_date, end_date, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Gerador que percorre as linhas do conjunto de dados diretamente do cursor,
+    em lotes de 'batch_size', sem carregar o resultado inteiro em memória.
+    Valores em centavos são convertidos para reais.
+    """
+    definition = EXPORT_DATASETS[dataset]
+    cents_columns = definition['cents_columns']
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(definition['query'], _period_params(start_date, end_date))
+        columns = [col[0] for col in cursor.description]
+        cents_indexes = [i for i, col in enumerate(columns) if col in cents_columns]
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                values = list(row)
+                for i in cents_indexes:
+                    values[i] = to_reais(values[i])
+                yield values
+    finally:
+        conn.close()
+
+
+def _write_csv(file_path, headers, rows):
+    with open(file_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        for values in rows:
+            writer.writerow(values)
+
+
+def _write_xlsx(file_path, headers, rows, sheet_title):
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("Exportação para XLSX indisponível (módulo openpyxl não instalado).")
+
+    # 'write_only' grava as linhas em streaming, sem manter a planilha em memória
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(headers)
+    for values in rows:
+        sheet.append([float(v) if hasattr(v, 'quantize') else v for v in values])
+    workbook.save(file_path)
+
+
+def export_dataset(dataset, start_date, end_date, file_path, progress_callback=None, cancel_event=None):
+    """
+    Exporta um conjunto de dados completo do período para CSV ou XLSX (pela extensão),
+    em streaming a partir do cursor do banco.
+
+    O arquivo é gravado em um temporário e só substitui o destino ao final,
+    então um cancelamento ou erro nunca deixa um arquivo pela metade.
+
+    Args:
+        dataset: Chave de EXPORT_DATASETS ('sales', 'sale_items', 'sale_payments')
+        progress_callback: Função (percentual, mensagem) chamada durante a exportação
+        cancel_event: threading.Event; se sinalizado, a exportação é interrompida
+
+    Returns:
+        dict: {'success', 'rows', 'cancelled', 'file_path', 'error'}
+    """
+    definition = EXPORT_DATASETS[dataset]
+    total_rows = count_export_rows(dataset, start_date, end_date)
+    temp_path = f"{file_path}.part"
+    exported = {'rows': 0}
+
+    def tracked_rows():
+        for values in iter_export_rows(dataset, start_date, end_date):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            yield values
+            exported['rows'] += 1
+            if progress_callback and exported['rows'] % EXPORT_BATCH_SIZE == 0:
+                percent = int(exported['rows'] * 100 / total_rows) if total_rows else 100
+                progress_callback(min(percent, 99), f"{exported['rows']} de {total_rows} linhas exportadas...")
+
+    try:
+        if file_path.lower().endswith('.xlsx'):
+            _write_xlsx(temp_path, definition['headers'], tracked_rows(), definition['label'])
+        else:
+            _write_csv(temp_path, definition['headers'], tracked_rows())
+
+        os.replace(temp_path, file_path)
+        if progress_callback:
+            progress_callback(100, f"{exported['rows']} linhas exportadas.")
+        logging.info(f"Exportação '{dataset}' concluída: {exported['rows']} linhas em {file_path}")
+        return {'success': True, 'rows': exported['rows'], 'cancelled': False, 'file_path': file_path, 'error': None}
+
+    except ExportCancelled:
+        logging.info(f"Exportação '{dataset}' cancelada após {exported['rows']} linhas.")
+        return {'success': False, 'rows': exported['rows'], 'cancelled': True, 'file_path': file_path, 'error': None}
+
+    except Exception as e:
+        logging.error(f"Erro ao exportar '{dataset}': {e}", exc_info=True)
+        return {'success': False, 'rows': exported['rows'], 'cancelled': False, 'file_path': file_path, 'error': str(e)}
+
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,409 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+try:
+    from postgrest import APIResponse
+except ImportError:
+    APIResponse = None
+
+# Nomes de tabelas/colunas aceitos (evita SQL arbitrário nos identificadores)
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Operadores dos filtros do PostgREST suportados (coluna.operador.valor)
+_OPERATORS = {
+    'eq': '=',
+    'neq': '!=',
+    'gt': '>',
+    'gte': '>=',
+    'lt': '<',
+    'lte': '<=',
+}
+
+
+class FakeAPIError(Exception):
+    """Erro retornado pelo substituto local (equivalente ao APIError do postgrest)."""
+
+
+class FakeResponse:
+    """Resposta usada quando o postgrest não está instalado (mesmos atributos do APIResponse)."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _response(data):
+    if APIResponse is not None:
+        return APIResponse(data=data, count=None)
+    return FakeResponse(data)
+
+
+def _identifier(name):
+    name = name.strip()
+    if not _IDENTIFIER.match(name):
+        raise FakeAPIError(f"Identificador inválido: '{name}'")
+    return f'"{name}"'
+
+
+def _column_type(value):
+    """Tipo (afinidade) da coluna criada para um valor, para comparar como o Postgres faria."""
+    if isinstance(value, (bool, int)):
+        return 'INTEGER'
+    if isinstance(value, float):
+        return 'REAL'
+    if value is None:
+        return ''
+    return 'TEXT'
+
+
+def _to_sqlite(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _literal(value):
+    """Converte o valor textual de um filtro do PostgREST ('"texto"', 'null', '42')."""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    if value == 'null':
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _split_top_level(expression):
+    """Separa 'a,b(c,d),e' nas vírgulas de nível 0 (fora de parênteses e aspas)."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _logic_tree(expression, joiner):
+    """
+    Traduz uma árvore lógica do PostgREST (or=(...), and(...)) para SQL.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    clauses, params = [], []
+    for part in _split_top_level(expression):
+        group = re.match(r'^(and|or)\((.*)\)$', part, re.DOTALL)
+        if group:
+            sql, group_params = _logic_tree(group.group(2), group.group(1).upper())
+        else:
+            column, operator, value = part.split('.', 2)
+            sql, group_params = _condition(column, operator, _literal(value))
+        clauses.append(f"({sql})")
+        params.extend(group_params)
+    return f" {joiner} ".join(clauses), params
+
+
+def _condition(column, operator, value):
+    column = _identifier(column)
+    if operator == 'is':
+        return f"{column} IS NULL" if value is None else f"{column} IS ?", ([] if value is None else [value])
+    if operator not in _OPERATORS:
+        raise FakeAPIError(f"Operador não suportado: '{operator}'")
+    return f"{column} {_OPERATORS[operator]} ?", [_to_sqlite(value)]
+
+
+class FakeSupabaseClient:
+    """
+    Substituto local, em processo, do cliente Supabase usado pela sincronização
+    (apenas a API de tabelas do PostgREST). Os dados ficam em um SQLite próprio
+    (arquivo ou ':memory:'), separado do banco do PDV.
+
+    Imita o comportamento do servidor do qual o SyncManager depende:
+    - 'id' (bigint) atribuído pelo servidor e 'created_at'/'updated_at'
+      preenchidos em cada gravação (um mesmo horário para todo o lote, como o
+      now() de uma transação do Postgres);
+    - lotes de insert/upsert exigem as mesmas chaves em todos os objetos;
+    - tabelas e colunas são criadas conforme os dados chegam.
+
+    'latency_ms' simula o tempo de ida e volta de cada requisição, permitindo
+    medir a sincronização de forma reproduzível sem um Supabase real.
+    """
+
+    def __init__(self, path=':memory:', latency_ms=0):
+        self.path = path
+        self.latency_ms = latency_ms
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._columns = {}
+        self.request_count = 0
+
+    def table(self, table_name):
+        return FakeQueryBuilder(self, table_name)
+
+    def from_(self, table_name):
+        return self.table(table_name)
+
+    def rpc(self, fn, params=None):
+        raise FakeAPIError(f"RPC '{fn}' não é suportado pelo Supabase local.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _table_columns(self, table_name):
+        """Colunas da tabela (None se ainda não existir)."""
+        if table_name not in self._columns:
+            rows = self._conn.execute(f"PRAGMA table_info({_identifier(table_name)})").fetchall()
+            if not rows:
+                return None
+            self._columns[table_name] = {row['name'] for row in rows}
+        return self._columns[table_name]
+
+    def _ensure_table(self, table_name, records):
+        """Cria a tabela e as colunas ausentes a partir dos registros recebidos."""
+        columns = self._table_columns(table_name)
+        if columns is None:
+            self._conn.execute(f"""
+                CREATE TABLE {_identifier(table_name)} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT,
+                    updated_at TEXT
+                )
+            """)
+            columns = self._columns[table_name] = {'id', 'created_at', 'updated_at'}
+
+        for record in records:
+            for key, value in record.items():
+                if key not in columns:
+                    self._conn.execute(
+                        f"ALTER TABLE {_identifier(table_name)} ADD COLUMN {_identifier(key)} {_column_type(value)}"
+                    )
+                    columns.add(key)
+
+    def _ensure_unique(self, table_name, conflict_columns):
+        if conflict_columns == ['id']:
+            return
+        index_name = f"uq_{table_name}_{'_'.join(conflict_columns)}"
+        columns = ', '.join(_identifier(column) for column in conflict_columns)
+        self._conn.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {_identifier(index_name)} ON {_identifier(table_name)} ({columns})"
+        )
+
+    def _run(self, query):
+        """Executa uma requisição montada pelo FakeQueryBuilder."""
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        with self._lock:
+            self.request_count += 1
+            self._conn.execute("BEGIN")
+            try:
+                data = getattr(self, f"_run_{query.method}")(query)
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                self._conn.execute("ROLLBACK")
+                self._columns.clear()  # A criação de tabelas/colunas também foi desfeita
+                if isinstance(e, sqlite3.Error):
+                    raise FakeAPIError(str(e)) from e
+                raise
+        return _response(data)
+
+    def _run_select(self, query):
+        if self._table_columns(query.table_name) is None:
+            return []
+        sql = f"SELECT {query.columns} FROM {_identifier(query.table_name)}"
+        sql, params = query.apply_filters(sql)
+        if query.ordering:
+            sql += " ORDER BY " + ', '.join(query.ordering)
+        if query.row_limit is not None:
+            sql += f" LIMIT {int(query.row_limit)}"
+        return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def _run_insert(self, query):
+        records = query.records()
+        if not records:
+            return []
+        self._ensure_table(query.table_name, records)
+
+        now = datetime.now(timezone.utc).isoformat(timespec='microseconds')
+        keys = list(records[0].keys())
+        columns = keys + [column for column in ('created_at', 'updated_at') if column not in keys]
+        sql = (
+            f"INSERT INTO {_identifier(query.table_name)} ({', '.join(_identifier(c) for c in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+
+        if query.on_conflict:
+            conflict_columns = [column.strip() for column in query.on_conflict.split(',')]
+            self._ensure_unique(query.table_name, conflict_columns)
+            updates = [column for column in keys if column not in conflict_columns and column != 'created_at']
+            updates.append('updated_at')
+            sql += (
+                f" ON CONFLICT ({', '.join(_identifier(c) for c in conflict_columns)}) DO UPDATE SET "
+                + ', '.join(f"{_identifier(c)} = excluded.{_identifier(c)}" for c in updates)
+            )
+        sql += " RETURNING *"
+
+        data = []
+        for record in records:
+            values = [_to_sqlite(record[key]) for key in keys]
+            values += [now for column in columns[len(keys):]]
+            if 'updated_at' in keys:
+                values[keys.index('updated_at')] = now  # Definido pelo servidor (trigger)
+            data.append(dict(self._conn.execute(sql, values).fetchone()))
+        return data
+
+    def _run_update(self, query):
+        if self._table_columns(query.table_name) is None:
+            return []
+        payload = {key: value for key, value in query.payload.items() if key not in ('id', 'updated_at')}
+        self._ensure_table(query.table_name, [payload])
+
+        now = datetime.now(timezone.utc).isoformat(timespec='microseconds')
+        assignments = [f"{_identifier(key)} = ?" for key in payload] + ['"updated_at" = ?']
+        sql = f"UPDATE {_identifier(query.table_name)} SET {', '.join(assignments)}"
+        sql, params = query.apply_filters(sql, [_to_sqlite(value) for value in payload.values()] + [now])
+        return [dict(row) for row in self._conn.execute(sql + " RETURNING *", params).fetchall()]
+
+    def _run_delete(self, query):
+        if self._table_columns(query.table_name) is None:
+            return []
+        sql, params = query.apply_filters(f"DELETE FROM {_identifier(query.table_name)}")
+        return [dict(row) for row in self._conn.execute(sql + " RETURNING *", params).fetchall()]
+
+
+class FakeQueryBuilder:
+    """
+    Construtor de requisições com a mesma interface encadeável do postgrest-py:
+    select/insert/upsert/update/delete, filtros (eq, neq, gt, gte, lt, lte,
+    in_, is_, or_), order, limit e execute.
+    """
+
+    def __init__(self, client, table_name):
+        _identifier(table_name)
+        self.client = client
+        self.table_name = table_name
+        self.method = 'select'
+        self.columns = '*'
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+
+    # --- Operações ---
+
+    def select(self, *columns, count=None):
+        selected = ','.join(columns) if columns else '*'
+        if selected.strip() != '*':
+            selected = ', '.join(_identifier(column) for column in selected.split(','))
+        self.method, self.columns = 'select', selected
+        return self
+
+    def insert(self, json, *, count=None, returning=None, upsert=False, default_to_null=True):
+        self.method, self.payload = 'insert', json
+        if upsert:
+            self.on_conflict = 'id'
+        return self
+
+    def upsert(self, json, *, count=None, returning=None, ignore_duplicates=False, on_conflict='', default_to_null=True):
+        self.method, self.payload = 'insert', json
+        self.on_conflict = on_conflict or 'id'
+        return self
+
+    def update(self, json, *, count=None, returning=None):
+        self.method, self.payload = 'update', json
+        return self
+
+    def delete(self, *, count=None, returning=None):
+        self.method = 'delete'
+        return self
+
+    # --- Filtros ---
+
+    def _filter(self, column, operator, value):
+        self.filters.append(_condition(column, operator, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def is_(self, column, value):
+        return self._filter(column, 'is', None if value in (None, 'null') else value)
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.filters.append(("0", []))
+        else:
+            self.filters.append((f"{_identifier(column)} IN ({', '.join('?' for _ in values)})",
+                                 [_to_sqlite(value) for value in values]))
+        return self
+
+    def or_(self, filters, reference_table=None):
+        self.filters.append(_logic_tree(filters, 'OR'))
+        return self
+
+    def order(self, column, *, desc=False, nullsfirst=False, foreign_table=None):
+        self.ordering.append(f"{_identifier(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self.row_limit = size
+        return self
+
+    # --- Execução ---
+
+    def records(self):
+        records = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = set(records[0].keys()) if records else set()
+        if any(set(record.keys()) != keys for record in records):
+            # Mesmo erro do PostgREST para lotes com chaves diferentes
+            raise FakeAPIError("All object keys must match")
+        return records
+
+    def apply_filters(self, sql, params=None):
+        params = list(params or [])
+        if self.filters:
+            sql += " WHERE " + ' AND '.join(f"({clause})" for clause, _ in self.filters)
+            for _, clause_params in self.filters:
+                params.extend(clause_params)
+        return sql, params
+
+    def execute(self):
+        if self.method != 'select' and self.method != 'delete' and self.payload is None:
+            raise FakeAPIError("Requisição sem dados.")
+        logging.debug(f"FakeSupabaseClient: {self.method} em '{self.table_name}'.")
+        return self.client._run(self)
@@ -5,6 +5,22 @@ import json
 from datetime import datetime, timedelta
 from data.connection import get_db_connection
 
+# Tabelas sincronizadas com o Supabase (colunas id_web / sync_status)
+SYNC_TABLES = [
+    'product_groups',
+    'products',
+    'payment_methods',
+    'users',
+    'customers',
+    'sales',
+    'sale_items',
+    'credit_sales',
+    'credit_payments',
+    'estoque_grupos',
+    'estoque_itens',
+    'cash_sessions'
+]
+
 # Arquivo de cache para verificações
 CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.sync_check_cache.json')
 
@@ -46,20 +62,7 @@ def check_and_fix_sync_columns():
     logging.info("Iniciando verificação de correção das colunas de sincronização...")
 
     # Lista de tabelas que deveriam ter sido atualizadas pela migração
-    tables_to_check = [
-        'product_groups',
-        'products',
-        'payment_methods',
-        'users',
-        'customers',
-        'sales',
-        'sale_items',
-        'credit_sales',
-        'credit_payments',
-        'estoque_grupos',
-        'estoque_itens',
-        'cash_sessions'
-    ]
+    tables_to_check = SYNC_TABLES
 
     conn = None
     try:
@@ -142,3 +145,270 @@ def check_and_fix_sync_columns():
         if conn:
             conn.close()
 
+
+
+def ensure_id_map_triggers():
+    """
+    Cria os triggers que mantêm a tabela id_map (migração 0025) em dia sempre
+    que o id_web de um registro sincronizado é atribuído, alterado ou removido.
+
+    Os triggers não ficam na migração porque algumas tabelas só recebem a coluna
+    id_web em check_and_fix_sync_columns(). Ao criar os triggers de uma tabela,
+    o mapa é preenchido com os registros que já possuem id_web.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'id_map'")
+        if not cursor.fetchone():
+            logging.warning("Tabela id_map não encontrada. Triggers do mapa de IDs não foram criados.")
+            return
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_id_map_%'")
+        existing_triggers = {row['name'] for row in cursor.fetchall()}
+
+        for table in SYNC_TABLES:
+            if f"trg_id_map_{table}_delete" in existing_triggers:
+                continue
+
+            cursor.execute(f"PRAGMA table_info({table})")
+            if 'id_web' not in [col['name'] for col in cursor.fetchall()]:
+                logging.debug(f"Tabela '{table}' ainda não possui id_web; triggers do id_map adiados")
+                continue
+
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_id_map_{table}_insert
+                AFTER INSERT ON {table}
+                WHEN NEW.id_web IS NOT NULL
+                BEGIN
+                    INSERT OR REPLACE INTO id_map (table_name, local_id, web_id)
+                    VALUES ('{table}', NEW.id, NEW.id_web);
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_id_map_{table}_update
+                AFTER UPDATE OF id_web ON {table}
+                BEGIN
+                    DELETE FROM id_map WHERE table_name = '{table}' AND local_id = OLD.id;
+                    INSERT OR REPLACE INTO id_map (table_name, local_id, web_id)
+                    SELECT '{table}', NEW.id, NEW.id_web WHERE NEW.id_web IS NOT NULL;
+                END
+            """)
+            # Criado por último: sua existência indica que a tabela já foi preparada
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_id_map_{table}_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    DELETE FROM id_map WHERE table_name = '{table}' AND local_id = OLD.id;
+                END
+            """)
+
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO id_map (table_name, local_id, web_id)
+                SELECT '{table}', id, id_web FROM {table} WHERE id_web IS NOT NULL
+            """)
+            conn.commit()
+            logging.info(f"Triggers do id_map criados para '{table}' ({cursor.rowcount} IDs mapeados)")
+
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao criar triggers do id_map: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+def ensure_sync_outbox_triggers():
+    """
+    Cria os triggers que registram na tabela sync_outbox (migração 0026) todo
+    registro sincronizado que fica com sync_status pendente. O SyncService usa
+    essa tabela para saber quando e quais tabelas enviar.
+
+    Assim como os triggers do id_map, dependem da coluna sync_status, que em
+    algumas tabelas só existe após check_and_fix_sync_columns(). Ao criar os
+    triggers de uma tabela, os registros já pendentes são incluídos no outbox.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sync_outbox'")
+        if not cursor.fetchone():
+            logging.warning("Tabela sync_outbox não encontrada. Triggers do outbox de sincronização não foram criados.")
+            return
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_sync_outbox_%'")
+        existing_triggers = {row['name'] for row in cursor.fetchall()}
+
+        for table in SYNC_TABLES:
+            if f"trg_sync_outbox_{table}_update" in existing_triggers:
+                continue
+
+            cursor.execute(f"PRAGMA table_info({table})")
+            if 'sync_status' not in [col['name'] for col in cursor.fetchall()]:
+                logging.debug(f"Tabela '{table}' ainda não possui sync_status; triggers do outbox adiados")
+                continue
+
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_sync_outbox_{table}_insert
+                AFTER INSERT ON {table}
+                WHEN NEW.sync_status != 'synced'
+                BEGIN
+                    INSERT OR REPLACE INTO sync_outbox (table_name, local_id) VALUES ('{table}', NEW.id);
+                END
+            """)
+            # Criado por último: sua existência indica que a tabela já foi preparada
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_sync_outbox_{table}_update
+                AFTER UPDATE ON {table}
+                WHEN NEW.sync_status != 'synced'
+                BEGIN
+                    INSERT OR REPLACE INTO sync_outbox (table_name, local_id) VALUES ('{table}', NEW.id);
+                END
+            """)
+
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO sync_outbox (table_name, local_id)
+                SELECT '{table}', id FROM {table} WHERE sync_status != 'synced'
+            """)
+            conn.commit()
+            logging.info(f"Triggers do outbox de sincronização criados para '{table}' ({cursor.rowcount} pendentes)")
+
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao criar triggers do outbox de sincronização: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+def ensure_sync_status_indexes():
+    """
+    Cria, em cada tabela sincronizada, um índice parcial sobre sync_status
+    contendo apenas os registros pendentes (WHERE sync_status != 'synced').
+    As consultas da sincronização repetem essa condição para que o SQLite use
+    o índice e leia só as pendências, sem varrer tabelas como sales e sale_items.
+
+    Fica fora das migrações porque algumas tabelas só recebem a coluna
+    sync_status em check_and_fix_sync_columns().
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%_sync_pending'")
+        existing_indexes = {row['name'] for row in cursor.fetchall()}
+
+        for table in SYNC_TABLES:
+            if f"idx_{table}_sync_pending" in existing_indexes:
+                continue
+
+            cursor.execute(f"PRAGMA table_info({table})")
+            if 'sync_status' not in [col['name'] for col in cursor.fetchall()]:
+                logging.debug(f"Tabela '{table}' ainda não possui sync_status; índice de pendências adiado")
+                continue
+
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_{table}_sync_pending
+                ON {table} (sync_status) WHERE sync_status != 'synced'
+            """)
+            conn.commit()
+            logging.info(f"Índice parcial de pendências de sincronização criado para '{table}'")
+
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao criar índices de pendências de sincronização: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+# Colunas de controle da sincronização que não entram no snapshot de sync_base
+_SYNC_BASE_IGNORED_COLUMNS = ('id', 'id_web', 'sync_status')
+
+
+def ensure_sync_base_triggers():
+    """
+    Cria os triggers que guardam em sync_base (migração 0029) a última versão
+    sincronizada de um registro no momento em que ele passa de 'synced' para
+    'pending_update' (a mesma instrução UPDATE altera os dados e o status, então
+    OLD é a versão que a web também conhece). Alterações seguintes apenas
+    atualizam local_modified_at. O snapshot é removido quando o registro volta
+    a 'synced' ou é excluído.
+
+    O snapshot lista as colunas da tabela; se o esquema mudar, os triggers são
+    recriados na próxima inicialização.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sync_base'")
+        if not cursor.fetchone():
+            logging.warning("Tabela sync_base não encontrada. Triggers de merge da sincronização não foram criados.")
+            return
+
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_sync_base_%'")
+        existing_triggers = {row['name']: row['sql'] for row in cursor.fetchall()}
+
+        for table in SYNC_TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [col['name'] for col in cursor.fetchall()]
+            if 'sync_status' not in columns:
+                logging.debug(f"Tabela '{table}' ainda não possui sync_status; triggers de merge adiados")
+                continue
+
+            pairs = ', '.join(f"'{col}', OLD.{col}" for col in columns if col not in _SYNC_BASE_IGNORED_COLUMNS)
+            existing_sql = existing_triggers.get(f"trg_sync_base_{table}_pending")
+            if existing_sql and f"json_object({pairs})" in existing_sql:
+                continue
+
+            for suffix in ('pending', 'synced', 'delete'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS trg_sync_base_{table}_{suffix}")
+
+            cursor.execute(f"""
+                CREATE TRIGGER trg_sync_base_{table}_synced
+                AFTER UPDATE OF sync_status ON {table}
+                WHEN NEW.sync_status = 'synced' AND OLD.sync_status != 'synced'
+                BEGIN
+                    DELETE FROM sync_base WHERE table_name = '{table}' AND local_id = OLD.id;
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER trg_sync_base_{table}_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    DELETE FROM sync_base WHERE table_name = '{table}' AND local_id = OLD.id;
+                END
+            """)
+            # Criado por último: sua existência (com as colunas atuais) indica que a tabela já foi preparada
+            cursor.execute(f"""
+                CREATE TRIGGER trg_sync_base_{table}_pending
+                AFTER UPDATE ON {table}
+                WHEN NEW.sync_status = 'pending_update'
+                BEGIN
+                    INSERT OR REPLACE INTO sync_base (table_name, local_id, data, local_modified_at)
+                    SELECT '{table}', OLD.id, json_object({pairs}), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+                    WHERE OLD.sync_status = 'synced';
+                    UPDATE sync_base SET local_modified_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+                    WHERE table_name = '{table}' AND local_id = OLD.id AND OLD.sync_status != 'synced';
+                END
+            """)
+            conn.commit()
+            logging.info(f"Triggers de merge da sincronização criados para '{table}'")
+
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao criar triggers de merge da sincronização: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
@@ -111,6 +111,13 @@ def get_latest_sales(limit=5):
         })
     return latest_sales
 
+def get_last_sale_id():
+    """Retorna o maior ID de venda registrado (0 se não houver vendas)."""
+    conn = get_db_connection()
+    row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()
+    conn.close()
+    return row[0]
+
 def get_sales_report(start_date, end_date):
     """Gera um relatório de vendas consolidado para um período."""
     conn = get_db_connection()
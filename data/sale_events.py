@@ -0,0 +1,64 @@
+import logging
+import threading
+
+# Assinantes do evento "venda registrada" (funções que recebem o dicionário do evento)
+_sale_registered_subscribers = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe_sale_registered(callback):
+    """
+    Registra uma função a ser chamada sempre que uma venda for gravada no banco.
+    A função recebe o dicionário montado por build_sale_event.
+    """
+    with _subscribers_lock:
+        if callback not in _sale_registered_subscribers:
+            _sale_registered_subscribers.append(callback)
+
+
+def unsubscribe_sale_registered(callback):
+    """Remove uma função previamente registrada com subscribe_sale_registered."""
+    with _subscribers_lock:
+        if callback in _sale_registered_subscribers:
+            _sale_registered_subscribers.remove(callback)
+
+
+def publish_sale_registered(event):
+    """
+    Notifica os assinantes de que uma venda foi gravada.
+
+    Deve ser chamada somente depois do commit da transação da venda.
+    Erros de um assinante são registrados no log e não afetam os demais
+    nem a venda em si.
+    """
+    if not event:
+        return
+    with _subscribers_lock:
+        subscribers = list(_sale_registered_subscribers)
+
+    for callback in subscribers:
+        try:
+            callback(event)
+        except Exception as e:
+            logging.warning(f"Erro ao notificar assinante do evento de venda: {e}")
+
+
+def build_sale_event(sale_id, sale_date, total_amount, user_id, username, cash_session_id, training_mode, items):
+    """
+    Monta o dicionário do evento "venda registrada".
+
+    Args:
+        sale_date: Data/hora local da venda no formato '%Y-%m-%d %H:%M:%S'
+        total_amount: Total da venda em reais (Decimal)
+        items: Lista de dicts {'product_id', 'group_name', 'total_price'} (total em reais)
+    """
+    return {
+        'sale_id': sale_id,
+        'sale_date': sale_date,
+        'total_amount': total_amount,
+        'user_id': user_id,
+        'username': username,
+        'cash_session_id': cash_session_id,
+        'training_mode': bool(training_mode),
+        'items': items,
+    }
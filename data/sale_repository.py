@@ -4,6 +4,8 @@ from decimal import Decimal
 from typing import Optional
 from .connection import get_db_connection
 from .audit_repository import log_audit
+from .sale_events import build_sale_event, publish_sale_registered
+from .terminal import get_terminal_id
 from utils import to_cents, to_reais
 
 def register_sale(total_amount, payment_method, items):
@@ -15,13 +17,14 @@ def register_sale(total_amount, payment_method, items):
         # Corrige problema de timezone: usa horário local
         from datetime import datetime
         sale_date_local = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('INSERT INTO sales (sale_date, total_amount, payment_method) VALUES (?, ?, ?)', (sale_date_local, total_amount_cents, payment_method))
+        terminal_id = get_terminal_id()
+        cursor.execute('INSERT INTO sales (sale_date, total_amount, payment_method, terminal_id) VALUES (?, ?, ?, ?)', (sale_date_local, total_amount_cents, payment_method, terminal_id))
         sale_id = cursor.lastrowid
         for item in items:
             unit_price_cents = to_cents(item['unit_price'])
             total_price_cents = to_cents(item['total_price'])
-            cursor.execute('INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?)',
-                           (sale_id, item['id'], item['quantity'], unit_price_cents, total_price_cents))
+            cursor.execute('INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price, terminal_id) VALUES (?, ?, ?, ?, ?, ?)',
+                           (sale_id, item['id'], item['quantity'], unit_price_cents, total_price_cents, terminal_id))
             
             # Apenas atualiza o estoque para itens vendidos por unidade.
             if item.get('sale_type') == 'unit':
@@ -82,11 +85,32 @@ def get_sales_by_period(start_date, end_date):
         
     return sales
 
-def get_sales_with_payment_methods_by_period(start_date, end_date, limit=100, offset=0):
+def get_sales_period_totals(start_date, end_date):
     """
-    Retorna vendas dentro de um período de datas específico com paginação.
-    Usa uma única consulta otimizada com LEFT JOIN e GROUP_CONCAT.
-    Retorna um dicionário com 'sales' e 'total_count'.
+    Retorna a quantidade e o faturamento das vendas de um período a partir da
+    tabela sales_daily_rollup (mantida por triggers), sem varrer a tabela sales.
+    """
+    conn = get_db_connection()
+    row = conn.execute('''
+        SELECT COALESCE(SUM(sales_count), 0) as total_count,
+               COALESCE(SUM(total_cents), 0) as total_cents
+        FROM sales_daily_rollup
+        WHERE sale_day BETWEEN ? AND ?
+    ''', (start_date, end_date)).fetchone()
+    conn.close()
+    return {'total_count': row['total_count'], 'total_amount': to_reais(row['total_cents'])}
+
+def get_sales_with_payment_methods_by_period(start_date, end_date, limit=100, offset=0, after=None):
+    """
+    Retorna uma página de vendas de um período, da mais recente para a mais antiga.
+
+    A paginação é por cursor (keyset) sobre (sale_date, id): passe em 'after' o
+    'next_cursor' da página anterior para buscar a próxima, com custo constante
+    independentemente da profundidade. 'offset' é mantido apenas por compatibilidade.
+    Os totais do período vêm de sales_daily_rollup, sem COUNT(*) por página.
+
+    Retorna um dicionário com 'sales', 'total_count', 'total_amount',
+    'next_cursor' e 'has_next'.
     """
     conn = get_db_connection()
 
@@ -94,33 +118,43 @@ def get_sales_with_payment_methods_by_period(start_date, end_date, limit=100, of
     start_datetime = f'{start_date} 00:00:00'
     end_datetime = f'{end_date} 23:59:59'
 
-    # Consulta para contar o total de vendas
-    count_query = '''
-        SELECT COUNT(*) as total_count
-        FROM sales s
-        WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
-    '''
-    count_row = conn.execute(count_query, (start_datetime, end_datetime)).fetchone()
-    total_count = count_row['total_count']
+    params = [start_datetime, end_datetime]
+    cursor_clause = ''
+    if after:
+        cursor_clause = 'AND (s.sale_date, s.id) < (?, ?)'
+        params.extend(after)
 
-    # Consulta para buscar vendas com paginação
-    query = '''
+    # Busca uma linha a mais para saber se existe próxima página
+    query = f'''
         SELECT
             s.id, s.sale_date, s.total_amount, s.user_id, s.cash_session_id, s.training_mode,
             s.session_sale_id, s.customer_name,
-            u.username,
-            GROUP_CONCAT(pm.name, ', ') as payment_methods_str
+            u.username
         FROM sales s
-        LEFT JOIN sale_payments sp ON s.id = sp.sale_id
-        LEFT JOIN payment_methods pm ON sp.payment_method = pm.id
         LEFT JOIN users u ON s.user_id = u.id
-        WHERE s.sale_date BETWEEN ? AND ? AND s.training_mode = 0
-        GROUP BY s.id
-        ORDER BY s.sale_date DESC
+        WHERE s.training_mode = 0 AND s.sale_date BETWEEN ? AND ? {cursor_clause}
+        ORDER BY s.sale_date DESC, s.id DESC
         LIMIT ? OFFSET ?
     '''
+    params.extend([limit + 1, 0 if after else offset])
+    rows = conn.execute(query, params).fetchall()
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
 
-    rows = conn.execute(query, (start_datetime, end_datetime, limit, offset)).fetchall()
+    # Formas de pagamento apenas das vendas da página (evita GROUP_CONCAT sobre o período inteiro)
+    payment_methods_by_sale = {}
+    if rows:
+        sale_ids = [row['id'] for row in rows]
+        placeholders = ', '.join('?' for _ in sale_ids)
+        payment_rows = conn.execute(f'''
+            SELECT sp.sale_id, GROUP_CONCAT(pm.name, ', ') as payment_methods_str
+            FROM sale_payments sp
+            LEFT JOIN payment_methods pm ON sp.payment_method = pm.id
+            WHERE sp.sale_id IN ({placeholders})
+            GROUP BY sp.sale_id
+        ''', sale_ids).fetchall()
+        payment_methods_by_sale = {row['sale_id']: row['payment_methods_str'] for row in payment_rows}
     conn.close()
 
     sales = []
@@ -128,9 +162,19 @@ def get_sales_with_payment_methods_by_period(start_date, end_date, limit=100, of
         sale = dict(row)
         # Usa a função from_cents que já existe no seu utils.py
         sale['total_amount'] = to_reais(sale['total_amount'])
+        sale['payment_methods_str'] = payment_methods_by_sale.get(sale['id'])
         sales.append(sale)
 
-    return {'sales': sales, 'total_count': total_count}
+    next_cursor = (rows[-1]['sale_date'], rows[-1]['id']) if has_next else None
+    totals = get_sales_period_totals(start_date, end_date)
+
+    return {
+        'sales': sales,
+        'total_count': totals['total_count'],
+        'total_amount': totals['total_amount'],
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
 
 def get_items_for_sale(sale_id):
     conn = get_db_connection()
@@ -151,6 +195,41 @@ def get_items_for_sale(sale_id):
         items.append(item)
     return items
 
+def get_items_for_sales(sale_ids):
+    """
+    Busca os itens de várias vendas em uma única consulta (WHERE sale_id IN (...)).
+    Retorna um dicionário {sale_id: [itens]} no mesmo formato de get_items_for_sale;
+    vendas sem itens aparecem com lista vazia.
+    """
+    sale_ids = list(dict.fromkeys(sale_ids))
+    items_by_sale = {sale_id: [] for sale_id in sale_ids}
+    if not sale_ids:
+        return items_by_sale
+
+    conn = get_db_connection()
+    # Limita o número de parâmetros por consulta (SQLITE_MAX_VARIABLE_NUMBER)
+    chunk_size = 500
+    for i in range(0, len(sale_ids), chunk_size):
+        chunk = sale_ids[i:i + chunk_size]
+        placeholders = ', '.join('?' for _ in chunk)
+        rows = conn.execute(f'''
+            SELECT si.sale_id, p.description, si.quantity, si.unit_price, si.total_price, p.sale_type
+            FROM sale_items si
+            JOIN products p ON si.product_id = p.id
+            WHERE si.sale_id IN ({placeholders})
+            ORDER BY si.sale_id, si.id
+        ''', chunk).fetchall()
+        for row in rows:
+            item = dict(row)
+            sale_id = item.pop('sale_id')
+            if item['unit_price'] is not None:
+                item['unit_price'] = to_reais(item['unit_price'])
+            if item['total_price'] is not None:
+                item['total_price'] = to_reais(item['total_price'])
+            items_by_sale[sale_id].append(item)
+    conn.close()
+    return items_by_sale
+
 def get_next_session_sale_id(cash_session_id: int) -> int:
     """Calcula o próximo ID de venda para a sessão de caixa atual."""
     if not cash_session_id:
@@ -180,12 +259,16 @@ def register_sale_with_user(total_amount, payments, items, change_amount, user_i
         change_amount_cents = int(to_cents(change_amount))
         
         # Validação dos IDs
+        username = None
         if user_id is not None:
             logging.debug(f"Validating user_id: {user_id}")
-            cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
-            if cursor.fetchone() is None:
+            cursor.execute("SELECT id, username FROM users WHERE id = ?", (user_id,))
+            user_row = cursor.fetchone()
+            if user_row is None:
                 logging.warning(f"User ID {user_id} not found. Setting to NULL.")
                 user_id = None
+            else:
+                username = user_row[1]
             logging.debug("user_id is valid")
         
         if cash_session_id is not None:
@@ -216,16 +299,19 @@ def register_sale_with_user(total_amount, payments, items, change_amount, user_i
         from datetime import datetime
         sale_date_local = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
+        terminal_id = get_terminal_id()
+
         logging.debug(f"Executing INSERT INTO sales with user_id: {user_id}, cash_session_id: {cash_session_id}, sale_date: {sale_date_local}")
         cursor.execute('''
-            INSERT INTO sales (sale_date, total_amount, user_id, cash_session_id, training_mode, change_amount, session_sale_id, customer_name, discount_value)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (sale_date_local, total_amount_cents, user_id, cash_session_id, training_mode, change_amount_cents, session_sale_id, customer_name, discount_value))
+            INSERT INTO sales (sale_date, total_amount, user_id, cash_session_id, training_mode, change_amount, session_sale_id, customer_name, discount_value, terminal_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (sale_date_local, total_amount_cents, user_id, cash_session_id, training_mode, change_amount_cents, session_sale_id, customer_name, discount_value, terminal_id))
         logging.debug("Finished INSERT INTO sales")
 
         sale_id = cursor.lastrowid
         logging.debug(f"Sale registered with sale_id: {sale_id}")
 
+        event_items = []
         for item in items:
             # Garante que os valores de preço também sejam inteiros
             unit_price_cents = int(to_cents(item['unit_price']))
@@ -235,17 +321,27 @@ def register_sale_with_user(total_amount, payments, items, change_amount, user_i
 
             # Valida o ID do produto
             logging.debug(f"Validating product with id {item['id']}")
-            cursor.execute("SELECT id FROM products WHERE id = ?", (item['id'],))
-            if cursor.fetchone() is None:
+            cursor.execute("""
+                SELECT p.id, pg.name FROM products p
+                LEFT JOIN product_groups pg ON p.group_id = pg.id
+                WHERE p.id = ?
+            """, (item['id'],))
+            product_row = cursor.fetchone()
+            if product_row is None:
                 raise sqlite3.Error(f"Produto com ID {item['id']} não encontrado.")
             logging.debug(f"Product with id {item['id']} is valid")
+            event_items.append({
+                'product_id': item['id'],
+                'group_name': product_row[1],
+                'total_price': to_reais(total_price_cents)
+            })
 
             logging.debug(f"Inserting sale_item with sale_id: {sale_id}, product_id: {item['id']}")
-            insert_values = (sale_id, item['id'], quantity_float, unit_price_cents, total_price_cents, peso_kg)
+            insert_values = (sale_id, item['id'], quantity_float, unit_price_cents, total_price_cents, peso_kg, terminal_id)
             logging.debug(f"Values for sale_items: {insert_values}")
             cursor.execute('''
-                INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price, peso_kg)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price, peso_kg, terminal_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', insert_values)
             logging.debug("Finished INSERT INTO sale_items")
 
@@ -301,8 +397,16 @@ def register_sale_with_user(total_amount, payments, items, change_amount, user_i
             "payments": payments,
             "items": items,
             "change_amount": change_amount,
-            "discount_value": discount_value
+            "discount_value": discount_value,
+            "event": build_sale_event(
+                sale_id, sale_date_local, to_reais(total_amount_cents), user_id, username,
+                cash_session_id, training_mode, event_items
+            )
         }
+
+        # Com transação externa, quem chamou publica o evento após o seu commit
+        if manage_transaction:
+            publish_sale_registered(sale_data["event"])
         return True, sale_data
     except sqlite3.Error as e:
         if manage_transaction and conn:
@@ -1,10 +1,17 @@
+import json
 import logging
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
 from datetime import datetime, timezone # <-- ADICIONAR
 from .connection import get_db_connection
 from .api_client import api_client_instance
 from data.settings_repository import SettingsRepository # <-- ADICIONAR
+from .sync_repository import get_sync_backlog
+from .sync_metrics import SyncMetricsCollector
+from .terminal import TERMINAL_SCOPED_TABLES, get_terminal_id, is_store_mode
 from PyQt6.QtCore import QObject, pyqtSignal
 try:
     from postgrest import APIResponse
@@ -48,6 +55,34 @@ SYNC_TABLES_INDEPENDENT = [
     'customers',
 ]
 
+# Download (web -> local): registros por página (keyset por updated_at, id) e
+# quantidade de tabelas independentes baixadas em paralelo
+DOWNLOAD_PAGE_SIZE = 1000
+DOWNLOAD_WORKERS = 4
+
+# Upload de atualizações: registros por requisição de upsert em lote
+UPDATE_BATCH_SIZE = 500
+
+# Tempo máximo (s) que a sincronização manual aguarda um envio em andamento
+MANUAL_SYNC_LOCK_TIMEOUT = 60
+
+# Chaves estrangeiras traduzidas na sincronização: tabela -> {coluna: tabela pai}
+FOREIGN_KEYS: Dict[str, Dict[str, str]] = {
+    'products': {'group_id': 'product_groups'},
+    'estoque_itens': {'grupo_id': 'estoque_grupos'},
+    'cash_sessions': {'user_id': 'users'},
+    'cash_movements': {'session_id': 'cash_sessions', 'user_id': 'users', 'authorized_by_id': 'users'},
+    'cash_counts': {'session_id': 'cash_sessions'},
+    'sales': {'user_id': 'users', 'cash_session_id': 'cash_sessions'},
+    'sale_payments': {'sale_id': 'sales'},
+    'sale_items': {'sale_id': 'sales', 'product_id': 'products'},
+    'credit_sales': {'customer_id': 'customers', 'sale_id': 'sales', 'user_id': 'users'},
+    'credit_payments': {'credit_sale_id': 'credit_sales', 'user_id': 'users', 'cash_session_id': 'cash_sessions'},
+}
+
+# IDs por consulta IN (...) no pré-carregamento do id_map
+ID_MAP_QUERY_CHUNK = 500
+
 # Mapeia tabelas para suas colunas de CONFLITO (chave única)
 CONFLICT_COLUMNS: Dict[str, str] = {
     'product_groups': 'name',
@@ -61,6 +96,48 @@ CONFLICT_COLUMNS: Dict[str, str] = {
     # chaves únicas de negócio, elas serão apenas INSERT.
 }
 
+# Merge de edições concorrentes (o mesmo registro alterado localmente e na web entre
+# sincronizações): campos alterados dos dois lados que são somados a partir da versão
+# base (deltas de estoque). Os demais campos seguem last-writer-wins.
+ADDITIVE_FIELDS: Dict[str, set] = {
+    'products': {'stock'},
+    'estoque_itens': {'estoque_atual'},
+}
+
+# Dias que os conflitos já resolvidos ficam registrados em sync_conflicts
+RESOLVED_CONFLICTS_RETENTION_DAYS = 30
+
+# Tentativas de baixar de novo um registro da web que não pôde ser gravado localmente
+# (sync_download_retries); depois disso ele fica na tabela só para consulta
+DOWNLOAD_RETRY_MAX_ATTEMPTS = 10
+
+_MISSING = object()
+
+
+def _values_equal(a, b) -> bool:
+    """
+    Compara valores do SQLite e da web (1 == 1.0 == True, '5' == 5 e o mesmo
+    instante em formatos diferentes, ex: '2025-01-01 10:00:00' e '2025-01-01T10:00:00+00:00').
+    """
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return float(a) == float(b)
+    if str(a) == str(b):
+        return True
+    if isinstance(a, str) and isinstance(b, str):
+        parsed_a, parsed_b = _parse_utc(a), _parse_utc(b)
+        return parsed_a is not None and parsed_a == parsed_b
+    return False
+
+
+def _parse_utc(value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
 class SyncManager(QObject):
     """
     Gerencia a sincronização de dados (upload e download)
@@ -76,17 +153,32 @@ class SyncManager(QObject):
         self.api_client = api_client_instance
         self.settings_repo = SettingsRepository() # <-- ADICIONAR
         self.is_syncing = False
+        # Garante uma única sincronização por vez (manual ou do SyncService)
+        self._sync_lock = threading.Lock()
+        # Telemetria por execução e por tabela (tabela sync_metrics)
+        self.metrics = SyncMetricsCollector()
+        self.last_run_metrics = None
+        # Registros da web a baixar de novo, por tabela: {id_web: tentativas} (sync_download_retries)
+        self._download_retries: Dict[str, Dict[str, int]] = {}
 
     def check_connection_and_run_sync(self):
         """
         Ponto de entrada principal. Verifica a conexão e inicia a sincronização
         se não estiver ocupado.
         """
-        if self.is_syncing:
+        # Um envio do SyncService é curto: aguarda ele terminar em vez de desistir
+        if not self._sync_lock.acquire(timeout=MANUAL_SYNC_LOCK_TIMEOUT):
             logging.warning("SyncManager: Tentativa de iniciar sincronização enquanto outra já está em andamento.")
-            self.sync_status_updated.emit("Sincronização já em andamento...")
+            self.sync_finished.emit(False, "Sincronização já em andamento...")
             return
 
+        try:
+            self._run_full_sync()
+        finally:
+            self._sync_lock.release()
+
+    def _run_full_sync(self):
+        """Upload das pendências e download das mudanças da web (com o lock já adquirido)."""
         if not self.api_client.check_connection():
             logging.warning("SyncManager: Sincronização falhou. Sem conexão com a API.")
             self.sync_finished.emit(False, "Falha na conexão. Verifique a internet e o Supabase.")
@@ -99,6 +191,7 @@ class SyncManager(QObject):
 
         self.is_syncing = True
         self.sync_status_updated.emit("Iniciando sincronização...")
+        self.metrics.begin_run('full')
 
         try:
             # Define o carimbo de data/hora ANTES de qualquer operação
@@ -112,10 +205,17 @@ class SyncManager(QObject):
             self._sync_pending_updates()
 
             # 3. Baixar mudanças da web (Download)
-            self._sync_web_to_local(new_sync_timestamp)
+            download_complete = self._sync_web_to_local(new_sync_timestamp)
 
-            # 4. Se tudo deu certo, salva o novo timestamp
-            self.settings_repo.save_setting('last_sync_timestamp', new_sync_timestamp)
+            # 4. Mesclar as edições concorrentes detectadas e enviar o resultado
+            self._resolve_and_push_conflicts()
+
+            # 5. Se todas as tabelas foram baixadas, salva o novo timestamp
+            # (as tabelas com falha retomam pelos próprios checkpoints)
+            if download_complete:
+                self.settings_repo.save_setting('last_sync_timestamp', new_sync_timestamp)
+            else:
+                logging.warning("SyncManager: Algumas tabelas não foram baixadas; serão retomadas na próxima sincronização.")
 
             logging.info("SyncManager: Sincronização concluída com sucesso.")
             self.sync_finished.emit(True, f"Sincronização concluída (Até {new_sync_timestamp}).")
@@ -125,11 +225,73 @@ class SyncManager(QObject):
             self.sync_finished.emit(False, f"Erro na sincronização: {e}")
         finally:
             self.is_syncing = False
+            self._finish_metrics()
+
+    def push_pending_changes(self, tables=None) -> bool | None:
+        """
+        Envia apenas as criações e atualizações pendentes (sem download), usado
+        pelo SyncService. 'tables' restringe o envio às tabelas informadas
+        (na ordem de SYNC_ORDER); None envia todas.
+
+        Returns:
+            bool: False se o Supabase não estiver disponível/configurado
+            None: se outra sincronização já estiver em andamento
+        """
+        if not SUPABASE_AVAILABLE or not self.api_client.get_client():
+            return False
+
+        if not self._sync_lock.acquire(blocking=False):
+            return None
+
+        self.is_syncing = True
+        self.metrics.begin_run('push')
+        try:
+            self._sync_pending_creates(tables)
+            self._sync_pending_updates(tables)
+            self._resolve_and_push_conflicts(tables)
+            return True
+        finally:
+            self.is_syncing = False
+            self._finish_metrics()
+            self._sync_lock.release()
+
+    def _finish_metrics(self):
+        """Encerra a coleta de métricas da execução, incluindo as pendências restantes."""
+        try:
+            self.last_run_metrics = self.metrics.end_run(get_sync_backlog())
+        except Exception as e:
+            logging.warning(f"SyncManager: Erro ao registrar métricas da sincronização: {e}")
+
+    def _execute_request(self, table_name: str, query, payload=None, retry: bool = False):
+        """
+        Executa uma requisição ao Supabase registrando nas métricas a latência,
+        as linhas e os bytes (aproximados pelo JSON) enviados ou recebidos.
+        'payload' é o que foi enviado (None em consultas).
+        """
+        rows_up = len(payload) if isinstance(payload, list) else (1 if payload else 0)
+        bytes_up = len(json.dumps(payload, default=str)) if payload else 0
 
-    def _sync_pending_creates(self):
+        start = time.perf_counter()
+        try:
+            response = query.execute()
+        except Exception:
+            self.metrics.record_request(table_name, time.perf_counter() - start, bytes_up=bytes_up, retry=retry, error=True)
+            raise
+        latency = time.perf_counter() - start
+
+        if payload is None:
+            data = getattr(response, 'data', None) or []
+            self.metrics.record_request(table_name, latency, rows_down=len(data),
+                                        bytes_down=len(json.dumps(data, default=str)) if data else 0, retry=retry)
+        else:
+            self.metrics.record_request(table_name, latency, rows_up=rows_up, bytes_up=bytes_up, retry=retry)
+        return response
+
+    def _sync_pending_creates(self, tables=None):
         """
         Passo 1: Processa todos os registros com 'pending_create'
         Envia para o Supabase e salva o 'id_web' localmente.
+        'tables' restringe o processamento às tabelas informadas.
         """
         logging.info("SyncManager: Iniciando _sync_pending_creates...")
         self.sync_status_updated.emit("Enviando novos registros...")
@@ -141,30 +303,36 @@ class SyncManager(QObject):
         # Cache para armazenar id_web já consultados (performance)
         web_id_cache = {}
 
-        # Processa todas as tabelas na ordem definida
+        # Processa as tabelas na ordem definida
         for table_name in SYNC_ORDER:
+            if tables is not None and table_name not in tables:
+                continue
             try:
-                cursor.execute(f"SELECT * FROM {table_name} WHERE sync_status = 'pending_create' ORDER BY id")
+                # "sync_status != 'synced'" permite ao SQLite usar o índice parcial de pendências
+                cursor.execute(f"SELECT * FROM {table_name} WHERE sync_status = 'pending_create' AND sync_status != 'synced' ORDER BY id")
                 rows_to_create = cursor.fetchall()
 
                 if not rows_to_create:
                     continue
 
                 logging.info(f"SyncManager: Encontrados {len(rows_to_create)} registros 'pending_create' em '{table_name}'")
+                with self.metrics.timed(table_name, 'build'):
+                    self._preload_id_map(conn, web_id_cache, table_name, rows_to_create)
                 self.sync_status_updated.emit(f"Enviando {len(rows_to_create)} itens de '{table_name}'...")
 
                 payloads = []
                 local_ids = []
 
-                for row in rows_to_create:
-                    payload = self._build_payload(conn, web_id_cache, table_name, row)
-                    if payload is None:
-                        # Dependência obrigatória não sincronizada, pula este registro
-                        logging.warning(f"SyncManager: Pulando registro {row['id']} de '{table_name}' devido a dependência não sincronizada")
-                        continue
+                with self.metrics.timed(table_name, 'build'):
+                    for row in rows_to_create:
+                        payload = self._build_payload(conn, web_id_cache, table_name, row)
+                        if payload is None:
+                            # Dependência obrigatória não sincronizada, pula este registro
+                            logging.warning(f"SyncManager: Pulando registro {row['id']} de '{table_name}' devido a dependência não sincronizada")
+                            continue
 
-                    payloads.append(payload)
-                    local_ids.append(row['id'])
+                        payloads.append(payload)
+                        local_ids.append(row['id'])
 
                 if not payloads:
                     # Nenhum payload válido para esta tabela
@@ -175,10 +343,10 @@ class SyncManager(QObject):
 
                 if conflict_column:
                     # Usa upsert se houver coluna de conflito definida
-                    api_response = self.api_client.get_client().table(table_name).upsert(payloads, on_conflict=conflict_column).execute()
+                    api_response = self._execute_request(table_name, self.api_client.get_client().table(table_name).upsert(payloads, on_conflict=conflict_column), payloads)
                 else:
                     # Usa insert normal se não houver coluna de conflito
-                    api_response = self.api_client.get_client().table(table_name).insert(payloads).execute()
+                    api_response = self._execute_request(table_name, self.api_client.get_client().table(table_name).insert(payloads), payloads)
 
                 if not isinstance(api_response, APIResponse) or not api_response.data:
                     raise Exception(f"Falha ao inserir em '{table_name}': Resposta inválida da API.")
@@ -190,11 +358,12 @@ class SyncManager(QObject):
                     web_id = new_record['id'] # O 'id' do Supabase
                     update_data.append((str(web_id), local_id))
 
-                cursor.executemany(
-                    f"UPDATE {table_name} SET id_web = ?, sync_status = 'synced' WHERE id = ?",
-                    update_data
-                )
-                conn.commit()
+                with self.metrics.timed(table_name, 'db'):
+                    cursor.executemany(
+                        f"UPDATE {table_name} SET id_web = ?, sync_status = 'synced' WHERE id = ?",
+                        update_data
+                    )
+                    conn.commit()
                 logging.info(f"SyncManager: {len(update_data)} registros de '{table_name}' criados na web e atualizados localmente.")
 
             except Exception as e:
@@ -205,10 +374,14 @@ class SyncManager(QObject):
 
         conn.close()
 
-    def _sync_pending_updates(self):
+    def _sync_pending_updates(self, tables=None):
         """
         Passo 2: Processa todos os registros com 'pending_update'
         Atualiza no Supabase usando o 'id_web'.
+
+        As atualizações são enviadas em lotes (upsert em 'id'), agrupadas por
+        conjunto de colunas. Se um lote falhar, apenas os registros dele são
+        reenviados um a um. 'tables' restringe o processamento às tabelas informadas.
         """
         logging.info("SyncManager: Iniciando _sync_pending_updates...")
         self.sync_status_updated.emit("Atualizando registros...")
@@ -220,42 +393,59 @@ class SyncManager(QObject):
         # Cache para armazenar id_web já consultados (performance)
         web_id_cache = {}
 
-        # Processa todas as tabelas na ordem definida
+        # Processa as tabelas na ordem definida
         for table_name in SYNC_ORDER:
+            if tables is not None and table_name not in tables:
+                continue
             try:
                 # Pegamos apenas os que têm 'pending_update' E já têm um 'id_web'
-                cursor.execute(f"SELECT * FROM {table_name} WHERE sync_status = 'pending_update' AND id_web IS NOT NULL ORDER BY id")
+                # "sync_status != 'synced'" permite ao SQLite usar o índice parcial de pendências
+                cursor.execute(f"SELECT * FROM {table_name} WHERE sync_status = 'pending_update' AND sync_status != 'synced' AND id_web IS NOT NULL ORDER BY id")
                 rows_to_update = cursor.fetchall()
 
                 if not rows_to_update:
                     continue
 
                 logging.info(f"SyncManager: Encontrados {len(rows_to_update)} registros 'pending_update' em '{table_name}'")
-                self.sync_status_updated.emit(f"Atualizando {len(rows_to_update)} itens de '{table_name}'...")
-
-                for row in rows_to_update:
-                    local_id = row['id']
-                    web_id = row['id_web']
-                    payload = self._build_payload(conn, web_id_cache, table_name, row)
 
-                    if payload is None:
-                        # Dependência obrigatória não sincronizada, pula este registro
-                        logging.warning(f"SyncManager: Pulando atualização do registro {local_id} de '{table_name}' devido a dependência não sincronizada")
+                # Registros alterados na web desde a última sincronização vão para o merge
+                stale_ids = self._enqueue_stale_updates(conn, table_name, rows_to_update)
+                if stale_ids:
+                    rows_to_update = [row for row in rows_to_update if row['id'] not in stale_ids]
+                    if not rows_to_update:
                         continue
 
-                    try:
-                        # Envia 1 por 1 para atualização
-                        self.api_client.get_client().table(table_name).update(payload).eq('id', web_id).execute()
+                with self.metrics.timed(table_name, 'build'):
+                    self._preload_id_map(conn, web_id_cache, table_name, rows_to_update)
+                self.sync_status_updated.emit(f"Atualizando {len(rows_to_update)} itens de '{table_name}'...")
+
+                # O PostgREST exige as mesmas chaves em todos os objetos do lote
+                groups = {}
+                with self.metrics.timed(table_name, 'build'):
+                    for row in rows_to_update:
+                        payload = self._build_payload(conn, web_id_cache, table_name, row)
+
+                        if payload is None:
+                            # Dependência obrigatória não sincronizada, pula este registro
+                            logging.warning(f"SyncManager: Pulando atualização do registro {row['id']} de '{table_name}' devido a dependência não sincronizada")
+                            continue
 
-                        # Se sucesso, atualiza o status local
-                        cursor.execute(f"UPDATE {table_name} SET sync_status = 'synced' WHERE id = ?", (local_id,))
+                        payload['id'] = row['id_web']
+                        groups.setdefault(tuple(sorted(payload.keys())), []).append((row['id'], payload))
 
-                    except Exception as e:
-                        logging.error(f"SyncManager: Falha ao atualizar item {local_id} (web_id: {web_id}) em '{table_name}': {e}", exc_info=True)
-                        self.sync_status_updated.emit(f"Erro ao atualizar item em '{table_name}'")
-                        # Não para o loop, tenta o próximo item
+                synced_ids = []
+                for entries in groups.values():
+                    for i in range(0, len(entries), UPDATE_BATCH_SIZE):
+                        synced_ids.extend(self._upload_update_batch(table_name, entries[i:i + UPDATE_BATCH_SIZE]))
 
-                conn.commit() # Commita os sucessos do loop
+                # Se sucesso, atualiza o status local
+                with self.metrics.timed(table_name, 'db'):
+                    cursor.executemany(
+                        f"UPDATE {table_name} SET sync_status = 'synced' WHERE id = ?",
+                        [(local_id,) for local_id in synced_ids]
+                    )
+                    conn.commit() # Commita os sucessos
+                logging.info(f"SyncManager: {len(synced_ids)}/{len(rows_to_update)} registros de '{table_name}' atualizados na web.")
 
             except Exception as e:
                 logging.error(f"SyncManager: Erro ao processar 'pending_update' para tabela {table_name}: {e}", exc_info=True)
@@ -264,109 +454,660 @@ class SyncManager(QObject):
 
         conn.close()
 
-    def _sync_web_to_local(self, new_sync_timestamp: str):
+    def _upload_update_batch(self, table_name: str, entries: list) -> list:
+        """
+        Envia um lote de atualizações com upsert em 'id'.
+        'entries' é uma lista de (id_local, payload). Retorna os ids locais enviados com sucesso.
+        O upsert só recebe os registros que ainda existem na web: como no UPDATE
+        registro a registro, uma edição local não recria um registro excluído na web.
+        """
+        try:
+            web_ids = [payload['id'] for _, payload in entries]
+            query = self.api_client.get_client().table(table_name).select("id").in_("id", web_ids)
+            api_response = self._execute_request(table_name, query)
+            existing = {str(row['id']) for row in (getattr(api_response, 'data', None) or [])}
+
+            payloads = [payload for _, payload in entries if str(payload['id']) in existing]
+            if len(payloads) < len(entries):
+                logging.info(f"SyncManager: {len(entries) - len(payloads)} atualizações em '{table_name}' ignoradas (registros excluídos na web).")
+            if payloads:
+                self._execute_request(table_name, self.api_client.get_client().table(table_name).upsert(payloads, on_conflict='id'), payloads)
+            return [local_id for local_id, _ in entries]
+        except Exception as e:
+            logging.warning(f"SyncManager: Lote de {len(entries)} atualizações em '{table_name}' falhou ({e}). Reenviando individualmente.")
+
+        synced_ids = []
+        for local_id, payload in entries:
+            web_id = payload['id']
+            row_payload = {k: v for k, v in payload.items() if k != 'id'}
+            try:
+                self._execute_request(table_name, self.api_client.get_client().table(table_name).update(row_payload).eq('id', web_id), row_payload, retry=True)
+                synced_ids.append(local_id)
+            except Exception as e:
+                logging.error(f"SyncManager: Falha ao atualizar item {local_id} (web_id: {web_id}) em '{table_name}': {e}", exc_info=True)
+                self.sync_status_updated.emit(f"Erro ao atualizar item em '{table_name}'")
+                # Não para o loop, tenta o próximo item
+        return synced_ids
+
+    def _sync_web_to_local(self, new_sync_timestamp: str) -> bool:
         """
         Passo 3: Processa dados da web (Supabase) e os insere/atualiza
         no banco de dados local (SQLite).
+
+        O download é paginado (keyset por updated_at, id) e cada página é gravada
+        em uma única transação com INSERT ... ON CONFLICT(id_web) DO UPDATE.
+        As tabelas independentes são baixadas em paralelo; as dependentes seguem
+        a ordem de SYNC_ORDER, já buscando a próxima página enquanto a atual é gravada.
+
+        Cada tabela tem seu checkpoint (sync_checkpoints), gravado junto com cada
+        página: uma tabela que falhar retoma do último lote gravado, sem obrigar
+        as demais a baixarem a janela de novo. Tabelas cujo pai falhou ficam
+        para a próxima sincronização.
+
+        Returns:
+            bool: True se todas as tabelas foram baixadas
         """
         logging.info("SyncManager: Iniciando _sync_web_to_local...")
         self.sync_status_updated.emit("Baixando atualizações...")
 
-        last_sync_timestamp = self.settings_repo.get_setting('last_sync_timestamp')
-        if not last_sync_timestamp:
-            last_sync_timestamp = '1970-01-01T00:00:00+00:00' # Fallback
-
-        logging.info(f"SyncManager: Buscando alterações entre {last_sync_timestamp} e {new_sync_timestamp}")
+        # Usado para tabelas que ainda não possuem checkpoint
+        default_timestamp = self.settings_repo.get_setting('last_sync_timestamp')
+        if not default_timestamp:
+            default_timestamp = '1970-01-01T00:00:00+00:00' # Fallback
 
         conn = get_db_connection()
-        cursor = conn.cursor()
         local_id_cache = {} # Cache para _get_local_id
+        checkpoints = self._load_checkpoints(conn)
+        self._download_retries = self._load_download_retries(conn)
+        failed_tables = set()
+
+        def window(table_name):
+            checkpoint = checkpoints.get(table_name, {})
+            last_sync_timestamp = checkpoint.get('synced_until') or default_timestamp
+            after = None
+            if checkpoint.get('cursor_updated_at') and checkpoint.get('cursor_id') is not None:
+                after = (checkpoint['cursor_updated_at'], checkpoint['cursor_id'])
+                logging.info(f"SyncManager: Retomando '{table_name}' a partir de {after}.")
+            logging.info(f"SyncManager: Buscando alterações de '{table_name}' entre {last_sync_timestamp} e {new_sync_timestamp}")
+            return last_sync_timestamp, after
+
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            # 1. Tabelas independentes: downloads simultâneos, gravação sequencial (SQLite)
+            independent_futures = {
+                table_name: executor.submit(self._fetch_all_changes, table_name, *window(table_name), new_sync_timestamp)
+                for table_name in SYNC_ORDER if table_name in SYNC_TABLES_INDEPENDENT
+            }
+            for table_name, future in independent_futures.items():
+                try:
+                    self.sync_status_updated.emit(f"Verificando '{table_name}'...")
+                    records = future.result()
+                    for i in range(0, len(records), DOWNLOAD_PAGE_SIZE):
+                        self._apply_web_chunk(conn, local_id_cache, table_name, records[i:i + DOWNLOAD_PAGE_SIZE])
+                    self._retry_failed_downloads(conn, local_id_cache, table_name)
+                    self._complete_checkpoint(conn, table_name, new_sync_timestamp)
+                except Exception as e:
+                    logging.error(f"SyncManager: Erro ao processar _sync_web_to_local para tabela {table_name}: {e}", exc_info=True)
+                    self.sync_status_updated.emit(f"Erro ao baixar '{table_name}': {e}")
+                    conn.rollback()
+                    failed_tables.add(table_name)
+
+            # 2. Tabelas dependentes: na ordem (pais primeiro), página a página
+            for table_name in SYNC_ORDER:
+                if table_name in SYNC_TABLES_INDEPENDENT:
+                    continue
 
-        # Loop na ordem de sincronização (pais primeiro)
-        for table_name in SYNC_ORDER:
-            try:
-                # 1. Busca dados da web que mudaram
-                self.sync_status_updated.emit(f"Verificando '{table_name}'...")
-                api_response = self.api_client.get_client().table(table_name).select("*") \
-                    .gt("updated_at", last_sync_timestamp) \
-                    .lt("updated_at", new_sync_timestamp) \
-                    .execute()
-
-                if not isinstance(api_response, APIResponse) or not api_response.data:
+                failed_parents = failed_tables.intersection(FOREIGN_KEYS.get(table_name, {}).values())
+                if failed_parents:
+                    # Sem os pais, os registros seriam descartados e o checkpoint avançaria sobre eles
+                    logging.warning(f"SyncManager: '{table_name}' adiada para a próxima sincronização (falha em {', '.join(sorted(failed_parents))}).")
+                    failed_tables.add(table_name)
                     continue
 
-                data_from_web = api_response.data
-                logging.info(f"SyncManager: Recebidos {len(data_from_web)} registros atualizados de '{table_name}'.")
+                try:
+                    self.sync_status_updated.emit(f"Verificando '{table_name}'...")
+                    received = 0
+                    last_sync_timestamp, after = window(table_name)
+                    for page in self._iter_changed_pages(executor, table_name, last_sync_timestamp, new_sync_timestamp, after):
+                        self._apply_web_chunk(conn, local_id_cache, table_name, page)
+                        received += len(page)
+                        self.sync_status_updated.emit(f"Baixando '{table_name}': {received} registros...")
+                    self._retry_failed_downloads(conn, local_id_cache, table_name)
+                    self._complete_checkpoint(conn, table_name, new_sync_timestamp)
+                except Exception as e:
+                    logging.error(f"SyncManager: Erro ao processar _sync_web_to_local para tabela {table_name}: {e}", exc_info=True)
+                    self.sync_status_updated.emit(f"Erro ao baixar '{table_name}': {e}")
+                    conn.rollback()
+                    failed_tables.add(table_name)
 
-                # 2. Processa cada registro (Insere ou Atualiza localmente)
-                for web_record in data_from_web:
-                    web_id = web_record['id']
+        conn.close()
+        return not failed_tables
 
-                    # Constrói o payload (Por enquanto, sem tradução de FK)
-                    payload = self._build_local_payload(conn, local_id_cache, table_name, web_record)
-                    if not payload:
-                        logging.warning(f"SyncManager: Falha ao construir payload local para {table_name} (web_id: {web_id}). Pulando.")
-                        continue
+    def _load_checkpoints(self, conn: sqlite3.Connection) -> dict:
+        """Carrega os checkpoints de download por tabela."""
+        try:
+            rows = conn.execute("SELECT table_name, synced_until, cursor_updated_at, cursor_id FROM sync_checkpoints").fetchall()
+            return {row['table_name']: dict(row) for row in rows}
+        except sqlite3.Error as e:
+            logging.warning(f"SyncManager: Não foi possível carregar os checkpoints de sincronização: {e}")
+            return {}
+
+    def _load_download_retries(self, conn: sqlite3.Connection) -> dict:
+        """Carrega os registros da web a baixar de novo: {tabela: {id_web: tentativas}}."""
+        retries = {}
+        try:
+            for row in conn.execute("SELECT table_name, id_web, attempts FROM sync_download_retries"):
+                retries.setdefault(row['table_name'], {})[row['id_web']] = row['attempts']
+        except sqlite3.Error as e:
+            logging.warning(f"SyncManager: Não foi possível carregar os registros a baixar de novo: {e}")
+        return retries
 
-                    # Verifica se o registro já existe localmente
-                    cursor.execute(f"SELECT id FROM {table_name} WHERE id_web = ?", (str(web_id),))
-                    local_record = cursor.fetchone()
+    def _record_download_failures(self, cursor: sqlite3.Cursor, table_name: str, web_records: list, failed: dict):
+        """
+        Guarda em sync_download_retries os registros do lote que não puderam ser gravados
+        ('failed' = {id_web: erro}), já que o checkpoint avança sobre eles, e tira da
+        fila os que desta vez foram gravados. Roda na transação do próprio lote.
+        """
+        if failed:
+            cursor.executemany("""
+                INSERT INTO sync_download_retries (table_name, id_web, last_error)
+                VALUES (?, ?, ?)
+                ON CONFLICT(table_name, id_web) DO UPDATE SET
+                    attempts = attempts + 1,
+                    last_error = excluded.last_error,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [(table_name, id_web, error) for id_web, error in failed.items()])
+            logging.warning(f"SyncManager: {len(failed)} registros de '{table_name}' não gravados; serão baixados de novo na próxima sincronização.")
+
+        pending = self._download_retries.get(table_name)
+        if pending:
+            done = [str(record['id']) for record in web_records
+                    if str(record['id']) in pending and str(record['id']) not in failed]
+            if done:
+                cursor.executemany("DELETE FROM sync_download_retries WHERE table_name = ? AND id_web = ?",
+                                   [(table_name, id_web) for id_web in done])
+                for id_web in done:
+                    del pending[id_web]
+
+    def _retry_failed_downloads(self, conn: sqlite3.Connection, cache: dict, table_name: str):
+        """
+        Baixa de novo, por id, os registros da tabela que não puderam ser gravados nas
+        sincronizações anteriores (sync_download_retries). Os que não existem mais na
+        web saem da fila. Falhas aqui não impedem a conclusão da tabela.
+        """
+        pending = self._download_retries.get(table_name)
+        if not pending:
+            return
+        id_webs = [id_web for id_web, attempts in pending.items() if attempts < DOWNLOAD_RETRY_MAX_ATTEMPTS]
+        if not id_webs:
+            return
 
-                    # Adiciona o id_web e sync_status ao payload
-                    payload['id_web'] = str(web_id)
-                    payload['sync_status'] = 'synced'
+        logging.info(f"SyncManager: Baixando de novo {len(id_webs)} registros de '{table_name}' não gravados anteriormente.")
+        try:
+            for i in range(0, len(id_webs), UPDATE_BATCH_SIZE):
+                chunk = id_webs[i:i + UPDATE_BATCH_SIZE]
+                query = self.api_client.get_client().table(table_name).select("*").in_("id", chunk)
+                api_response = self._execute_request(table_name, query)
+                if not isinstance(api_response, APIResponse):
+                    continue
+                records = api_response.data or []
+                self._apply_web_chunk(conn, cache, table_name, records, save_checkpoint=False)
+
+                found = {str(record['id']) for record in records}
+                gone = [id_web for id_web in chunk if id_web not in found]
+                if gone:
+                    conn.executemany("DELETE FROM sync_download_retries WHERE table_name = ? AND id_web = ?",
+                                     [(table_name, id_web) for id_web in gone])
+                    conn.commit()
+                    for id_web in gone:
+                        pending.pop(id_web, None)
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"SyncManager: Falha ao baixar de novo registros de '{table_name}': {e}")
+
+    def _save_checkpoint_cursor(self, cursor: sqlite3.Cursor, table_name: str, last_record: dict):
+        """Grava o (updated_at, id) do último registro do lote, na transação do próprio lote."""
+        cursor.execute("""
+            INSERT INTO sync_checkpoints (table_name, cursor_updated_at, cursor_id, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(table_name) DO UPDATE SET
+                cursor_updated_at = excluded.cursor_updated_at,
+                cursor_id = excluded.cursor_id,
+                updated_at = excluded.updated_at
+        """, (table_name, last_record['updated_at'], last_record['id']))
+
+    def _complete_checkpoint(self, conn: sqlite3.Connection, table_name: str, new_sync_timestamp: str):
+        """Marca a janela da tabela como concluída e limpa o cursor."""
+        conn.execute("""
+            INSERT INTO sync_checkpoints (table_name, synced_until, cursor_updated_at, cursor_id, updated_at)
+            VALUES (?, ?, NULL, NULL, CURRENT_TIMESTAMP)
+            ON CONFLICT(table_name) DO UPDATE SET
+                synced_until = excluded.synced_until,
+                cursor_updated_at = NULL,
+                cursor_id = NULL,
+                updated_at = excluded.updated_at
+        """, (table_name, new_sync_timestamp))
+        conn.commit()
+
+    def _fetch_changed_page(self, table_name: str, last_sync_timestamp: str, new_sync_timestamp: str, after: tuple | None) -> list:
+        """
+        Busca uma página de registros alterados na janela (last_sync, new_sync),
+        ordenada por (updated_at, id). 'after' é o (updated_at, id) do último
+        registro da página anterior. No modo loja, as tabelas de
+        TERMINAL_SCOPED_TABLES trazem apenas os registros deste terminal.
+        """
+        query = self.api_client.get_client().table(table_name).select("*") \
+            .gt("updated_at", last_sync_timestamp) \
+            .lt("updated_at", new_sync_timestamp)
 
-                    if local_record:
-                        # --- UPDATE LOCAL ---
-                        local_id = local_record[0]
+        if table_name in TERMINAL_SCOPED_TABLES and is_store_mode():
+            query = query.eq("terminal_id", get_terminal_id())
 
-                        # Garantir que o sync_status esteja 'synced' para não causar loop
-                        payload['sync_status'] = 'synced'
+        if after:
+            after_updated_at, after_id = after
+            query = query.or_(f'updated_at.gt."{after_updated_at}",and(updated_at.eq."{after_updated_at}",id.gt.{after_id})')
 
-                        # Remover chaves que não devem ser nulas se o valor for None
-                        # (O _build_local_payload já fez a maior parte disso)
-                        final_payload = {k: v for k, v in payload.items() if v is not None}
+        api_response = self._execute_request(table_name, query.order("updated_at").order("id").limit(DOWNLOAD_PAGE_SIZE))
 
-                        set_clause = ", ".join([f"{key} = ?" for key in final_payload.keys()])
-                        values = list(final_payload.values()) + [local_id]
+        if not isinstance(api_response, APIResponse) or not api_response.data:
+            return []
+        return api_response.data
 
-                        if not set_clause:
-                            logging.warning(f"SyncManager: Pulando UPDATE local de {table_name} (id_web: {web_id}) pois não há campos para atualizar.")
-                            continue
+    def _iter_changed_pages(self, executor: ThreadPoolExecutor, table_name: str, last_sync_timestamp: str, new_sync_timestamp: str, after: tuple | None = None):
+        """
+        Gerador de páginas de registros alterados. A próxima página é solicitada
+        ao executor assim que a atual chega, antes de ela ser gravada.
+        'after' retoma a partir de um checkpoint (updated_at, id).
+        """
+        future = executor.submit(self._fetch_changed_page, table_name, last_sync_timestamp, new_sync_timestamp, after)
+        while future is not None:
+            page = future.result()
+            future = None
+            if len(page) == DOWNLOAD_PAGE_SIZE:
+                last_record = page[-1]
+                future = executor.submit(self._fetch_changed_page, table_name, last_sync_timestamp, new_sync_timestamp,
+                                         (last_record['updated_at'], last_record['id']))
+            if page:
+                logging.info(f"SyncManager: Recebidos {len(page)} registros atualizados de '{table_name}'.")
+                yield page
+
+    def _fetch_all_changes(self, table_name: str, last_sync_timestamp: str, after: tuple | None, new_sync_timestamp: str) -> list:
+        """
+        Baixa todas as páginas de uma tabela (usado nas tabelas independentes, que são pequenas).
+        'after' retoma a partir de um checkpoint (updated_at, id).
+        """
+        records = []
+        while True:
+            page = self._fetch_changed_page(table_name, last_sync_timestamp, new_sync_timestamp, after)
+            records.extend(page)
+            if len(page) < DOWNLOAD_PAGE_SIZE:
+                break
+            after = (page[-1]['updated_at'], page[-1]['id'])
+        if records:
+            logging.info(f"SyncManager: Recebidos {len(records)} registros atualizados de '{table_name}'.")
+        return records
+
+    def _apply_web_chunk(self, conn: sqlite3.Connection, cache: dict, table_name: str, web_records: list,
+                         save_checkpoint: bool = True):
+        """
+        Grava um lote de registros da web no SQLite em uma única transação,
+        com INSERT ... ON CONFLICT(id_web) DO UPDATE agrupado por conjunto de colunas.
+        Se um grupo falhar (ex: violação de outra chave única), apenas as suas
+        linhas são regravadas uma a uma; as que falharem (e as que nem geraram
+        payload) vão para sync_download_retries, para serem baixadas de novo.
+        Registros com alteração local pendente não são sobrescritos: se a web
+        também os alterou, vão para a fila de merge (sync_conflicts).
+        O checkpoint da tabela é gravado na mesma transação (save_checkpoint).
+        """
+        if not web_records:
+            return
 
-                        cursor.execute(f"UPDATE {table_name} SET {set_clause} WHERE id = ?", values)
+        with self.metrics.timed(table_name, 'build'):
+            self._preload_id_map(conn, cache, table_name, web_records, to_web=False)
+            pending_updates = self._find_pending_updates(conn, table_name)
+            bases = self._load_sync_bases(conn, table_name, list(pending_updates.values())) if pending_updates else {}
+
+            groups = {}
+            conflicts = []
+            failed = {}
+            for web_record in web_records:
+                web_id = web_record['id']
+
+                # Constrói o payload traduzindo as FKs (web -> local)
+                payload = self._build_local_payload(conn, cache, table_name, web_record)
+                if not payload:
+                    logging.warning(f"SyncManager: Falha ao construir payload local para {table_name} (web_id: {web_id}). Pulando.")
+                    failed[str(web_id)] = "Falha ao construir payload local"
+                    continue
 
-                    else:
-                        # --- INSERT LOCAL ---
-                        # Agora habilitado para TODAS as tabelas, pois
-                        # _build_local_payload traduz as FKs.
+                local_id = pending_updates.get(str(web_id))
+                if local_id is not None:
+                    # Alteração local ainda não enviada: não sobrescreve. Se a web também
+                    # mudou desde a base, o registro vai para a fila de merge.
+                    base = bases.get(local_id)
+                    if base is None or self._differs_from_base(payload, base[0]):
+                        conflicts.append((local_id, str(web_id), web_record.get('updated_at'), payload))
+                    continue
 
-                        # Garantir que o sync_status esteja 'synced'
-                        payload['sync_status'] = 'synced'
-                        payload['id_web'] = str(web_id) # id_web é obrigatório no insert
+                # Garantir que o sync_status esteja 'synced' para não causar loop
+                payload['id_web'] = str(web_id)
+                payload['sync_status'] = 'synced'
 
-                        # Remover chaves nulas que não têm valor padrão
-                        final_payload = {k: v for k, v in payload.items() if v is not None}
+                # Remover chaves nulas (não sobrescreve colunas NOT NULL com NULL)
+                final_payload = {k: v for k, v in payload.items() if v is not None}
+                columns = tuple(sorted(final_payload.keys()))
+                groups.setdefault(columns, []).append(tuple(final_payload[c] for c in columns))
 
-                        columns = ", ".join(final_payload.keys())
-                        placeholders = ", ".join(["?" for _ in final_payload.keys()])
-                        values = list(final_payload.values())
+        with self.metrics.timed(table_name, 'db'):
+            cursor = conn.cursor()
+            if not conn.in_transaction:
+                cursor.execute("BEGIN")
+
+            for columns, rows in groups.items():
+                update_clause = ", ".join(f"{col} = excluded.{col}" for col in columns if col != 'id_web')
+                sql = (
+                    f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+                    f"ON CONFLICT(id_web) DO UPDATE SET {update_clause}"
+                )
 
-                        if not columns:
-                            logging.warning(f"SyncManager: Pulando INSERT local de {table_name} (id_web: {web_id}) pois não há campos para inserir.")
-                            continue
+                cursor.execute("SAVEPOINT sync_chunk")
+                try:
+                    cursor.executemany(sql, rows)
+                    cursor.execute("RELEASE SAVEPOINT sync_chunk")
+                except sqlite3.Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT sync_chunk")
+                    cursor.execute("RELEASE SAVEPOINT sync_chunk")
+                    logging.warning(f"SyncManager: Lote de '{table_name}' falhou ({e}). Gravando {len(rows)} registros individualmente.")
+                    id_web_index = columns.index('id_web')
+                    for row in rows:
+                        try:
+                            cursor.execute(sql, row)
+                        except sqlite3.Error as row_error:
+                            logging.error(f"SyncManager: Falha ao gravar {table_name} (id_web: {row[id_web_index]}) localmente: {row_error}")
+                            failed[str(row[id_web_index])] = str(row_error)
+
+            if conflicts:
+                self._enqueue_conflicts(cursor, table_name, conflicts)
+                logging.warning(f"SyncManager: {len(conflicts)} registros de '{table_name}' alterados localmente e na web enviados para merge.")
+
+            self._record_download_failures(cursor, table_name, web_records, failed)
+            if save_checkpoint:
+                self._save_checkpoint_cursor(cursor, table_name, web_records[-1])
+            conn.commit()
+
+    def _find_pending_updates(self, conn: sqlite3.Connection, table_name: str) -> dict:
+        """Registros com alteração local pendente que já existem na web: {id_web: id local}."""
+        cursor = conn.execute(
+            f"SELECT id, id_web FROM {table_name} WHERE sync_status = 'pending_update' AND sync_status != 'synced' AND id_web IS NOT NULL"
+        )
+        return {str(row['id_web']): row['id'] for row in cursor.fetchall()}
+
+    def _load_sync_bases(self, conn: sqlite3.Connection, table_name: str, local_ids: list) -> dict:
+        """Carrega as versões base (sync_base): {id local: (dados, local_modified_at)}."""
+        bases = {}
+        for i in range(0, len(local_ids), ID_MAP_QUERY_CHUNK):
+            chunk = local_ids[i:i + ID_MAP_QUERY_CHUNK]
+            rows = conn.execute(
+                f"SELECT local_id, data, local_modified_at FROM sync_base WHERE table_name = ? AND local_id IN ({', '.join('?' for _ in chunk)})",
+                [table_name, *chunk]
+            ).fetchall()
+            for row in rows:
+                bases[row['local_id']] = (json.loads(row['data']), row['local_modified_at'])
+        return bases
+
+    def _differs_from_base(self, web_payload: dict, base: dict) -> bool:
+        """True se a versão da web (formato local) mudou algum campo em relação à base."""
+        return any(not _values_equal(value, base[field]) for field, value in web_payload.items() if field in base)
+
+    def _enqueue_conflicts(self, cursor: sqlite3.Cursor, table_name: str, conflicts: list):
+        """
+        Registra na fila sync_conflicts os registros alterados localmente e na web.
+        'conflicts' é uma lista de (id local, id_web, updated_at da web, payload local da web).
+        Um registro já pendente na fila recebe a versão mais nova da web.
+        """
+        cursor.executemany("""
+            INSERT INTO sync_conflicts (table_name, local_id, id_web, web_updated_at, web_data)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(table_name, local_id) WHERE status = 'pending' DO UPDATE SET
+                id_web = excluded.id_web,
+                web_updated_at = excluded.web_updated_at,
+                web_data = excluded.web_data,
+                detected_at = excluded.detected_at
+        """, [(table_name, local_id, web_id, web_updated_at, json.dumps(payload, default=str))
+              for local_id, web_id, web_updated_at, payload in conflicts])
+
+    def _enqueue_stale_updates(self, conn: sqlite3.Connection, table_name: str, rows: list) -> set:
+        """
+        Antes de enviar atualizações, busca na web (uma consulta por lote) a versão
+        atual dos registros que possuem base. Os que foram alterados na web desde a
+        base vão para a fila de merge em vez de sobrescrever a alteração do outro
+        terminal.
 
-                        cursor.execute(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", values)
+        Returns:
+            set: ids locais enviados para a fila
+        """
+        bases = self._load_sync_bases(conn, table_name, [row['id'] for row in rows])
+        if not bases:
+            return set()
+
+        local_by_web_id = {str(row['id_web']): row['id'] for row in rows if row['id'] in bases}
+        web_ids = list(local_by_web_id)
+        local_id_cache = {}
+        stale = []
+
+        for i in range(0, len(web_ids), UPDATE_BATCH_SIZE):
+            query = self.api_client.get_client().table(table_name).select("*").in_("id", web_ids[i:i + UPDATE_BATCH_SIZE])
+            api_response = self._execute_request(table_name, query)
+            if not isinstance(api_response, APIResponse) or not api_response.data:
+                continue
+
+            with self.metrics.timed(table_name, 'build'):
+                self._preload_id_map(conn, local_id_cache, table_name, api_response.data, to_web=False)
+                for web_record in api_response.data:
+                    local_id = local_by_web_id.get(str(web_record['id']))
+                    payload = self._build_local_payload(conn, local_id_cache, table_name, web_record)
+                    if local_id is not None and payload and self._differs_from_base(payload, bases[local_id][0]):
+                        stale.append((local_id, str(web_record['id']), web_record.get('updated_at'), payload))
 
-                    # Commit para cada registro processado
-                    conn.commit()
+        if stale:
+            with self.metrics.timed(table_name, 'db'):
+                self._enqueue_conflicts(conn.cursor(), table_name, stale)
+                conn.commit()
+            logging.warning(f"SyncManager: {len(stale)} atualizações de '{table_name}' foram alteradas também na web; enviadas para merge.")
+        return {local_id for local_id, *_ in stale}
+
+    def _resolve_and_push_conflicts(self, tables=None):
+        """Resolve a fila de conflitos e envia os registros mesclados."""
+        merged_tables = self._resolve_conflicts(tables)
+        if merged_tables:
+            self._sync_pending_updates(merged_tables)
 
+    def _resolve_conflicts(self, tables=None) -> set:
+        """
+        Resolve em lote a fila sync_conflicts, uma transação por tabela (ver
+        _merge_record). O registro local recebe o resultado do merge: fica
+        'synced' se for igual à versão da web, ou 'pending_update' (com a versão
+        da web como nova base) para que o resultado seja enviado uma única vez.
+        'tables' restringe a resolução às tabelas informadas.
+
+        Returns:
+            set: tabelas com registros mesclados aguardando envio
+        """
+        conn = get_db_connection()
+        merged_tables = set()
+        try:
+            pending = conn.execute("SELECT * FROM sync_conflicts WHERE status = 'pending' ORDER BY id").fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"SyncManager: Não foi possível ler a fila de conflitos de sincronização: {e}")
+            conn.close()
+            return merged_tables
+
+        by_table = {}
+        for conflict in pending:
+            by_table.setdefault(conflict['table_name'], []).append(conflict)
+
+        for table_name in SYNC_ORDER:
+            conflicts = by_table.get(table_name)
+            if not conflicts or (tables is not None and table_name not in tables):
+                continue
+            try:
+                with self.metrics.timed(table_name, 'db'):
+                    conflicted, needs_upload = self._resolve_table_conflicts(conn, table_name, conflicts)
+                    conn.commit()
+                if needs_upload:
+                    merged_tables.add(table_name)
+                logging.info(f"SyncManager: {len(conflicts)} registros de '{table_name}' mesclados ({conflicted} com conflito de campos).")
             except Exception as e:
-                logging.error(f"SyncManager: Erro ao processar _sync_web_to_local para tabela {table_name}: {e}", exc_info=True)
-                self.sync_status_updated.emit(f"Erro ao baixar '{table_name}': {e}")
+                logging.error(f"SyncManager: Erro ao resolver conflitos de '{table_name}': {e}", exc_info=True)
                 conn.rollback()
 
+        try:
+            conn.execute(
+                "DELETE FROM sync_conflicts WHERE status = 'resolved' AND resolved_at < datetime('now', ?)",
+                (f"-{RESOLVED_CONFLICTS_RETENTION_DAYS} days",)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"SyncManager: Não foi possível limpar conflitos antigos: {e}")
         conn.close()
+        return merged_tables
+
+    def _resolve_table_conflicts(self, conn: sqlite3.Connection, table_name: str, conflicts: list) -> tuple:
+        """
+        Aplica o merge dos conflitos de uma tabela (sem commit).
+
+        Returns:
+            tuple: (registros com conflito de campos, se há registros a enviar)
+        """
+        cursor = conn.cursor()
+        local_ids = [conflict['local_id'] for conflict in conflicts]
+        local_rows = {}
+        for i in range(0, len(local_ids), ID_MAP_QUERY_CHUNK):
+            chunk = local_ids[i:i + ID_MAP_QUERY_CHUNK]
+            cursor.execute(f"SELECT * FROM {table_name} WHERE id IN ({', '.join('?' for _ in chunk)})", chunk)
+            local_rows.update({row['id']: row for row in cursor.fetchall()})
+        bases = self._load_sync_bases(conn, table_name, local_ids)
+
+        conflicted = 0
+        needs_upload = False
+        for conflict in conflicts:
+            web = json.loads(conflict['web_data'])
+            local = local_rows.get(conflict['local_id'])
+            resolution = {}
+
+            if local is not None:  # Registro excluído localmente: nada a mesclar
+                base, local_modified_at = bases.get(local['id'], (None, None))
+                if local['sync_status'] == 'pending_update':
+                    merged, resolution = self._merge_record(table_name, base, local, web,
+                                                            conflict['web_updated_at'], local_modified_at)
+                else:
+                    # A alteração local já foi enviada: vale a versão da web
+                    merged = {field: value for field, value in web.items() if field in local.keys()}
+
+                changes = {field: value for field, value in merged.items() if not _values_equal(local[field], value)}
+                pending_upload = any(not _values_equal(value, web[field]) for field, value in merged.items())
+                assignments = [f"{field} = ?" for field in changes] + ["sync_status = ?"]
+                cursor.execute(
+                    f"UPDATE {table_name} SET {', '.join(assignments)} WHERE id = ?",
+                    [*changes.values(), 'pending_update' if pending_upload else 'synced', local['id']]
+                )
+
+                if pending_upload:
+                    # A versão da web passa a ser a base do próximo merge
+                    if base is None:
+                        base = {key: local[key] for key in local.keys() if key not in ('id', 'id_web', 'sync_status')}
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO sync_base (table_name, local_id, data, local_modified_at) VALUES (?, ?, ?, ?)",
+                        (table_name, local['id'], json.dumps({**base, **web}, default=str),
+                         local_modified_at or datetime.now(timezone.utc).isoformat())
+                    )
+                    needs_upload = True
+
+            if resolution:
+                conflicted += 1
+            cursor.execute(
+                "UPDATE sync_conflicts SET status = 'resolved', resolution = ?, resolved_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (json.dumps(resolution), conflict['id'])
+            )
+        return conflicted, needs_upload
+
+    def _merge_record(self, table_name: str, base: dict | None, local: sqlite3.Row, web: dict,
+                      web_updated_at: str | None, local_modified_at: str | None) -> tuple:
+        """
+        Merge de três vias, campo a campo, entre a versão local, a da web e a base
+        (última versão sincronizada):
+        - campo alterado de um só lado: fica a alteração;
+        - alterado dos dois lados: nos campos de ADDITIVE_FIELDS os deltas são
+          somados (local + web - base, ex: vendas de estoque nos dois terminais);
+          nos demais vence a alteração mais recente (local_modified_at x updated_at
+          da web; a web vence se algum dos horários for desconhecido).
+        Sem base, todo campo diferente é tratado como alterado dos dois lados.
+
+        Returns:
+            tuple: (campos mesclados, {campo: 'local' | 'web' | 'soma'} dos campos em conflito)
+        """
+        additive_fields = ADDITIVE_FIELDS.get(table_name, set())
+        local_time, web_time = _parse_utc(local_modified_at), _parse_utc(web_updated_at)
+        local_wins = bool(local_time and web_time and local_time > web_time)
+
+        merged, resolution = {}, {}
+        local_columns = local.keys()
+        for field, web_value in web.items():
+            if field not in local_columns:
+                continue
+            local_value = local[field]
+            base_value = base.get(field, _MISSING) if base else _MISSING
+
+            if _values_equal(local_value, web_value):
+                merged[field] = local_value
+            elif base_value is not _MISSING and _values_equal(local_value, base_value):
+                merged[field] = web_value
+            elif base_value is not _MISSING and _values_equal(web_value, base_value):
+                merged[field] = local_value
+            elif field in additive_fields and all(isinstance(v, (int, float)) for v in (local_value, web_value, base_value)):
+                merged[field] = local_value + (web_value - base_value)
+                resolution[field] = 'soma'
+            else:
+                merged[field] = local_value if local_wins else web_value
+                resolution[field] = 'local' if local_wins else 'web'
+        return merged, resolution
+
+    def _preload_id_map(self, conn: sqlite3.Connection, cache: dict, table_name: str, records: list, to_web: bool = True):
+        """
+        Carrega no cache, com uma consulta IN (...) ao id_map por tabela pai, a
+        tradução das FKs de um lote: id local -> id_web no upload (to_web=True)
+        e id_web -> id local no download. IDs que não estiverem no id_map
+        continuam sendo resolvidos por _get_web_id / _get_local_id.
+        """
+        foreign_keys = FOREIGN_KEYS.get(table_name)
+        if not foreign_keys or not records:
+            return
+
+        record_columns = set(records[0].keys())
+        ids_by_parent = {}
+        for column, parent_table in foreign_keys.items():
+            if column not in record_columns:
+                continue
+            ids = ids_by_parent.setdefault(parent_table, set())
+            for record in records:
+                value = record[column]
+                if value and f"{parent_table}_{value}" not in cache:
+                    ids.add(value if to_web else str(value))
+
+        source, target = ('local_id', 'web_id') if to_web else ('web_id', 'local_id')
+        try:
+            cursor = conn.cursor()
+            for parent_table, ids in ids_by_parent.items():
+                ids = list(ids)
+                for i in range(0, len(ids), ID_MAP_QUERY_CHUNK):
+                    chunk = ids[i:i + ID_MAP_QUERY_CHUNK]
+                    cursor.execute(
+                        f"SELECT {source}, {target} FROM id_map WHERE table_name = ? AND {source} IN ({', '.join('?' for _ in chunk)})",
+                        [parent_table, *chunk]
+                    )
+                    for row in cursor.fetchall():
+                        cache[f"{parent_table}_{row[source]}"] = row[target]
+        except sqlite3.Error as e:
+            logging.warning(f"SyncManager: Não foi possível pré-carregar o id_map para '{table_name}': {e}")
 
     def _get_local_id(self, conn: sqlite3.Connection, cache: dict, table_name: str, web_id: str) -> int | None:
         """
@@ -567,6 +1308,8 @@ class SyncManager(QObject):
         payload.pop('id_web', None)
         payload.pop('sync_status', None)
         payload.pop('last_modified_at', None)
+        if not is_store_mode():
+            payload.pop('terminal_id', None) # Só existe no Supabase das lojas com vários terminais
 
         # 2. Remover colunas "virtuais" ou "JOINED" que não existem no Supabase
         if table_name == 'sales':
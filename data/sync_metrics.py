@@ -0,0 +1,138 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from .sync_repository import save_sync_metrics
+
+# Campos acumulados por tabela em uma execução
+_COUNTERS = ('rows_up', 'rows_down', 'bytes_up', 'bytes_down', 'requests', 'retries', 'errors')
+_PHASES = ('build', 'network', 'db')
+
+
+def _percentile(sorted_values, percent):
+    """Percentil pelo método nearest-rank (lista já ordenada)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _empty_table():
+    stats = {counter: 0 for counter in _COUNTERS}
+    stats.update({f'{phase}_s': 0.0 for phase in _PHASES})
+    stats['latencies'] = []
+    return stats
+
+
+class SyncMetricsCollector:
+    """
+    Coleta a telemetria de uma execução de sincronização: linhas e bytes
+    enviados/recebidos, latência de cada requisição HTTP, retentativas, erros
+    e o tempo gasto montando payloads, esperando a rede e gravando no SQLite.
+
+    É seguro entre threads (os downloads de páginas rodam em paralelo). Fora de
+    uma execução (begin_run/end_run), os registros são ignorados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._run = None
+
+    def begin_run(self, kind):
+        with self._lock:
+            self._run = {
+                'kind': kind,
+                'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'start': time.perf_counter(),
+                'tables': {},
+            }
+
+    def record_request(self, table_name, latency_s, rows_up=0, rows_down=0, bytes_up=0, bytes_down=0,
+                       retry=False, error=False):
+        with self._lock:
+            if not self._run:
+                return
+            stats = self._run['tables'].setdefault(table_name, _empty_table())
+            stats['requests'] += 1
+            stats['rows_up'] += rows_up
+            stats['rows_down'] += rows_down
+            stats['bytes_up'] += bytes_up
+            stats['bytes_down'] += bytes_down
+            stats['retries'] += 1 if retry else 0
+            stats['errors'] += 1 if error else 0
+            stats['network_s'] += latency_s
+            stats['latencies'].append(latency_s)
+
+    @contextmanager
+    def timed(self, table_name, phase):
+        """Mede o tempo de uma fase ('build' ou 'db') de uma tabela."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if self._run:
+                    stats = self._run['tables'].setdefault(table_name, _empty_table())
+                    stats[f'{phase}_s'] += elapsed
+
+    def end_run(self, backlog=None):
+        """
+        Encerra a execução e grava as métricas na tabela sync_metrics.
+
+        Args:
+            backlog: dict de get_sync_backlog() com as pendências restantes
+
+        Returns:
+            dict: Linha de totais da execução (None se não houver execução ativa)
+        """
+        with self._lock:
+            run, self._run = self._run, None
+        if not run:
+            return None
+
+        backlog = backlog or {}
+        duration_ms = int((time.perf_counter() - run['start']) * 1000)
+        rows = []
+        all_latencies = []
+        totals = _empty_table()
+
+        for table_name, stats in sorted(run['tables'].items()):
+            all_latencies.extend(stats['latencies'])
+            for key in _COUNTERS:
+                totals[key] += stats[key]
+            for phase in _PHASES:
+                totals[f'{phase}_s'] += stats[f'{phase}_s']
+            rows.append(self._to_row(table_name, stats, sorted(stats['latencies']), None,
+                                     backlog.get(table_name, {}).get('total', 0)))
+
+        totals_row = self._to_row('*', totals, sorted(all_latencies), duration_ms,
+                                  sum(counts.get('total', 0) for counts in backlog.values()))
+        rows.insert(0, totals_row)
+
+        try:
+            save_sync_metrics(run['kind'], run['started_at'], rows)
+        except Exception as e:
+            logging.warning(f"Não foi possível gravar as métricas de sincronização: {e}")
+
+        totals_row.update({'kind': run['kind'], 'started_at': run['started_at']})
+        return totals_row
+
+    @staticmethod
+    def _to_row(table_name, stats, latencies, duration_ms, backlog):
+        to_ms = lambda seconds: int(round(seconds * 1000)) if seconds is not None else None
+        build_ms, network_ms, db_ms = (to_ms(stats[f'{phase}_s']) for phase in _PHASES)
+        return {
+            'table_name': table_name,
+            'duration_ms': duration_ms if duration_ms is not None else build_ms + network_ms + db_ms,
+            **{counter: stats[counter] for counter in _COUNTERS},
+            'latency_p50_ms': to_ms(_percentile(latencies, 50)),
+            'latency_p95_ms': to_ms(_percentile(latencies, 95)),
+            'latency_max_ms': to_ms(latencies[-1]) if latencies else None,
+            'build_ms': build_ms,
+            'network_ms': network_ms,
+            'db_ms': db_ms,
+            'backlog': backlog,
+        }
@@ -0,0 +1,203 @@
+import sqlite3
+import logging
+from .connection import get_db_connection
+from .migration_fixes import SYNC_TABLES
+
+
+def get_sync_outbox_max_id():
+    """Retorna o maior id do outbox de sincronização (0 se estiver vazio ou em caso de erro)."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT MAX(id) FROM sync_outbox").fetchone()
+        return row[0] or 0
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar o outbox de sincronização: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_sync_outbox_tables(max_id):
+    """Retorna as tabelas com alterações no outbox até o id informado."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT table_name FROM sync_outbox WHERE id <= ?", (max_id,)
+        ).fetchall()
+        return [row['table_name'] for row in rows if row['table_name'] in SYNC_TABLES]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar as tabelas do outbox de sincronização: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def ack_sync_outbox(max_id):
+    """
+    Remove do outbox (até o id informado) as entradas cujos registros já estão
+    sincronizados ou foram excluídos. Entradas alteradas depois da leitura têm
+    id maior e são preservadas.
+
+    Returns:
+        int: Quantidade de entradas que continuam pendentes até max_id (None em caso de erro)
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT table_name FROM sync_outbox WHERE id <= ?", (max_id,))
+        tables = [row['table_name'] for row in cursor.fetchall()]
+
+        for table in tables:
+            if table not in SYNC_TABLES:
+                cursor.execute("DELETE FROM sync_outbox WHERE id <= ? AND table_name = ?", (max_id, table))
+                continue
+            cursor.execute(f"""
+                DELETE FROM sync_outbox
+                WHERE id <= ? AND table_name = ?
+                  AND local_id NOT IN (SELECT id FROM {table} WHERE sync_status != 'synced')
+            """, (max_id, table))
+
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM sync_outbox WHERE id <= ?", (max_id,))
+        return cursor.fetchone()[0]
+    except sqlite3.Error as e:
+        conn.rollback()
+        logging.error(f"Erro ao confirmar entradas do outbox de sincronização: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_sync_backlog():
+    """
+    Retorna as pendências de sincronização por tabela. Usa o índice parcial
+    de pendências, então o custo é proporcional ao número de pendências.
+
+    Returns:
+        dict: {tabela: {'pending_create': n, 'pending_update': n, 'total': n}},
+        apenas com as tabelas que possuem pendências.
+    """
+    conn = get_db_connection()
+    try:
+        backlog = {}
+        for table in SYNC_TABLES:
+            try:
+                rows = conn.execute(f"""
+                    SELECT sync_status, COUNT(*) AS total
+                    FROM {table}
+                    WHERE sync_status != 'synced'
+                    GROUP BY sync_status
+                """).fetchall()
+            except sqlite3.OperationalError as e:
+                logging.debug(f"Pendências de sincronização indisponíveis para '{table}': {e}")
+                continue
+
+            if rows:
+                counts = {'pending_create': 0, 'pending_update': 0}
+                for row in rows:
+                    counts[row['sync_status']] = row['total']
+                counts['total'] = sum(row['total'] for row in rows)
+                backlog[table] = counts
+        return backlog
+    finally:
+        conn.close()
+
+
+def get_sync_conflict_stats():
+    """
+    Resumo da fila de merge de edições concorrentes (sync_conflicts).
+
+    Returns:
+        dict: {'pending': registros aguardando merge,
+               'resolved_24h': registros mesclados nas últimas 24h com campos em conflito}
+    """
+    conn = get_db_connection()
+    try:
+        row = conn.execute("""
+            SELECT
+                SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) AS pending,
+                SUM(CASE WHEN status = 'resolved' AND resolution != '{}'
+                         AND resolved_at >= datetime('now', '-1 day') THEN 1 ELSE 0 END) AS resolved_24h
+            FROM sync_conflicts
+        """).fetchone()
+        return {'pending': row['pending'] or 0, 'resolved_24h': row['resolved_24h'] or 0}
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar conflitos de sincronização: {e}")
+        return {'pending': 0, 'resolved_24h': 0}
+    finally:
+        conn.close()
+
+
+# Quantidade de execuções mantidas na tabela sync_metrics (tabela em anel)
+SYNC_METRICS_MAX_RUNS = 200
+
+_SYNC_METRICS_COLUMNS = (
+    'table_name', 'duration_ms', 'rows_up', 'rows_down', 'bytes_up', 'bytes_down', 'requests',
+    'retries', 'errors', 'latency_p50_ms', 'latency_p95_ms', 'latency_max_ms',
+    'build_ms', 'network_ms', 'db_ms', 'backlog'
+)
+
+
+def save_sync_metrics(kind, started_at, rows):
+    """
+    Grava as métricas de uma execução de sincronização (uma linha por tabela e
+    a linha de totais, table_name = '*') e descarta as execuções mais antigas.
+
+    Returns:
+        int: run_id da execução gravada (None em caso de erro)
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(run_id), 0) + 1 FROM sync_metrics")
+        run_id = cursor.fetchone()[0]
+
+        cursor.executemany(f"""
+            INSERT INTO sync_metrics (run_id, kind, started_at, {', '.join(_SYNC_METRICS_COLUMNS)})
+            VALUES (?, ?, ?, {', '.join('?' for _ in _SYNC_METRICS_COLUMNS)})
+        """, [(run_id, kind, started_at, *(row[col] for col in _SYNC_METRICS_COLUMNS)) for row in rows])
+        cursor.execute("DELETE FROM sync_metrics WHERE run_id <= ?", (run_id - SYNC_METRICS_MAX_RUNS,))
+        conn.commit()
+        return run_id
+    except sqlite3.Error as e:
+        conn.rollback()
+        logging.error(f"Erro ao gravar métricas de sincronização: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_sync_metrics_runs(limit=20, kind=None):
+    """Retorna os totais das últimas execuções de sincronização (mais recentes primeiro)."""
+    conn = get_db_connection()
+    try:
+        query = "SELECT * FROM sync_metrics WHERE table_name = '*'"
+        params = []
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY run_id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar métricas de sincronização: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_sync_metrics_tables(run_id):
+    """Retorna as métricas por tabela de uma execução de sincronização."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT * FROM sync_metrics
+            WHERE run_id = ? AND table_name != '*'
+            ORDER BY network_ms + build_ms + db_ms DESC
+        """, (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar métricas de sincronização por tabela: {e}")
+        return []
+    finally:
+        conn.close()
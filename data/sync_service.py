@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from .sync_manager import SyncManager
+from .sync_repository import get_sync_outbox_max_id, get_sync_outbox_tables, ack_sync_outbox
+from .sale_events import subscribe_sale_registered, unsubscribe_sale_registered
+
+# Intervalo (s) de verificação de novas entradas no outbox (consulta MAX(id), sem varrer tabelas)
+OUTBOX_POLL_SECONDS = 5
+# Espera (s) sem novas alterações antes de enviar, agrupando rajadas (ex: venda + itens + estoque)
+DEBOUNCE_SECONDS = 2
+# Limite (s) da espera do debounce, para que alterações contínuas não adiem o envio indefinidamente
+DEBOUNCE_MAX_SECONDS = 10
+# Backoff exponencial (s) quando não há conexão com o Supabase
+BACKOFF_INITIAL_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+# Nova tentativa (s) para registros que falharam por outro motivo (ex: dependência não sincronizada)
+RETRY_SECONDS = 60
+
+
+class SyncService:
+    """
+    Sincronização contínua em background (somente upload).
+
+    Os triggers do outbox (sync_outbox) registram cada registro que fica com
+    sync_status pendente. O serviço acorda quando o outbox recebe novas entradas
+    (ou imediatamente em uma venda registrada), aguarda o debounce e envia apenas
+    as tabelas presentes no outbox, através de SyncManager.push_pending_changes.
+
+    Em falha de rede, as tentativas seguem um backoff exponencial. O download
+    (web -> local) continua sendo feito pela sincronização completa.
+    """
+
+    def __init__(self, sync_manager: SyncManager):
+        self.sync_manager = sync_manager
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._last_seen_id = 0
+        self._next_retry = None
+        self._backoff = 0
+
+    def start(self):
+        """Inicia a thread do serviço (envia o que já estiver pendente no outbox)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._next_retry = time.monotonic()
+        subscribe_sale_registered(self._on_sale_registered)
+        self._thread = threading.Thread(target=self._run, name="SyncService", daemon=True)
+        self._thread.start()
+        logging.info("SyncService iniciado.")
+
+    def stop(self):
+        """Para o serviço. Um envio em andamento termina normalmente."""
+        unsubscribe_sale_registered(self._on_sale_registered)
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        logging.info("SyncService parado.")
+
+    def wake(self):
+        """Solicita um envio (respeitando o debounce e o backoff em andamento)."""
+        self._wake_event.set()
+
+    def _on_sale_registered(self, event):
+        if not event.get('training_mode'):
+            self.wake()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            timeout = OUTBOX_POLL_SECONDS
+            if self._next_retry is not None:
+                timeout = max(0, min(timeout, self._next_retry - time.monotonic()))
+
+            woken = self._wake_event.wait(timeout)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+
+            retry_due = self._next_retry is not None and time.monotonic() >= self._next_retry
+            if self._backoff and not retry_due:
+                continue  # Sem conexão: só tenta novamente no horário do backoff
+
+            if not retry_due and not woken and get_sync_outbox_max_id() <= self._last_seen_id:
+                continue
+
+            self._debounce()
+            if self._stop_event.is_set():
+                break
+
+            try:
+                self._push()
+            except Exception as e:
+                logging.error(f"SyncService: Erro inesperado no envio: {e}", exc_info=True)
+                self._schedule_backoff()
+
+    def _debounce(self):
+        """Aguarda DEBOUNCE_SECONDS sem novas alterações (no máximo DEBOUNCE_MAX_SECONDS)."""
+        deadline = time.monotonic() + DEBOUNCE_MAX_SECONDS
+        last_max_id = get_sync_outbox_max_id()
+        while time.monotonic() < deadline:
+            woken = self._wake_event.wait(min(DEBOUNCE_SECONDS, max(0, deadline - time.monotonic())))
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                return
+            max_id = get_sync_outbox_max_id()
+            if not woken and max_id == last_max_id:
+                return
+            last_max_id = max_id
+
+    def _push(self):
+        max_id = get_sync_outbox_max_id()
+        tables = get_sync_outbox_tables(max_id)
+        if not tables:
+            self._last_seen_id = max_id
+            self._next_retry = None
+            self._backoff = 0
+            return
+
+        result = self.sync_manager.push_pending_changes(set(tables))
+        if result is None:
+            # Outra sincronização em andamento: tenta logo depois dela
+            self._next_retry = time.monotonic() + DEBOUNCE_SECONDS
+            return
+        if result is False:
+            # Supabase não configurado/disponível: mantém o outbox e verifica com pouca frequência
+            self._last_seen_id = max_id
+            self._next_retry = time.monotonic() + BACKOFF_MAX_SECONDS
+            return
+
+        self._last_seen_id = max_id
+        remaining = ack_sync_outbox(max_id)
+        if remaining is None:
+            self._next_retry = time.monotonic() + RETRY_SECONDS
+            return
+        if remaining == 0:
+            logging.debug(f"SyncService: Alterações enviadas ({', '.join(tables)}).")
+            self._next_retry = None
+            self._backoff = 0
+            return
+
+        if self.sync_manager.api_client.check_connection():
+            logging.warning(f"SyncService: {remaining} registro(s) não puderam ser enviados. Nova tentativa em {RETRY_SECONDS}s.")
+            self._next_retry = time.monotonic() + RETRY_SECONDS
+            self._backoff = 0
+        else:
+            self._schedule_backoff()
+
+    def _schedule_backoff(self):
+        self._backoff = min(self._backoff * 2, BACKOFF_MAX_SECONDS) if self._backoff else BACKOFF_INITIAL_SECONDS
+        self._next_retry = time.monotonic() + self._backoff
+        logging.warning(f"SyncService: Falha no envio. Nova tentativa em {self._backoff}s.")
@@ -0,0 +1,48 @@
+import logging
+import threading
+import uuid
+from config_manager import ConfigManager
+
+# Tabelas cujos registros pertencem ao terminal que os criou (coluna terminal_id).
+# No modo loja, cada terminal baixa apenas os próprios registros destas tabelas;
+# o catálogo, os clientes e o fiado continuam compartilhados.
+TERMINAL_SCOPED_TABLES = ('cash_sessions', 'sales', 'sale_items')
+
+_lock = threading.Lock()
+_terminal_config = None
+
+
+def get_terminal_config():
+    """
+    Retorna a seção "terminal" do config.json ({'id', 'store_mode'}), com cache.
+    Se o id estiver vazio, gera um (ex: "terminal-1a2b3c4d") e salva no arquivo.
+    """
+    global _terminal_config
+    with _lock:
+        if _terminal_config is None:
+            config_manager = ConfigManager()
+            terminal = dict(config_manager.get_section('terminal'))
+            if not terminal.get('id'):
+                terminal['id'] = f"terminal-{uuid.uuid4().hex[:8]}"
+                terminal.setdefault('store_mode', False)
+                config_manager.update_section('terminal', terminal)
+                logging.info(f"Identificador do terminal gerado: {terminal['id']}")
+            _terminal_config = terminal
+        return _terminal_config
+
+
+def get_terminal_id():
+    """Identificador deste terminal (gravado em terminal_id nas sessões de caixa e vendas)."""
+    return get_terminal_config()['id']
+
+
+def is_store_mode():
+    """True se a loja usa vários terminais (envia terminal_id e filtra os downloads por terminal)."""
+    return bool(get_terminal_config().get('store_mode'))
+
+
+def reload_terminal_config():
+    """Descarta o cache (chamar após alterar a seção "terminal" do config.json)."""
+    global _terminal_config
+    with _lock:
+        _terminal_config = None
@@ -0,0 +1,434 @@
+import json
+import sqlite3
+import time
+import logging
+from datetime import datetime
+from .connection import get_db_connection
+
+# Colunas no formato das entradas do antigo whatsapp_history.json
+_MESSAGE_COLUMNS = """
+    message_id AS id, phone, message, created_at AS timestamp, status, error, delivered_at
+"""
+
+
+def add_whatsapp_message(message_id, phone, message, created_at=None):
+    """Registra uma mensagem enviada (status 'sent') no histórico do WhatsApp."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO whatsapp_messages (message_id, phone, message, status, created_at)
+            VALUES (?, ?, ?, 'sent', ?)
+            """,
+            (message_id, phone, message, created_at or datetime.now().isoformat())
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao registrar mensagem do WhatsApp no histórico: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def update_whatsapp_message_status(message_id, success, error=None):
+    """Atualiza o resultado ('delivered' ou 'failed') de uma mensagem do histórico."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE whatsapp_messages
+            SET status = ?, error = COALESCE(?, error), delivered_at = ?
+            WHERE message_id = ?
+            """,
+            ('delivered' if success else 'failed', error or None, datetime.now().isoformat(), message_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao atualizar mensagem do WhatsApp no histórico: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def get_whatsapp_messages(limit=100, phone=None):
+    """
+    Retorna as últimas mensagens do histórico do WhatsApp, em ordem cronológica.
+
+    Args:
+        limit: Quantidade máxima de mensagens
+        phone: Filtra por número (JID normalizado)
+    """
+    conn = get_db_connection()
+    try:
+        if phone:
+            rows = conn.execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM whatsapp_messages WHERE phone = ? ORDER BY whatsapp_messages.id DESC LIMIT ?",
+                (phone, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM whatsapp_messages ORDER BY whatsapp_messages.id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar o histórico do WhatsApp: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def count_whatsapp_messages():
+    """Retorna a quantidade de mensagens no histórico do WhatsApp."""
+    conn = get_db_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM whatsapp_messages").fetchone()[0]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao contar o histórico do WhatsApp: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def prune_whatsapp_messages(max_entries):
+    """
+    Mantém apenas as max_entries mensagens mais recentes do histórico.
+
+    Returns:
+        int: Quantidade de mensagens removidas
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            """
+            DELETE FROM whatsapp_messages
+            WHERE id <= (SELECT id FROM whatsapp_messages ORDER BY id DESC LIMIT 1 OFFSET ?)
+            """,
+            (max_entries,)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao limpar o histórico do WhatsApp: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def import_whatsapp_messages(entries):
+    """
+    Importa entradas no formato do antigo whatsapp_history.json (ignorando ids já existentes).
+
+    Returns:
+        int: Quantidade de mensagens importadas (None em caso de erro)
+    """
+    rows = [
+        (
+            entry['id'], entry['phone'], entry.get('message'), entry.get('status') or 'sent',
+            entry.get('error'), entry.get('timestamp') or datetime.now().isoformat(), entry.get('delivered_at')
+        )
+        for entry in entries
+        if entry.get('id') and entry.get('phone')
+    ]
+    conn = get_db_connection()
+    try:
+        cursor = conn.executemany(
+            """
+            INSERT OR IGNORE INTO whatsapp_messages
+                (message_id, phone, message, status, error, created_at, delivered_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao importar o histórico do WhatsApp: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def enqueue_whatsapp_outbox(message_id, payload, priority, dedupe_key=None, delay=0):
+    """
+    Grava uma mensagem na fila de envio do WhatsApp, a ser enviada daqui a delay segundos.
+
+    Returns:
+        bool: True se enfileirou, False se já existia (mesmo message_id ou dedupe_key),
+        None em caso de erro
+    """
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            """
+            INSERT OR IGNORE INTO whatsapp_outbox
+                (message_id, dedupe_key, payload, priority, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (message_id, dedupe_key, json.dumps(payload, ensure_ascii=False, default=str), priority,
+             now + max(0, delay or 0), now)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao enfileirar mensagem do WhatsApp: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def claim_whatsapp_outbox_batch(limit, max_attempts, ack_timeout):
+    """
+    Reserva as próximas mensagens vencidas da fila (por prioridade e id), marcando-as
+    como 'inflight' até a confirmação do bridge ou o fim do prazo ack_timeout (s).
+
+    Returns:
+        list: Dicts com message_id, payload, priority e attempts, na ordem de envio
+    """
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            """
+            UPDATE whatsapp_outbox
+            SET status = 'inflight', attempts = attempts + 1, next_attempt_at = ?
+            WHERE id IN (
+                SELECT id FROM whatsapp_outbox
+                WHERE status IN ('pending', 'inflight') AND next_attempt_at <= ? AND attempts < ?
+                ORDER BY priority, id
+                LIMIT ?
+            )
+            RETURNING id, message_id, payload, priority, attempts
+            """,
+            (now + ack_timeout, now, max_attempts, limit)
+        ).fetchall()
+        conn.commit()
+        batch = []
+        for row in sorted(rows, key=lambda r: (r['priority'], r['id'])):
+            entry = dict(row)
+            entry['payload'] = json.loads(entry['payload'])
+            batch.append(entry)
+        return batch
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao reservar mensagens da fila do WhatsApp: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_whatsapp_outbox_next_due():
+    """Retorna o próximo instante (epoch) com mensagem a enviar ou reenviar (None se a fila estiver vazia)."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT MIN(next_attempt_at) FROM whatsapp_outbox WHERE status IN ('pending', 'inflight')"
+        ).fetchone()
+        return row[0]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar a fila do WhatsApp: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def finish_whatsapp_outbox(message_id, success, error=None):
+    """
+    Registra a confirmação do bridge para uma mensagem da fila.
+
+    Returns:
+        bool: True se a mensagem estava aguardando confirmação, False se já havia sido
+        confirmada (confirmação duplicada), None em caso de erro
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE whatsapp_outbox
+            SET status = ?, error = ?, finished_at = ?
+            WHERE message_id = ? AND status IN ('pending', 'inflight')
+            """,
+            ('sent' if success else 'failed', error or None, time.time(), message_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao confirmar mensagem da fila do WhatsApp: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def retry_whatsapp_outbox(message_id, delay, error=None):
+    """Devolve uma mensagem reservada à fila, para nova tentativa em delay segundos."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """
+            UPDATE whatsapp_outbox
+            SET status = 'pending', next_attempt_at = ?, error = COALESCE(?, error)
+            WHERE message_id = ? AND status IN ('pending', 'inflight')
+            """,
+            (time.time() + delay, error or None, message_id)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao reagendar mensagem da fila do WhatsApp: {e}")
+    finally:
+        conn.close()
+
+
+def extend_whatsapp_outbox_deadline(message_id, seconds):
+    """Adia o prazo de confirmação de uma mensagem reservada (ex.: broadcast compassado pelo bridge)."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE whatsapp_outbox SET next_attempt_at = ? WHERE message_id = ? AND status = 'inflight'",
+            (time.time() + seconds, message_id)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao adiar prazo de mensagem da fila do WhatsApp: {e}")
+    finally:
+        conn.close()
+
+
+def ack_whatsapp_outbox_broadcast_recipient(broadcast_id, recipient_message_id, success):
+    """
+    Tira do payload de um broadcast o destinatário já confirmado pelo bridge, para que
+    um reenvio (prazo esgotado, bridge reiniciado) só inclua os destinatários pendentes.
+    Quando não resta nenhum, o broadcast é finalizado ('sent' se algum foi entregue).
+
+    Returns:
+        dict: Payload atualizado; None se o destinatário já havia sido confirmado
+        (confirmação repetida) ou em caso de erro
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT payload FROM whatsapp_outbox WHERE message_id = ? AND status IN ('pending', 'inflight')",
+            (broadcast_id,)
+        ).fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+
+        payload = json.loads(row['payload'])
+        recipients = payload.get('recipients') or []
+        remaining = [r for r in recipients if r.get('message_id') != recipient_message_id]
+        if len(remaining) == len(recipients):
+            conn.rollback()
+            return None
+
+        payload['recipients'] = remaining
+        payload['delivered'] = payload.get('delivered', 0) + (1 if success else 0)
+        data = json.dumps(payload, ensure_ascii=False, default=str)
+        if remaining:
+            conn.execute("UPDATE whatsapp_outbox SET payload = ? WHERE message_id = ?", (data, broadcast_id))
+        else:
+            conn.execute(
+                "UPDATE whatsapp_outbox SET payload = ?, status = ?, finished_at = ? WHERE message_id = ?",
+                (data, 'sent' if payload['delivered'] else 'failed', time.time(), broadcast_id)
+            )
+        conn.commit()
+        return payload
+    except sqlite3.Error as e:
+        conn.rollback()
+        logging.error(f"Erro ao confirmar destinatário de broadcast do WhatsApp: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def requeue_inflight_whatsapp_outbox():
+    """
+    Devolve à fila, para envio imediato, as mensagens aguardando confirmação de um
+    bridge que não está mais em execução.
+
+    Returns:
+        int: Quantidade de mensagens devolvidas
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "UPDATE whatsapp_outbox SET status = 'pending', next_attempt_at = ? WHERE status = 'inflight'",
+            (time.time(),)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao devolver mensagens à fila do WhatsApp: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def expire_whatsapp_outbox(max_attempts, ttl_seconds):
+    """
+    Marca como 'failed' as mensagens que esgotaram as tentativas (sem confirmação
+    após a última) ou que estão na fila há mais de ttl_seconds.
+
+    Returns:
+        list: Dicts com message_id e payload das mensagens expiradas
+    """
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            """
+            UPDATE whatsapp_outbox
+            SET status = 'failed', finished_at = ?,
+                error = CASE WHEN attempts >= ? THEN 'Tentativas esgotadas' ELSE 'Expirada na fila de envio' END
+            WHERE status IN ('pending', 'inflight')
+              AND ((attempts >= ? AND next_attempt_at <= ?) OR created_at < ?)
+            RETURNING message_id, payload
+            """,
+            (now, max_attempts, max_attempts, now, now - ttl_seconds)
+        ).fetchall()
+        conn.commit()
+        return [{'message_id': row['message_id'], 'payload': json.loads(row['payload'])} for row in rows]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao expirar mensagens da fila do WhatsApp: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def prune_whatsapp_outbox(retention_seconds):
+    """
+    Remove da fila as mensagens finalizadas ('sent' / 'failed') há mais de retention_seconds.
+
+    Returns:
+        int: Quantidade de mensagens removidas
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "DELETE FROM whatsapp_outbox WHERE status IN ('sent', 'failed') AND finished_at < ?",
+            (time.time() - retention_seconds,)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao limpar a fila do WhatsApp: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_whatsapp_outbox_stats():
+    """Retorna a quantidade de mensagens por status na fila de envio do WhatsApp."""
+    stats = {'pending': 0, 'inflight': 0, 'sent': 0, 'failed': 0}
+    conn = get_db_connection()
+    try:
+        for row in conn.execute("SELECT status, COUNT(*) AS total FROM whatsapp_outbox GROUP BY status"):
+            stats[row['status']] = row['total']
+        return stats
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar a fila do WhatsApp: {e}")
+        return stats
+    finally:
+        conn.close()
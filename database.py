@@ -12,14 +12,20 @@ from data.admin_repository import *
 from data.audit_repository import *
 from data.cash_repository import *
 from data.credit_repository import *
+from data.analytics_repository import *
+from data.export_repository import *
 from data.group_repository import *
 from data.inventory_repository import *
 from data.payment_method_repository import *
 from data.product_repository import *
 from data.reports_repository import *
 from data.sale_repository import *
+from data.sale_events import *
 from data.user_repository import *
 from data.settings_repository import *
+from data.sync_repository import *
+from data.terminal import *
+from data.whatsapp_repository import *
 
 # Alias para compatibilidade
 load_config = load_setting
@@ -53,12 +53,14 @@ class AvisoCommand(ManagerCommand):
             sender_validation = self.manager.config.validate_phone(self.user_id)
             sender_normalized_phone = sender_validation['normalized'] if sender_validation['valid'] else None
 
-            for phone in unique_phones:
-                # Evita que o aviso seja enviado de volta para quem o enviou
-                # Compara apenas telefones normalizados
-                if phone != sender_normalized_phone:
-                    self.manager.send_message(phone, notification_message, message_type='system_automatic')
-                    sent_count += 1
+            # Evita que o aviso seja enviado de volta para quem o enviou
+            # Compara apenas telefones normalizados
+            recipients = [phone for phone in unique_phones if phone != sender_normalized_phone]
+            if recipients:
+                # Um único broadcast, compassado pelo bridge
+                result = self.manager.send_broadcast(recipients, notification_message, message_type='system_automatic',
+                                                     priority=self.manager.PRIORITY_BULK)
+                sent_count = result.get('queued', 0)
             
             response = f"✅ Aviso enviado com sucesso!\n\n🖥️ 1 notificação na tela do PDV.\n📱 {sent_count} notificações enviadas pelo WhatsApp."
             
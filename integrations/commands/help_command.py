@@ -20,6 +20,7 @@ class HelpCommand(BaseCommand):
             "  `*/dashboard`* - Resumo completo do dia.\n\n"
             "📊 *RELATÓRIOS*\n"
             "  `*/vendas <período>`* - Vendas do período (hoje, ontem, 7dias, etc.).\n"
+            "  `*/relatorio comparar <base> [período]`* - Compara com dia_semana, semana, mes ou ano.\n"
             "  `*/produtos_vendidos <período>`* - Ranking de produtos mais vendidos.\n\n"
             "📦 *CAIXA*\n"
             "  `*/caixa status`* - Status detalhado do caixa atual.\n"
@@ -53,6 +54,7 @@ class HelpCommand(BaseCommand):
             "    Níveis: ERROR, WARNING, INFO, DEBUG, CONNECTION, MESSAGE, AUDIT\n"
             "    Ex: `*/logs ERROR 20 1 erro_conexao`* (20 linhas, página 1, busca por 'erro_conexao')\n"
             "  `*/db_status`* - Mostra estatísticas do banco de dados.\n"
+            "  `*/sync`* - Métricas da sincronização com a nuvem (volume, latência, pendências).\n"
             "  `*/backup`* - Inicia o backup do banco de dados.\n"
             "  `*/sistema limpar_sessao`* - Reinicia a conexão com o WhatsApp.\n\n"
             "🔍 *MONITORAMENTO*\n"
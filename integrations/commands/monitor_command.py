@@ -4,7 +4,7 @@ import os
 import time
 import uuid
 import threading
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Novas importações para captura
 try:
@@ -15,8 +15,10 @@ except ImportError:
 
 try:
     import cv2  # OpenCV
+    import numpy as np  # dependência do OpenCV
 except ImportError:
     cv2 = None
+    np = None
 
 # Novas importações para gravação de áudio
 try:
@@ -32,6 +34,141 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from integrations.whatsapp_manager import WhatsAppManager
 
+# Arquivos temporários ainda pendentes após este tempo (s) são removidos pela limpeza
+TEMP_FILE_MAX_AGE = 600.0
+
+# Intervalo (s) da thread de limpeza enquanto houver arquivos pendentes
+TEMP_CLEANUP_INTERVAL = 300.0
+
+
+class TempMediaTracker:
+    """
+    Arquivos temporários de mídia aguardando envio, compartilhado por todos os comandos.
+
+    O arquivo é removido quando o bridge informa o resultado do envio. Uma única
+    thread de limpeza (iniciada sob demanda e encerrada quando não há pendências)
+    remove os que ficaram sem resultado e as sobras de execuções anteriores na
+    pasta de capturas.
+    """
+
+    def __init__(self, temp_dir: str):
+        self.temp_dir = temp_dir
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    def send_and_track(self, manager: 'WhatsAppManager', chat_id: str, file_path: str, caption: str) -> Optional[str]:
+        """
+        Enfileira o envio do arquivo e o rastreia até o resultado.
+        Retorna o message_id, ou None se o envio não pôde ser enfileirado (o arquivo é removido).
+        """
+        result = manager.send_media(chat_id, file_path, caption)
+        if not result['success']:
+            self.logger.error(f"Falha ao enfileirar mídia {file_path}: {result.get('error', 'Erro desconhecido')}")
+            # Remover arquivo imediatamente se falhou no enfileiramento
+            self._remove_file(file_path, "após falha no enfileiramento")
+            return None
+
+        message_id = result['message_id']
+        with self._lock:
+            self._pending[message_id] = {
+                'file_path': file_path,
+                'timestamp': time.time(),
+                'chat_id': chat_id,
+                'caption': caption
+            }
+            if self._cleanup_thread is None:
+                self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True,
+                                                        name='temp_media_cleanup')
+                self._cleanup_thread.start()
+
+        # Registrar callback para limpeza do arquivo após envio
+        manager.register_media_callback(message_id, self._on_media_result_received)
+        self.logger.info(f"Arquivo {file_path} rastreado com message_id {message_id}")
+        return message_id
+
+    def _on_media_result_received(self, message_id: str, success: bool, error: str):
+        """
+        Callback chamado com o resultado final do envio (a fila de envio já fez as
+        novas tentativas): remove o arquivo em caso de sucesso ou de falha.
+        """
+        with self._lock:
+            file_info = self._pending.pop(message_id, None)
+        if file_info is None:
+            self.logger.debug(f"Message ID {message_id} não encontrado na lista de pendentes")
+            return
+
+        if success:
+            self._remove_file(file_info['file_path'], f"após envio bem-sucedido (message_id: {message_id})")
+        else:
+            self.logger.warning(f"Envio falhou para {file_info['file_path']} (message_id: {message_id}): {error}")
+            self._remove_file(file_info['file_path'], "após falha no envio")
+
+    def _cleanup_loop(self):
+        """
+        Remove periodicamente os arquivos pendentes há mais de TEMP_FILE_MAX_AGE e
+        os arquivos antigos esquecidos na pasta. Termina quando não há pendências.
+        """
+        while True:
+            time.sleep(TEMP_CLEANUP_INTERVAL)
+            try:
+                cutoff = time.time() - TEMP_FILE_MAX_AGE
+                with self._lock:
+                    expired = [message_id for message_id, info in self._pending.items()
+                               if info['timestamp'] < cutoff]
+                    expired_files = [self._pending.pop(message_id)['file_path'] for message_id in expired]
+                for file_path in expired_files:
+                    self._remove_file(file_path, "pela limpeza periódica")
+
+                with self._lock:
+                    pending_files = {info['file_path'] for info in self._pending.values()}
+                for entry in os.scandir(self.temp_dir):
+                    if entry.is_file() and entry.path not in pending_files and entry.stat().st_mtime < cutoff:
+                        self._remove_file(entry.path, "pela limpeza periódica (sobra)")
+
+            except Exception as e:
+                self.logger.error(f"Erro na limpeza periódica de arquivos: {e}")
+
+            with self._lock:
+                if not self._pending:
+                    self._cleanup_thread = None
+                    return
+
+    def _remove_file(self, file_path: str, reason: str):
+        """Remove um arquivo temporário, registrando o motivo no log."""
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                self.logger.info(f"Arquivo {file_path} removido {reason}")
+        except Exception as e:
+            self.logger.error(f"Falha ao remover arquivo {file_path}: {e}")
+
+
+def encode_jpeg(frame, max_width: int, quality: int):
+    """
+    Reduz um frame BGR/BGRA do OpenCV para no máximo max_width de largura e o codifica
+    em JPEG na memória. Retorna o buffer codificado (array do numpy, gravável direto em arquivo).
+    """
+    height, width = frame.shape[:2]
+    if width > max_width:
+        # INTER_AREA: melhor qualidade para redução
+        frame = cv2.resize(frame, (max_width, max(1, round(height * max_width / width))),
+                           interpolation=cv2.INTER_AREA)
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)  # JPEG não tem canal alfa
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Falha ao codificar a imagem em JPEG.")
+    return buffer
+
+
+def write_capture(path: str, data):
+    """Grava os bytes codificados (bytes ou buffer do numpy) no arquivo, sem cópias intermediárias."""
+    with open(path, 'wb') as f:
+        f.write(memoryview(data))
+
+
 class MonitorCommand(ManagerCommand):
     """
     Executa uma verificação remota, capturando a tela e a webcam.
@@ -41,23 +178,24 @@ class MonitorCommand(ManagerCommand):
     # Define um local temporário para salvar as imagens
     TEMP_PATH = get_data_path('temp_captures')
 
-    # Gerenciamento de arquivos temporários pendentes
-    _pending_files: Dict[str, Dict[str, Any]] = {}
-    _pending_lock = threading.Lock()
+    # Rastreamento e limpeza dos arquivos temporários, compartilhados entre execuções
+    _tracker: Optional[TempMediaTracker] = None
+    _tracker_lock = threading.Lock()
 
     def __init__(self, args: List[str], user_id: str, chat_id: str, manager: 'WhatsAppManager'):
         super().__init__(args, user_id, chat_id, manager)
         # Garante que a pasta temporária existe
         os.makedirs(self.TEMP_PATH, exist_ok=True)
         self.logger = logging.getLogger(__name__)
+        self.tracker = self.get_tracker()
 
-        # Registrar callback para limpeza de arquivos após envio
-        # O callback será registrado quando os arquivos forem enviados
-
-        # Iniciar limpeza periódica de arquivos antigos (fallback)
-        self._cleanup_timer = threading.Timer(300.0, self._cleanup_old_files)  # 5 minutos
-        self._cleanup_timer.daemon = True
-        self._cleanup_timer.start()
+    @classmethod
+    def get_tracker(cls) -> TempMediaTracker:
+        """Retorna o rastreador de arquivos temporários (único para todos os comandos)."""
+        with cls._tracker_lock:
+            if cls._tracker is None:
+                cls._tracker = TempMediaTracker(cls.TEMP_PATH)
+            return cls._tracker
 
     def execute(self) -> str:
         """
@@ -74,23 +212,36 @@ class MonitorCommand(ManagerCommand):
             self.logger.warning(f"Falha ao enviar mensagem de 'iniciado': {e}")
             # Não interrompe o processo por isso
 
+        # Capturas reduzidas e codificadas em JPEG na memória: o arquivo temporário
+        # recebe só os bytes finais (uma fração do PNG em resolução cheia)
+        max_width = self.manager.config.get('messages.capture_max_width', 1280)
+        quality = self.manager.config.get('messages.capture_jpeg_quality', 70)
+
         screenshot_path = None
         webcam_path = None
 
         # --- 2. Captura de Tela (Screenshot) ---
         if mss:
             try:
-                screenshot_path = os.path.join(self.TEMP_PATH, f"ss_{uuid.uuid4()}.png")
                 with mss.mss() as sct:
                     # Captura o monitor principal (monitor 1)
                     monitor = sct.monitors[1]
                     sct_img = sct.grab(monitor)
-                    # Salva a imagem
-                    mss.tools.to_png(sct_img.rgb, sct_img.size, output=screenshot_path)
-                self.logger.info(f"Screenshot salvo em: {screenshot_path}")
+                    if cv2 is not None:
+                        # sct_img.raw já é o buffer BGRA do mss: frombuffer só cria uma view, sem cópia
+                        # (sct_img.bgra devolveria bytes(raw), uma cópia do quadro inteiro)
+                        frame = np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+                        screenshot_path = os.path.join(self.TEMP_PATH, f"ss_{uuid.uuid4()}.jpg")
+                        write_capture(screenshot_path, encode_jpeg(frame, max_width, quality))
+                    else:
+                        # Sem OpenCV: PNG em resolução cheia
+                        screenshot_path = os.path.join(self.TEMP_PATH, f"ss_{uuid.uuid4()}.png")
+                        mss.tools.to_png(sct_img.rgb, sct_img.size, output=screenshot_path)
+                self.logger.info(f"Screenshot salvo em: {screenshot_path} ({os.path.getsize(screenshot_path)} bytes)")
             except Exception as e:
                 self.logger.error(f"Falha ao capturar screenshot: {e}", exc_info=True)
                 self.manager.send_message(self.chat_id, f"❌ Falha ao capturar screenshot: {e}")
+                screenshot_path = None
         else:
             self.manager.send_message(self.chat_id, "❌ Erro: Biblioteca 'mss' não instalada para screenshots.")
 
@@ -98,7 +249,6 @@ class MonitorCommand(ManagerCommand):
         if cv2:
             cam = None
             try:
-                webcam_path = os.path.join(self.TEMP_PATH, f"cam_{uuid.uuid4()}.jpg")
                 cam = cv2.VideoCapture(0) # Tenta abrir a câmera 0 (padrão)
 
                 if not cam.isOpened():
@@ -112,12 +262,14 @@ class MonitorCommand(ManagerCommand):
                     raise RuntimeError("Falha ao ler o frame da câmera.")
 
                 # Salva o frame capturado
-                cv2.imwrite(webcam_path, frame)
-                self.logger.info(f"Foto da webcam salva em: {webcam_path}")
+                webcam_path = os.path.join(self.TEMP_PATH, f"cam_{uuid.uuid4()}.jpg")
+                write_capture(webcam_path, encode_jpeg(frame, max_width, quality))
+                self.logger.info(f"Foto da webcam salva em: {webcam_path} ({os.path.getsize(webcam_path)} bytes)")
 
             except Exception as e:
                 self.logger.error(f"Falha ao capturar webcam: {e}", exc_info=True)
                 self.manager.send_message(self.chat_id, f"❌ Falha ao capturar webcam: {e}")
+                webcam_path = None
             finally:
                 if cam:
                     cam.release() # ESSENCIAL: Libera a câmera
@@ -127,13 +279,15 @@ class MonitorCommand(ManagerCommand):
         # --- 4. Envio dos Arquivos (Usando o Passo 0) ---
         try:
             if screenshot_path:
-                message_id = self._send_media_and_track(screenshot_path, "1/2 - Screenshot da Tela PDV")
+                message_id = self.tracker.send_and_track(self.manager, self.chat_id, screenshot_path,
+                                                         "1/2 - Screenshot da Tela PDV")
                 self.logger.info(f"Comando de envio de mídia (screenshot) para {self.chat_id} enfileirado. Message ID: {message_id}")
 
             if webcam_path:
                 # Pequeno delay para garantir que as mensagens cheguem em ordem
                 time.sleep(2.0)
-                message_id = self._send_media_and_track(webcam_path, "2/2 - Foto da Webcam PDV")
+                message_id = self.tracker.send_and_track(self.manager, self.chat_id, webcam_path,
+                                                         "2/2 - Foto da Webcam PDV")
                 self.logger.info(f"Comando de envio de mídia (webcam) para {self.chat_id} enfileirado. Message ID: {message_id}")
 
         except Exception as e:
@@ -144,104 +298,6 @@ class MonitorCommand(ManagerCommand):
         # apenas as imagens que já foram enfileiradas.
         return "" # Retorna string vazia para o handler não enviar nada
 
-    def _send_media_and_track(self, file_path: str, caption: str) -> str:
-        """
-        Envia mídia e rastreia o arquivo para limpeza posterior.
-        Retorna o message_id gerado.
-        """
-        # Gerar message_id único para rastreamento
-        message_id = str(uuid.uuid4())
-
-        # Enfileirar envio
-        result = self.manager.send_media(self.chat_id, file_path, caption)
-
-        if result['success']:
-            # Registrar callback para limpeza do arquivo após envio
-            self.manager.register_media_callback(result['message_id'], self._on_media_result_received)
-
-            # Rastrear arquivo pendente
-            with self._pending_lock:
-                self._pending_files[result['message_id']] = {
-                    'file_path': file_path,
-                    'timestamp': time.time(),
-                    'chat_id': self.chat_id,
-                    'caption': caption
-                }
-            self.logger.info(f"Arquivo {file_path} rastreado com message_id {result['message_id']}")
-        else:
-            self.logger.error(f"Falha ao enfileirar mídia {file_path}: {result.get('error', 'Erro desconhecido')}")
-            # Remover arquivo imediatamente se falhou no enfileiramento
-            try:
-                os.remove(file_path)
-                self.logger.info(f"Arquivo {file_path} removido após falha no enfileiramento")
-            except Exception as e:
-                self.logger.warning(f"Falha ao remover arquivo {file_path} após erro: {e}")
-
-        return message_id
-
-    def _on_media_result_received(self, message_id: str, success: bool, error: str):
-        """
-        Callback chamado quando o resultado do envio de mídia é recebido.
-        Remove o arquivo se foi enviado com sucesso.
-        """
-        with self._pending_lock:
-            if message_id in self._pending_files:
-                file_info = self._pending_files[message_id]
-                file_path = file_info['file_path']
-
-                if success:
-                    # Remover arquivo após envio bem-sucedido
-                    try:
-                        os.remove(file_path)
-                        self.logger.info(f"Arquivo {file_path} removido após envio bem-sucedido (message_id: {message_id})")
-                    except Exception as e:
-                        self.logger.error(f"Falha ao remover arquivo {file_path}: {e}")
-                else:
-                    # Manter arquivo por mais tempo em caso de falha (pode ser retry)
-                    self.logger.warning(f"Envio falhou para {file_path} (message_id: {message_id}): {error}")
-                    # Arquivo será removido pela limpeza periódica se necessário
-
-                # Remover da lista de pendentes
-                del self._pending_files[message_id]
-            else:
-                self.logger.debug(f"Message ID {message_id} não encontrado na lista de pendentes")
-
-    def _cleanup_old_files(self):
-        """
-        Remove arquivos temporários antigos que não foram processados.
-        Executado periodicamente como fallback.
-        """
-        try:
-            with self._pending_lock:
-                current_time = time.time()
-                to_remove = []
-
-                for message_id, file_info in self._pending_files.items():
-                    # Remover arquivos com mais de 10 minutos
-                    if current_time - file_info['timestamp'] > 600:  # 10 minutos
-                        file_path = file_info['file_path']
-                        try:
-                            if os.path.exists(file_path):
-                                os.remove(file_path)
-                                self.logger.info(f"Arquivo antigo {file_path} removido pela limpeza periódica")
-                        except Exception as e:
-                            self.logger.error(f"Falha ao remover arquivo antigo {file_path}: {e}")
-
-                        to_remove.append(message_id)
-
-                # Remover das listas de pendentes
-                for message_id in to_remove:
-                    del self._pending_files[message_id]
-
-                # Reiniciar timer se ainda há arquivos pendentes
-                if self._pending_files:
-                    self._cleanup_timer = threading.Timer(300.0, self._cleanup_old_files)
-                    self._cleanup_timer.daemon = True
-                    self._cleanup_timer.start()
-
-        except Exception as e:
-            self.logger.error(f"Erro na limpeza periódica de arquivos: {e}")
-
 
 class OuvirCommand(ManagerCommand):
     """
@@ -253,9 +309,7 @@ class OuvirCommand(ManagerCommand):
         self.logger = logging.getLogger(__name__)
 
         # Usar o mesmo sistema de rastreamento de arquivos do MonitorCommand
-        if not hasattr(OuvirCommand, '_pending_files'):
-            OuvirCommand._pending_files = {}
-            OuvirCommand._pending_lock = threading.Lock()
+        self.tracker = MonitorCommand.get_tracker()
 
     def execute(self) -> str:
         # Parâmetros da gravação
@@ -286,7 +340,7 @@ class OuvirCommand(ManagerCommand):
             self.logger.info(f"Comando /ouvir: Gravação salva em {FILE_PATH}")
 
             # 4. Envia o áudio como um anexo usando o sistema de rastreamento
-            self._send_audio_and_track(FILE_PATH, "🎧 *Áudio do Ambiente (15s)*")
+            self.tracker.send_and_track(self.manager, self.chat_id, FILE_PATH, "🎧 *Áudio do Ambiente (15s)*")
 
             # Retorna string vazia pois a classe já tratou do envio
             return ""
@@ -303,59 +357,3 @@ class OuvirCommand(ManagerCommand):
             except Exception:
                 # Se falhar o envio, o logger já capturou
                 return f"Erro ao gravar áudio: {e}"
-
-    def _send_audio_and_track(self, file_path: str, caption: str):
-        """
-        Envia áudio e rastreia o arquivo para limpeza posterior.
-        """
-        # Enfileirar envio
-        result = self.manager.send_media(self.chat_id, file_path, caption)
-
-        if result['success']:
-            # Registrar callback para limpeza do arquivo após envio
-            self.manager.register_media_callback(result['message_id'], self._on_audio_result_received)
-
-            # Rastrear arquivo pendente
-            with OuvirCommand._pending_lock:
-                OuvirCommand._pending_files[result['message_id']] = {
-                    'file_path': file_path,
-                    'timestamp': time.time(),
-                    'chat_id': self.chat_id,
-                    'caption': caption
-                }
-            self.logger.info(f"Arquivo de áudio {file_path} rastreado com message_id {result['message_id']}")
-        else:
-            self.logger.error(f"Falha ao enfileirar áudio {file_path}: {result.get('error', 'Erro desconhecido')}")
-            # Remover arquivo imediatamente se falhou no enfileiramento
-            try:
-                os.remove(file_path)
-                self.logger.info(f"Arquivo de áudio {file_path} removido após falha no enfileiramento")
-            except Exception as e:
-                self.logger.warning(f"Falha ao remover arquivo de áudio {file_path} após erro: {e}")
-
-    def _on_audio_result_received(self, message_id: str, success: bool, error: str):
-        """
-        Callback chamado quando o resultado do envio de áudio é recebido.
-        Remove o arquivo se foi enviado com sucesso.
-        """
-        with OuvirCommand._pending_lock:
-            if message_id in OuvirCommand._pending_files:
-                file_info = OuvirCommand._pending_files[message_id]
-                file_path = file_info['file_path']
-
-                if success:
-                    # Remover arquivo após envio bem-sucedido
-                    try:
-                        os.remove(file_path)
-                        self.logger.info(f"Arquivo de áudio {file_path} removido após envio bem-sucedido (message_id: {message_id})")
-                    except Exception as e:
-                        self.logger.error(f"Falha ao remover arquivo de áudio {file_path}: {e}")
-                else:
-                    # Manter arquivo por mais tempo em caso de falha (pode ser retry)
-                    self.logger.warning(f"Envio falhou para arquivo de áudio {file_path} (message_id: {message_id}): {error}")
-                    # Arquivo será removido pela limpeza periódica se necessário
-
-                # Remover da lista de pendentes
-                del OuvirCommand._pending_files[message_id]
-            else:
-                self.logger.debug(f"Message ID {message_id} não encontrado na lista de pendentes de áudio")
@@ -2,23 +2,42 @@
 from .base_command import BaseCommand
 from datetime import datetime, timedelta
 
+def _parse_period(args):
+    """
+    Interpreta o período dos comandos de relatório (hoje, ontem, Ndias ou AAAA-MM-DD AAAA-MM-DD).
+    Retorna (data_inicial, data_final) ou None se o formato for inválido.
+    Levanta ValueError para datas mal formatadas.
+    """
+    today = datetime.now().date()
+    if not args or args[0].lower() == 'hoje':
+        return today, today
+    if args[0].lower() == 'ontem':
+        return today - timedelta(days=1), today - timedelta(days=1)
+    if args[0].lower().endswith('dias'):
+        days = int(args[0][:-4])
+        return today - timedelta(days=days-1), today
+    if len(args) == 2:
+        return datetime.strptime(args[0], '%Y-%m-%d').date(), datetime.strptime(args[1], '%Y-%m-%d').date()
+    return None
+
+def _format_variation(change) -> str:
+    if change is None:
+        return "—"
+    arrow = "📈" if change > 0 else "📉" if change < 0 else "➖"
+    return f"{arrow} {change:+.1f}%"
+
 class SalesReportCommand(BaseCommand):
     """Gera e retorna um relatório detalhado de vendas."""
     def execute(self) -> str:
+        if self.args and self.args[0].lower() == 'comparar':
+            return self._comparative_report(self.args[1:])
+
         try:
             today = datetime.now().date()
-            if not self.args or self.args[0].lower() == 'hoje':
-                start_date, end_date = today, today
-            elif self.args[0].lower() == 'ontem':
-                start_date = end_date = today - timedelta(days=1)
-            elif self.args[0].lower().endswith('dias'):
-                days = int(self.args[0][:-4])
-                start_date, end_date = today - timedelta(days=days-1), today
-            elif len(self.args) == 2:
-                start_date = datetime.strptime(self.args[0], '%Y-%m-%d').date()
-                end_date = datetime.strptime(self.args[1], '%Y-%m-%d').date()
-            else:
+            period = _parse_period(self.args)
+            if not period:
                 return "Formato do relatório inválido. Use '/ajuda' para ver os exemplos."
+            start_date, end_date = period
 
             report = self.db.get_sales_report(start_date.isoformat(), end_date.isoformat())
 
@@ -96,6 +115,48 @@ class SalesReportCommand(BaseCommand):
             self.logging.error(f"Erro inesperado ao gerar relatório de vendas via comando: {e}", exc_info=True)
             return "❌ Ocorreu um erro interno ao gerar o relatório. A equipe de suporte foi notificada."
 
+    def _comparative_report(self, args) -> str:
+        """/relatorio comparar <base> [período] - compara o período com a base escolhida."""
+        bases = ", ".join(f"`{key}`" for key in self.db.COMPARISON_BASELINES)
+        if not args or args[0].lower() not in self.db.COMPARISON_BASELINES:
+            return f"Uso: `/relatorio comparar <base> [período]`\nBases: {bases}\nEx: `/relatorio comparar semana hoje`"
+
+        try:
+            baseline = args[0].lower()
+            period = _parse_period(args[1:])
+            if not period:
+                return "Formato do relatório inválido. Use '/ajuda' para ver os exemplos."
+            start_date, end_date = period
+
+            report = self.db.get_comparative_report(start_date.isoformat(), end_date.isoformat(), baseline)
+            current, base, variation = report['current'], report['baseline_metrics'], report['variation']
+
+            date_str = f"de `{start_date.strftime('%d/%m')}` a `{end_date.strftime('%d/%m')}`" if start_date != end_date else f"em `{start_date.strftime('%d/%m/%Y')}`"
+            response = f"📊 *Comparativo de Vendas ({date_str})*\n"
+            response += f"_Base: {report['baseline_label']}_\n\n"
+
+            response += f"💰 Faturamento: `R$ {current['revenue']:.2f}` x `R$ {base['revenue']:.2f}` {_format_variation(variation['revenue'])}\n"
+            response += f"🛒 Vendas: `{current['sales_count']}` x `{base['sales_count']}` {_format_variation(variation['sales_count'])}\n"
+            response += f"📈 Ticket Médio: `R$ {current['average_ticket']:.2f}` x `R$ {base['average_ticket']:.2f}` {_format_variation(variation['average_ticket'])}\n"
+            response += f"🧾 Itens/Venda: `{current['items_per_sale']:.2f}` x `{base['items_per_sale']:.2f}` {_format_variation(variation['items_per_sale'])}\n"
+            response += f"⚖️ Peso (kg): `{current['weight_kg']:.3f}` x `{base['weight_kg']:.3f}` {_format_variation(variation['weight_kg'])}\n"
+
+            # Curva por hora (apenas horas com movimento)
+            hours = [h for h in range(24) if current['hourly'][h] or base['hourly'][h]]
+            if hours:
+                response += "\n🕒 *Faturamento por Hora (período x base):*\n"
+                for hour in hours:
+                    response += f"  - {hour:02d}h: `R$ {current['hourly'][hour]:.2f}` x `R$ {base['hourly'][hour]:.2f}`\n"
+
+            return response
+
+        except ValueError:
+            self.logging.warning(f"Comando de relatório comparativo com formato inválido: {args}")
+            return "🗓️ Formato de data inválido. Use AAAA-MM-DD, por exemplo: `/relatorio comparar mes 2025-10-01 2025-10-05`."
+        except Exception as e:
+            self.logging.error(f"Erro inesperado ao gerar relatório comparativo via comando: {e}", exc_info=True)
+            return "❌ Ocorreu um erro interno ao gerar o relatório. A equipe de suporte foi notificada."
+
 class DashboardCommand(BaseCommand):
     """Retorna um dashboard com o resumo do dia."""
     def execute(self) -> str:
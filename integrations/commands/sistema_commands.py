@@ -3,7 +3,7 @@ from .base_command import BaseCommand, ManagerCommand
 from typing import List, Any, Dict
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from integrations.whatsapp_config import get_whatsapp_config
 
 class StatusCommand(ManagerCommand):
@@ -24,6 +24,8 @@ class StatusCommand(ManagerCommand):
                 alerts.append("📊 Cache de números muito grande")
             if health['message_history_count'] > 5000:
                 alerts.append("📜 Histórico de mensagens extenso")
+            if (health.get('outbox') or {}).get('pending', 0) > 100:
+                alerts.append("📬 Muitas mensagens aguardando na fila de envio")
 
             # Formatação de tempo
             duration_seconds = health['connection_duration']
@@ -38,7 +40,6 @@ class StatusCommand(ManagerCommand):
             last_check_str = "Nunca"
             if health.get('last_health_check'):
                 try:
-                    from datetime import datetime
                     last_check = datetime.fromisoformat(health['last_health_check'])
                     now = datetime.now()
                     diff_minutes = (now - last_check).total_seconds() / 60
@@ -49,14 +50,19 @@ class StatusCommand(ManagerCommand):
                 except (ValueError, TypeError):
                     last_check_str = "Erro na formatação"
 
-            # Estatísticas adicionais se disponíveis
+            # Contadores das últimas 24h, lidos da auditoria (não zeram quando o worker reinicia)
             extra_stats = ""
+            audit_logger = getattr(self.manager, 'logger', None)
+            if hasattr(audit_logger, 'count_audit'):
+                since = datetime.now() - timedelta(hours=24)
+                messages = audit_logger.count_audit('messages', since=since, group_by='operation')
+                commands = audit_logger.count_audit('commands', since=since, group_by='success')
+                extra_stats += f"📤 *Mensagens Enviadas (24h):* `{messages.get('message_sent', 0)}`\n"
+                extra_stats += f"📥 *Mensagens Falhadas (24h):* `{messages.get('message_failed', 0)}`\n"
+                extra_stats += f"💬 *Comandos (24h):* `{sum(commands.values())}` (`{commands.get(False, 0)}` com falha)\n"
+
             if hasattr(self.manager, '_worker_thread') and self.manager._worker_thread:
                 worker = self.manager._worker_thread
-                if hasattr(worker, '_messages_sent'):
-                    extra_stats += f"📤 *Mensagens Enviadas:* `{worker._messages_sent}`\n"
-                if hasattr(worker, '_messages_failed'):
-                    extra_stats += f"📥 *Mensagens Falhadas:* `{worker._messages_failed}`\n"
                 if hasattr(worker, '_connection_attempts'):
                     extra_stats += f"🔄 *Tentativas de Conexão:* `{worker._connection_attempts}`\n"
 
@@ -74,6 +80,8 @@ class StatusCommand(ManagerCommand):
             response += "📈 *ESTATÍSTICAS*\n"
             response += f"💾 *Cache de Números:* `{health['cache_size']}`\n"
             response += f"📜 *Histórico de Mensagens:* `{health['message_history_count']}`\n"
+            outbox = health.get('outbox') or {}
+            response += f"📬 *Fila de Envio:* `{outbox.get('pending', 0) + outbox.get('inflight', 0)}` pendentes, `{outbox.get('failed', 0)}` falhas\n"
             if extra_stats:
                 response += extra_stats
 
@@ -450,3 +458,74 @@ class DbStatusCommand(BaseCommand):
         except Exception as e:
             self.logging.error(f"Erro ao gerar /db_status: {e}", exc_info=True)
             return "❌ Erro ao consultar as estatísticas do banco de dados."
+
+class SyncCommand(BaseCommand):
+    """
+    Lida com o comando /sync: métricas da última sincronização com o Supabase
+    (volume, latência HTTP, tempo local x rede) e pendências atuais.
+    """
+    KIND_LABELS = {'full': 'Sincronização completa', 'push': 'Envio automático'}
+
+    def execute(self) -> str:
+        try:
+            runs = self.db.get_sync_metrics_runs(limit=1)
+            backlog = self.db.get_sync_backlog()
+
+            response = "🔄 *Sincronização (Supabase)*\n\n"
+            if not runs:
+                response += "Nenhuma sincronização registrada ainda.\n"
+            else:
+                last_run = runs[0]
+                response += self._format_run(last_run)
+                if last_run['kind'] != 'full':
+                    full_runs = self.db.get_sync_metrics_runs(limit=1, kind='full')
+                    if full_runs:
+                        response += "\n" + self._format_run(full_runs[0], brief=True)
+
+                tables = self.db.get_sync_metrics_tables(last_run['run_id'])[:3]
+                if tables:
+                    response += "\n🐢 *Tabelas mais lentas (última execução)*\n"
+                    for table in tables:
+                        response += (f"  - `{table['table_name']}`: rede {table['network_ms']}ms, "
+                                     f"local {table['build_ms'] + table['db_ms']}ms, "
+                                     f"↑{table['rows_up']} ↓{table['rows_down']}\n")
+
+            response += "\n📋 *Pendências*\n"
+            if backlog:
+                for table_name, counts in backlog.items():
+                    response += f"  - `{table_name}`: {counts['pending_create']} novos, {counts['pending_update']} alterados\n"
+            else:
+                response += "  Nenhuma pendência. ✅\n"
+
+            conflicts = self.db.get_sync_conflict_stats()
+            if conflicts['pending'] or conflicts['resolved_24h']:
+                response += "\n🔀 *Edições concorrentes (outro terminal)*\n"
+                response += f"  - *Mescladas (24h):* `{conflicts['resolved_24h']}` | *Aguardando merge:* `{conflicts['pending']}`\n"
+
+            return response.rstrip()
+
+        except Exception as e:
+            self.logging.error(f"Erro ao gerar /sync: {e}", exc_info=True)
+            return "❌ Erro ao consultar as métricas de sincronização."
+
+    def _format_run(self, run, brief=False):
+        label = self.KIND_LABELS.get(run['kind'], run['kind'])
+        text = f"*{label}* - `{run['started_at']}`\n"
+        text += f"  - *Duração:* `{run['duration_ms']}ms` | *Requisições:* `{run['requests']}`\n"
+        text += f"  - *Linhas:* `↑{run['rows_up']} ↓{run['rows_down']}`\n"
+        if brief:
+            return text
+
+        text += f"  - *Dados:* `↑{run['bytes_up'] / 1024:.1f}KB ↓{run['bytes_down'] / 1024:.1f}KB`\n"
+        if run['latency_p50_ms'] is not None:
+            text += (f"  - *Latência HTTP:* `p50 {run['latency_p50_ms']}ms | p95 {run['latency_p95_ms']}ms | "
+                     f"máx {run['latency_max_ms']}ms`\n")
+        text += f"  - *Retentativas:* `{run['retries']}` | *Erros:* `{run['errors']}`\n"
+
+        local_ms = run['build_ms'] + run['db_ms']
+        text += (f"  - *Tempo local:* `{local_ms}ms` (montagem {run['build_ms']}ms, banco {run['db_ms']}ms) | "
+                 f"*Rede:* `{run['network_ms']}ms`\n")
+        if run['network_ms'] or local_ms:
+            bottleneck = "rede" if run['network_ms'] > local_ms else "processamento local"
+            text += f"  - *Gargalo:* {bottleneck}\n"
+        return text
@@ -16,7 +16,7 @@ from .commands.produto_commands import ProdutoCommand
 from .commands.estoque_commands import EstoqueCommand
 from .commands.relatorio_commands import SalesReportCommand, DashboardCommand, ProdutosVendidosCommand
 from .commands.admin_commands import NotificationsCommand, BackupCommand, GerenteCommand
-from .commands.sistema_commands import StatusCommand, LogsCommand, SistemaCommand, DbStatusCommand
+from .commands.sistema_commands import StatusCommand, LogsCommand, SistemaCommand, DbStatusCommand, SyncCommand
 from .commands.aviso_command import AvisoCommand
 from .commands.aviso_agendado_command import AvisoAgendadoCommand
 from .commands.monitor_command import MonitorCommand, OuvirCommand
@@ -44,6 +44,7 @@ class CommandHandler:
             '/status': StatusCommand,
             '/logs': LogsCommand,
             '/db_status': DbStatusCommand,
+            '/sync': SyncCommand,
             '/caixa': CaixaCommand,
             '/produto': ProdutoCommand,
             '/estoque': EstoqueCommand,
@@ -32,6 +32,17 @@ class WhatsAppConfig:
         },
         'messages': {
             'max_message_length': 4096,
+            # Fila de envio persistente (whatsapp_outbox)
+            'outbox_max_attempts': 5,
+            'outbox_ack_timeout': 60.0,  # segundos sem confirmação do bridge até reenviar
+            'outbox_ttl_hours': 24,  # mensagens mais antigas não são mais enviadas
+            'outbox_retention_hours': 24,  # mensagens finalizadas mantidas para deduplicação
+            # Broadcast (um aviso para vários números, compassado pelo bridge)
+            'broadcast_concurrency': 2,  # envios simultâneos no bridge
+            'broadcast_jitter_ms': 1500,  # atraso aleatório máximo entre envios
+            # Capturas do /verificar_pdv (reduzidas e codificadas em JPEG antes do envio)
+            'capture_max_width': 1280,  # pixels
+            'capture_jpeg_quality': 70,  # 1-100
             'template_variables': {
                 'store_name': '{store_name}',
                 'customer_name': '{customer_name}',
@@ -57,6 +68,7 @@ class WhatsAppConfig:
             'allowed_countries': ['BR'],
             'max_phone_verification_cache': 1000,
             'phone_verification_ttl_hours': 24,
+            'cache_flush_interval': 30.0,  # segundos entre gravações do cache de números
         },
         'rate_limiting': {
             'max_messages_per_minute': 10,
@@ -66,6 +78,8 @@ class WhatsAppConfig:
             'max_system_messages_per_minute': 5,
             'max_system_messages_per_hour': 50,
             'system_burst_limit': 3,
+            'max_global_messages_per_minute': 30,  # soma de todos os números e tipos
+            'max_global_messages_per_hour': 1000,
         },
         'monitoring': {
             'enable_health_checks': True,
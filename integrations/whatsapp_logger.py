@@ -1,16 +1,33 @@
 """
 Sistema de logging estruturado para integração WhatsApp.
 Fornece logs centralizados com níveis apropriados e auditoria de mensagens.
+
+A escrita em disco é feita por uma única thread (QueueListener): quem loga apenas
+coloca o registro em uma fila sem limite, de modo que as threads de envio nunca
+esperam por disco. Os arquivos giram por tamanho e na virada do dia, e os
+arquivos girados são compactados (.gz).
 """
+import atexit
+import gzip
 import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
 import threading
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import datetime, date
+from typing import Dict, Any, Optional, List, Iterator
 
 from utils import get_data_path
 
+# Rotação dos arquivos de log (whatsapp.log e auditorias)
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Logger das linhas de auditoria (não propaga para o log geral)
+AUDIT_LOGGER_NAME = 'whatsapp_integration.audit'
+
 class WhatsAppLogger:
     """
     Logger estruturado para WhatsApp com múltiplos níveis e formatação JSON.
@@ -32,12 +49,18 @@ class WhatsAppLogger:
         'maintenance': 'MANUTENCAO'
     }
 
+    # QueueListener ativo (um por processo)
+    _listener: Optional[logging.handlers.QueueListener] = None
+
     def __init__(self, log_file: Optional[str] = None):
         self.log_file = log_file or get_data_path("whatsapp.log")
-        self._setup_logger()
         self._message_log_file = get_data_path("whatsapp_messages.log")
         self._command_log_file = get_data_path("whatsapp_commands.log")
-        self._lock = threading.Lock()
+        self._audit_files = {
+            'messages': self._message_log_file,
+            'commands': self._command_log_file,
+        }
+        self._setup_logger()
 
     def log_command(self, sender: str, command: str, success: bool, response_preview: str = ""):
         """Log de auditoria para comandos recebidos."""
@@ -48,19 +71,16 @@ class WhatsAppLogger:
             'success': success,
             'response_preview': response_preview[:150]
         }
-        self._save_command_audit(command_data)
+        self._save_audit('commands', command_data)
 
-    def _save_command_audit(self, command_data: Dict[str, Any]):
-        """Salva auditoria de comandos em arquivo separado."""
-        with self._lock:
-            try:
-                with open(self._command_log_file, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps(command_data, ensure_ascii=False) + '\n')
-            except Exception as e:
-                self.logger.error(f"Falha ao salvar auditoria de comando: {e}", extra={'error_type': 'command_audit_save_failed'})
+    def _save_audit(self, kind: str, data: Dict[str, Any]):
+        """Enfileira uma linha de auditoria; a gravação é feita pela thread do listener."""
+        self._audit_logger.info("", extra={'audit_file': kind, 'audit_data': data})
 
     def _setup_logger(self):
         """Configura o logger principal com formato JSON estruturado."""
+        self.shutdown()
+
         self.logger = logging.getLogger('whatsapp_integration')
         self.logger.setLevel(logging.DEBUG)
 
@@ -71,16 +91,39 @@ class WhatsAppLogger:
         formatter = WhatsAppJSONFormatter()
 
         # Handler para arquivo
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        file_handler = GzipRotatingFileHandler(self.log_file)
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        file_handler.addFilter(AuditFileFilter(None))
 
         # Handler para console (só warnings e acima)
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.WARNING)
         console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
+        console_handler.addFilter(AuditFileFilter(None))
+
+        # Um arquivo JSON-lines por tipo de auditoria
+        handlers = [file_handler, console_handler]
+        for kind, path in self._audit_files.items():
+            audit_handler = GzipRotatingFileHandler(path)
+            audit_handler.setFormatter(AuditLineFormatter())
+            audit_handler.addFilter(AuditFileFilter(kind))
+            handlers.append(audit_handler)
+
+        # Quem loga só enfileira; a thread do listener formata e grava
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        self.logger.addHandler(queue_handler)
+
+        self._audit_logger = logging.getLogger(AUDIT_LOGGER_NAME)
+        self._audit_logger.setLevel(logging.INFO)
+        self._audit_logger.propagate = False
+        self._audit_logger.handlers.clear()
+        self._audit_logger.addHandler(queue_handler)
+
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        WhatsAppLogger._listener = listener
 
         # Adicionar níveis customizados
         logging.addLevelName(self.LEVEL_CONNECTION, "CONNECTION")
@@ -110,7 +153,7 @@ class WhatsAppLogger:
         self.logger.log(self.LEVEL_AUDIT, f"Audit: {operation}", extra=audit_data)
 
         # Salvar em arquivo separado para auditoria
-        self._save_message_audit(audit_data)
+        self._save_audit('messages', audit_data)
 
     def log_error(self, error: str, error_type: str = "unknown", **kwargs):
         """Log de erros com categorização."""
@@ -135,14 +178,143 @@ class WhatsAppLogger:
 
         self.logger.info(f"Health check: {status}", extra=extra_data)
 
-    def _save_message_audit(self, audit_data: Dict[str, Any]):
-        """Salva auditoria de mensagens em arquivo separado."""
-        with self._lock:
+    def iter_audit(self, kind: str = 'messages', since: Optional[datetime] = None,
+                   until: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as entradas de auditoria ('messages' ou 'commands'), das mais
+        recentes para as mais antigas, incluindo os arquivos girados (.gz).
+        Arquivos modificados pela última vez antes de `since` nem são abertos.
+        """
+        path = self._audit_files[kind]
+        since_str = since.isoformat() if since else None
+        until_str = until.isoformat() if until else None
+
+        candidates = [path] + [f"{path}.{i}.gz" for i in range(1, LOG_BACKUP_COUNT + 1)]
+        for file_path in candidates:
             try:
-                with open(self._message_log_file, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps(audit_data, ensure_ascii=False) + '\n')
-            except Exception as e:
-                self.logger.error(f"Falha ao salvar auditoria: {e}", extra={'error_type': 'audit_save_failed'})
+                if since and os.path.getmtime(file_path) < since.timestamp():
+                    break
+                opener = gzip.open if file_path.endswith('.gz') else open
+                with opener(file_path, 'rt', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            except (OSError, EOFError) as e:
+                self.logger.warning(f"Falha ao ler auditoria {file_path}: {e}", extra={'error_type': 'audit_read_failed'})
+                continue
+
+            for line in reversed(lines):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                timestamp = entry.get('timestamp', '')
+                if until_str and timestamp > until_str:
+                    continue
+                if since_str and timestamp < since_str:
+                    continue
+                yield entry
+
+    def query_audit(self, kind: str = 'messages', since: Optional[datetime] = None,
+                    until: Optional[datetime] = None, limit: Optional[int] = None,
+                    **filters) -> List[Dict[str, Any]]:
+        """
+        Consulta a auditoria, das entradas mais recentes para as mais antigas.
+        `filters` compara campos por igualdade (ex.: operation='message_failed', success=False).
+        """
+        results = []
+        for entry in self.iter_audit(kind, since, until):
+            if all(entry.get(key) == value for key, value in filters.items()):
+                results.append(entry)
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def count_audit(self, kind: str = 'messages', since: Optional[datetime] = None,
+                    until: Optional[datetime] = None, group_by: Optional[str] = None, **filters):
+        """Conta as entradas de auditoria; com `group_by`, retorna {valor do campo: contagem}."""
+        total = 0
+        groups: Dict[Any, int] = {}
+        for entry in self.iter_audit(kind, since, until):
+            if not all(entry.get(key) == value for key, value in filters.items()):
+                continue
+            total += 1
+            if group_by:
+                value = entry.get(group_by)
+                groups[value] = groups.get(value, 0) + 1
+        return groups if group_by else total
+
+    def shutdown(self):
+        """Grava os registros ainda na fila e para a thread do listener."""
+        listener = WhatsAppLogger._listener
+        if listener is None:
+            return
+        WhatsAppLogger._listener = None
+        try:
+            listener.stop()
+        finally:
+            for handler in listener.handlers:
+                handler.close()
+
+class GzipRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Gira o arquivo ao atingir `max_bytes` ou na virada do dia e compacta os
+    arquivos girados (arquivo.log.1.gz, arquivo.log.2.gz, ...).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES,
+                 backup_count: int = LOG_BACKUP_COUNT, rotate_daily: bool = True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.namer = self._gzip_name
+        self.rotator = self._gzip_rotate
+        self.rotate_daily = rotate_daily
+        try:
+            self._current_day = date.fromtimestamp(os.path.getmtime(self.baseFilename))
+        except OSError:
+            self._current_day = date.today()
+
+    @staticmethod
+    def _gzip_name(name: str) -> str:
+        return name + ".gz"
+
+    @staticmethod
+    def _gzip_rotate(source: str, dest: str):
+        stat = os.stat(source)
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        # Mantém a data da última escrita (usada para pular arquivos antigos nas consultas)
+        os.utime(dest, (stat.st_atime, stat.st_mtime))
+        os.remove(source)
+
+    def shouldRollover(self, record) -> bool:
+        if self.rotate_daily:
+            today = date.today()
+            if today != self._current_day:
+                if os.path.isfile(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                    return True
+                self._current_day = today
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._current_day = date.today()
+
+class AuditFileFilter(logging.Filter):
+    """Separa as linhas de auditoria (pelo tipo) dos logs gerais (kind=None)."""
+
+    def __init__(self, kind: Optional[str]):
+        super().__init__()
+        self.kind = kind
+
+    def filter(self, record) -> bool:
+        return getattr(record, 'audit_file', None) == self.kind
+
+class AuditLineFormatter(logging.Formatter):
+    """Grava a entrada de auditoria como uma linha JSON, no formato já usado pelos arquivos."""
+
+    def format(self, record):
+        return json.dumps(record.audit_data, ensure_ascii=False)
 
 class WhatsAppJSONFormatter(logging.Formatter):
     """Formatter que gera logs em formato JSON estruturado."""
@@ -197,3 +369,10 @@ def get_whatsapp_logger() -> WhatsAppLogger:
             if _logger_instance is None:
                 _logger_instance = WhatsAppLogger()
     return _logger_instance
+
+def _shutdown_listener():
+    """Esvazia a fila de logs na saída do processo (antes do logging.shutdown)."""
+    if _logger_instance is not None:
+        _logger_instance.shutdown()
+
+atexit.register(_shutdown_listener)
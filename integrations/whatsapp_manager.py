@@ -1,4 +1,5 @@
 
+import bisect
 import sys
 from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer, pyqtSlot
 from datetime import datetime, timedelta
@@ -11,6 +12,8 @@ import time
 import shutil
 import traceback
 import hashlib
+import uuid
+from collections import OrderedDict, deque
 from typing import Dict, Any, Optional, List, Tuple
 
 # Utilitário para caminho de dados persistentes
@@ -24,6 +27,26 @@ except Exception:
 from .whatsapp_logger import get_whatsapp_logger
 from .whatsapp_config import get_whatsapp_config
 from .whatsapp_command_handler import CommandHandler
+import database as db
+
+# Envios entre duas limpezas do histórico (retenção por monitoring.max_history_entries)
+HISTORY_PRUNE_INTERVAL = 500
+
+# Intervalo padrão (s) de gravação do cache de números em disco (validation.cache_flush_interval)
+CACHE_FLUSH_INTERVAL = 30.0
+
+# Sentinela que acorda o loop de processamento bloqueado na fila (parada)
+_STOP = object()
+
+# Mensagens reservadas da fila de envio (whatsapp_outbox) por vez
+OUTBOX_BATCH_SIZE = 50
+
+# Intervalo (s) entre limpezas das mensagens finalizadas da fila
+OUTBOX_PRUNE_INTERVAL = 3600.0
+
+# Tempo estimado (s) de cada envio de um broadcast no bridge (onWhatsApp + sendMessage),
+# somado ao compasso no prazo de confirmação
+BROADCAST_SEND_SECONDS = 5.0
 
 # Renderização de QR via Python (sem browser)
 try:
@@ -96,6 +119,122 @@ class CircuitBreaker:
             }
 
 
+class SlidingWindowRateLimiter:
+    """
+    Rate limiter de janela deslizante por (número, tipo de mensagem), com limite global.
+
+    Cada chave guarda uma deque de instantes (time.monotonic()) por janela: rajada
+    (10 s), minuto e hora. Os envios que saem da janela são descartados pela
+    esquerda, então verificar e registrar custam O(1) amortizado.
+    """
+    BURST_WINDOW = 10.0
+    MINUTE_WINDOW = 60.0
+    HOUR_WINDOW = 3600.0
+
+    # Registros entre duas remoções de chaves ociosas (sem envios na última hora)
+    IDLE_PRUNE_INTERVAL = 256
+
+    def __init__(self, config, clock=time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._windows: Dict[Tuple[str, str], Tuple[deque, deque, deque]] = {}
+        self._global: Tuple[deque, deque] = (deque(), deque())
+        self._records_since_prune = 0
+        self._lock = threading.Lock()
+
+    def _limits(self, message_type: str) -> Tuple[int, int, int]:
+        """Limites (rajada, minuto, hora) do tipo de mensagem."""
+        if message_type == 'system_automatic':
+            # Limites mais permissivos para mensagens automáticas do sistema
+            return (self.config.get('rate_limiting.system_burst_limit', 3),
+                    self.config.get('rate_limiting.max_system_messages_per_minute', 5),
+                    self.config.get('rate_limiting.max_system_messages_per_hour', 50))
+        # Limites mais restritivos para mensagens manuais
+        return (self.config.get('rate_limiting.burst_limit', 5),
+                self.config.get('rate_limiting.max_messages_per_minute', 10),
+                self.config.get('rate_limiting.max_messages_per_hour', 100))
+
+    def _global_limits(self) -> Tuple[int, int]:
+        """Limites (minuto, hora) somando todos os números e tipos."""
+        return (self.config.get('rate_limiting.max_global_messages_per_minute', 30),
+                self.config.get('rate_limiting.max_global_messages_per_hour', 1000))
+
+    @staticmethod
+    def _wait_time(timestamps: deque, window: float, limit: int, now: float) -> float:
+        """Descarta os envios fora da janela e retorna a espera até caber mais um."""
+        while timestamps and now - timestamps[0] >= window:
+            timestamps.popleft()
+        if limit <= 0 or len(timestamps) < limit:
+            return 0.0
+        return timestamps[len(timestamps) - limit] + window - now
+
+    def retry_after(self, phone: str, message_type: str = 'normal', include_global: bool = True) -> float:
+        """
+        Retorna quantos segundos faltam para o próximo envio permitido (0 = pode enviar).
+        Com include_global=False considera só o número (broadcasts, compassados pelo bridge).
+        """
+        if not self.config.get('rate_limiting.enable_rate_limiting', True):
+            return 0.0
+
+        now = self._clock()
+        waits = []
+        with self._lock:
+            windows = self._windows.get((phone, message_type))
+            if windows:
+                for timestamps, window, limit in zip(windows,
+                                                     (self.BURST_WINDOW, self.MINUTE_WINDOW, self.HOUR_WINDOW),
+                                                     self._limits(message_type)):
+                    waits.append(self._wait_time(timestamps, window, limit, now))
+            if include_global:
+                for timestamps, window, limit in zip(self._global,
+                                                     (self.MINUTE_WINDOW, self.HOUR_WINDOW),
+                                                     self._global_limits()):
+                    waits.append(self._wait_time(timestamps, window, limit, now))
+        return max(waits, default=0.0)
+
+    def record(self, phone: str, message_type: str = 'normal', include_global: bool = True, delay: float = 0.0):
+        """
+        Registra um envio para o número e tipo (e no limite global, se include_global).
+        Com delay > 0 o envio conta no instante agendado (mensagem adiada na fila).
+        """
+        now = self._clock()
+        sent_at = now + max(0.0, delay)
+        with self._lock:
+            windows = self._windows.get((phone, message_type))
+            if windows is None:
+                windows = self._windows[(phone, message_type)] = (deque(), deque(), deque())
+            for timestamps in (windows + self._global if include_global else windows):
+                if timestamps and timestamps[-1] > sent_at:
+                    # Já há envios adiados para depois: mantém a deque ordenada
+                    bisect.insort(timestamps, sent_at)
+                else:
+                    timestamps.append(sent_at)
+
+            self._records_since_prune += 1
+            if self._records_since_prune >= self.IDLE_PRUNE_INTERVAL:
+                self._records_since_prune = 0
+                idle = [key for key, (_, _, hour) in self._windows.items()
+                        if not hour or now - hour[-1] >= self.HOUR_WINDOW]
+                for key in idle:
+                    del self._windows[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna envios e limites globais (usados para compassar envios em massa)."""
+        now = self._clock()
+        max_per_minute, max_per_hour = self._global_limits()
+        with self._lock:
+            minute, hour = self._global
+            self._wait_time(minute, self.MINUTE_WINDOW, max_per_minute, now)
+            self._wait_time(hour, self.HOUR_WINDOW, max_per_hour, now)
+            return {
+                'global_last_minute': len(minute),
+                'global_last_hour': len(hour),
+                'max_global_per_minute': max_per_minute,
+                'max_global_per_hour': max_per_hour,
+                'tracked_keys': len(self._windows),
+            }
+
+
 class WhatsAppManager(QObject):
     """
     Integração WhatsApp robusta com sistema de retry, validações, cache e monitoring.
@@ -109,6 +248,19 @@ class WhatsAppManager(QObject):
 
     _instance = None
 
+    # Prioridades da fila de envio (menor = mais urgente)
+    PRIORITY_HIGH = 0     # respostas a comandos e mídias pedidas por gerentes
+    PRIORITY_NORMAL = 5   # notificações e mensagens manuais
+    PRIORITY_BULK = 9     # avisos em massa
+
+    MESSAGE_TYPE_PRIORITIES = {
+        'command_response': PRIORITY_HIGH,
+    }
+
+    # Tipos adiados na fila (em vez de recusados) ao atingir o rate limit: ninguém
+    # está esperando a resposta e perder o fechamento de caixa não é aceitável
+    DEFERRABLE_MESSAGE_TYPES = frozenset({'system_automatic'})
+
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
@@ -135,17 +287,21 @@ class WhatsAppManager(QObject):
         )
 
         # Cache e rate limiting
-        self._phone_cache: Dict[str, Dict[str, Any]] = {}
+        # Cache de números em ordem LRU (mais recente no fim), gravado em disco por
+        # write-behind: alterações só marcam o cache como sujo e o timer grava depois
+        self._phone_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         self._cache_lock = threading.RLock()  # Lock específico para operações de cache
-        self._message_counts: Dict[str, List[datetime]] = {}  # Para rate limiting
+        self._cache_dirty = False
+        self._cache_flush_timer: Optional[QTimer] = None
+        self._rate_limiter = SlidingWindowRateLimiter(self.config)
 
         # Health monitoring
         self._health_timer: Optional[QTimer] = None
         self._last_health_check: Optional[datetime] = None
         self._connection_start_time: Optional[datetime] = None
 
-        # Histórico de mensagens
-        self._message_history: List[Dict[str, Any]] = []
+        # Histórico de mensagens (tabela whatsapp_messages)
+        self._history_inserts_since_prune = 0
         self._history_lock = threading.RLock()  # Lock específico para histórico
 
         # Referência da UI
@@ -162,6 +318,9 @@ class WhatsAppManager(QObject):
         self._load_persistent_cache()
         self._load_message_history()
 
+        # Gravação periódica do cache de números
+        self._start_cache_flush_timer()
+
         # Iniciar health monitoring se configurado
         if self.config.get('monitoring.enable_health_checks', True):
             self._start_health_monitoring()
@@ -223,7 +382,8 @@ class WhatsAppManager(QObject):
                 self.error_occurred.emit(self.config.get_friendly_error_message('connection_failed'))
                 return False
 
-    def send_message(self, phone_number: str, message: str, bypass_cache: bool = False, message_type: str = 'normal') -> Dict[str, Any]:
+    def send_message(self, phone_number: str, message: str, bypass_cache: bool = False, message_type: str = 'normal',
+                     priority: Optional[int] = None, dedupe_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Envia mensagem com validações robustas.
 
@@ -231,6 +391,8 @@ class WhatsAppManager(QObject):
             phone_number: Número do telefone
             message: Conteúdo da mensagem
             bypass_cache: Ignorar cache de validação
+            priority: Prioridade na fila de envio (padrão conforme message_type)
+            dedupe_key: Chave que impede enfileirar a mesma mensagem duas vezes
 
         Returns:
             dict: Resultado com status e informações da operação
@@ -254,11 +416,17 @@ class WhatsAppManager(QObject):
 
             phone_normalized = validation_result['normalized_phone']
 
-            # Verificar rate limiting
-            if self._is_rate_limited(phone_normalized, message_type):
+            # Verificar rate limiting: notificações automáticas são adiadas na fila, não recusadas
+            retry_after = self._rate_limiter.retry_after(phone_normalized, message_type)
+            delay = 0.0
+            if retry_after > 0 and message_type in self.DEFERRABLE_MESSAGE_TYPES:
+                delay = retry_after
+                result['deferred'] = round(retry_after, 1)
+            elif retry_after > 0:
                 error_msg = self.config.get_friendly_error_message('rate_limited')
                 result['error'] = error_msg
                 result['error_type'] = 'rate_limited'
+                result['retry_after'] = round(retry_after, 1)
                 self.logger.log_error(error_msg, error_type='rate_limited', phone=phone_normalized)
                 self.error_occurred.emit(error_msg)
                 return result
@@ -289,13 +457,27 @@ class WhatsAppManager(QObject):
                 self.error_occurred.emit(result['error'])
                 return result
 
-            # Enfileirar mensagem
+            # Enfileirar mensagem na fila persistente
+            if priority is None:
+                priority = self.MESSAGE_TYPE_PRIORITIES.get(message_type, self.PRIORITY_NORMAL)
             message_id = self._generate_message_id()
-            self._worker_thread.enqueue_send(phone_normalized, message, message_id)
+            queued = self._worker_thread.enqueue_send(phone_normalized, message, message_id,
+                                                      priority=priority, dedupe_key=dedupe_key, delay=delay)
+            if queued is None:
+                result['error'] = "Falha ao gravar a mensagem na fila de envio"
+                result['error_type'] = 'outbox_error'
+                self.logger.log_error(result['error'], error_type='outbox_error')
+                return result
+            if not queued:
+                # Mesma dedupe_key já enfileirada ou enviada: não envia de novo
+                result['success'] = True
+                result['duplicate'] = True
+                self.logger.log_message("Mensagem duplicada ignorada", dedupe_key=dedupe_key)
+                return result
 
             # Registrar tentativa de envio
             self._record_message_attempt(message_id, phone_normalized, message)
-            self._update_message_counts(phone_normalized)
+            self._rate_limiter.record(phone_normalized, message_type, delay=delay)
 
             result['success'] = True
             result['message_id'] = message_id
@@ -316,6 +498,130 @@ class WhatsAppManager(QObject):
             self.error_occurred.emit(self.config.get_friendly_error_message('message_failed'))
             return result
 
+    def get_rate_limit_wait(self, phone_number: str, message_type: str = 'normal') -> float:
+        """Segundos até o próximo envio permitido para o número e tipo (0 = pode enviar agora)."""
+        phone_validation = self.config.validate_phone(phone_number)
+        if not phone_validation['valid']:
+            return 0.0
+        return self._rate_limiter.retry_after(phone_validation['normalized'], message_type)
+
+    def send_broadcast(self, phone_numbers: List[str], message: str, message_type: str = 'system_automatic',
+                       priority: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Envia a mesma mensagem para vários números em um único comando do bridge, que
+        compassa os envios (broadcast_concurrency, broadcast_jitter_ms e o limite global
+        por minuto) e devolve um resultado agregado. Cada destinatário recebe seu próprio
+        message_id no histórico.
+
+        Args:
+            phone_numbers: Números dos destinatários (duplicados são ignorados)
+            message: Conteúdo da mensagem
+            priority: Prioridade na fila de envio (padrão PRIORITY_BULK)
+
+        Returns:
+            dict: success, message_id do broadcast, queued (destinatários enfileirados),
+                  skipped (lista de (número, motivo)), error e error_type
+        """
+        result = {
+            'success': False,
+            'message_id': None,
+            'queued': 0,
+            'skipped': [],
+            'error': None,
+            'error_type': None
+        }
+
+        try:
+            recipients = []
+            seen = set()
+            for phone in phone_numbers:
+                validation_result = self._validate_message_inputs(phone, message)
+                if not validation_result['valid']:
+                    if validation_result['error_type'] != 'invalid_phone':
+                        # Mensagem inválida: vale para todos os destinatários
+                        result['error'] = validation_result['error']
+                        result['error_type'] = validation_result['error_type']
+                        self.logger.log_error(f"Validação falhou: {result['error']}", error_type=result['error_type'])
+                        return result
+                    result['skipped'].append((phone, validation_result['error']))
+                    continue
+
+                phone_normalized = validation_result['normalized_phone']
+                if phone_normalized in seen:
+                    continue
+                seen.add(phone_normalized)
+
+                # O bridge compassa o broadcast pelo limite global: aqui só o limite do número
+                if self._rate_limiter.retry_after(phone_normalized, message_type, include_global=False) > 0:
+                    result['skipped'].append((phone, self.config.get_friendly_error_message('rate_limited')))
+                    continue
+
+                cache_result = self._check_phone_cache(phone_normalized)
+                if cache_result['action'] == 'block':
+                    result['skipped'].append((phone, cache_result['error']))
+                    continue
+
+                recipients.append(phone_normalized)
+
+            if not recipients:
+                result['error'] = "Nenhum destinatário válido para o broadcast"
+                result['error_type'] = 'no_recipients'
+                self.logger.log_error(result['error'], error_type='no_recipients')
+                return result
+
+            # Verificar Circuit Breaker
+            if not self._circuit_breaker.can_execute():
+                cb_status = self._circuit_breaker.get_status()
+                result['error'] = f"Serviço WhatsApp temporariamente indisponível (Circuit Breaker {cb_status['state']})"
+                result['error_type'] = 'circuit_breaker_open'
+                self.logger.log_error(result['error'], error_type='circuit_breaker_open')
+                return result
+
+            # Verificar se worker está disponível
+            if not self._worker_thread or not self._worker_thread.isRunning():
+                self._circuit_breaker.record_failure()
+                result['error'] = "Serviço WhatsApp não está em execução"
+                result['error_type'] = 'worker_not_running'
+                self.logger.log_error(result['error'], error_type='worker_not_running')
+                self.error_occurred.emit(result['error'])
+                return result
+
+            if priority is None:
+                priority = self.PRIORITY_BULK
+            broadcast_id = self._generate_message_id()
+            entries = [{'phone': phone, 'message_id': self._generate_message_id()} for phone in recipients]
+            if not self._worker_thread.enqueue_broadcast(entries, message, broadcast_id, priority=priority):
+                result['error'] = "Falha ao gravar o broadcast na fila de envio"
+                result['error_type'] = 'outbox_error'
+                self.logger.log_error(result['error'], error_type='outbox_error')
+                return result
+
+            # Registrar tentativa de envio de cada destinatário
+            for entry in entries:
+                self._record_message_attempt(entry['message_id'], entry['phone'], message)
+                self._rate_limiter.record(entry['phone'], message_type, include_global=False)
+
+            result['success'] = True
+            result['message_id'] = broadcast_id
+            result['queued'] = len(entries)
+
+            self.logger.log_message("Broadcast enfileirado com sucesso",
+                                  message_id=broadcast_id,
+                                  recipients=len(entries),
+                                  skipped=len(result['skipped']),
+                                  message_length=len(message))
+
+            return result
+
+        except Exception as e:
+            result['error'] = f"Erro interno ao enviar broadcast: {str(e)}"
+            result['error_type'] = 'internal_error'
+            self.logger.log_error(result['error'],
+                                error_type='internal_error',
+                                traceback=traceback.format_exc())
+            self.error_occurred.emit(self.config.get_friendly_error_message('message_failed'))
+            return result
+
     def send_media(self, chat_id: str, file_path: str, caption: str = "") -> Dict[str, Any]:
         """
         Envia um arquivo de mídia (imagem, pdf, etc.) para um chat_id.
@@ -425,15 +731,18 @@ class WhatsAppManager(QObject):
                 datetime.now() - self._connection_start_time
             ).total_seconds() if self._connection_start_time else 0,
             'cache_size': len(self._phone_cache),
-            'message_history_count': len(self._message_history),
+            'message_history_count': db.count_whatsapp_messages(),
+            'outbox': db.get_whatsapp_outbox_stats(),
             'last_health_check': self._last_health_check.isoformat() if self._last_health_check else None,
         }
 
     def clear_cache(self) -> bool:
         """Limpa cache de números verificados."""
         try:
-            self._phone_cache.clear()
-            self._save_persistent_cache()
+            with self._cache_lock:
+                self._phone_cache.clear()
+                self._cache_dirty = True
+            self._flush_persistent_cache()
             self.logger.log_message("Cache de números limpo com sucesso")
             return True
         except Exception as e:
@@ -441,14 +750,14 @@ class WhatsAppManager(QObject):
             return False
 
     def get_message_history(self, limit: int = 100, phone_filter: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Retorna histórico de mensagens com filtros."""
-        history = self._message_history
-
+        """Retorna histórico de mensagens com filtros (consulta indexada por número)."""
+        phone_normalized = None
         if phone_filter:
             phone_normalized = self._normalize_phone(phone_filter)
-            history = [msg for msg in history if msg.get('phone') == phone_normalized]
+            if not phone_normalized:
+                return []
 
-        return history[-limit:] if history else []
+        return db.get_whatsapp_messages(limit, phone_normalized)
 
     def update_authorized_users(self):
         """Informa ao CommandHandler para recarregar a lista de usuários autorizados."""
@@ -483,52 +792,6 @@ class WhatsAppManager(QObject):
         result['normalized_phone'] = phone_validation['normalized']
         return result
 
-    def _is_rate_limited(self, phone: str, message_type: str = 'normal') -> bool:
-        """Verifica se número está rate limited baseado no tipo de mensagem."""
-        if not self.config.get('rate_limiting.enable_rate_limiting', True):
-            return False
-
-        now = datetime.now()
-        phone_key = f"{phone}_{message_type}"
-        phone_counts = self._message_counts.get(phone_key, [])
-
-        # Limpar mensagens antigas (última hora)
-        cutoff_time = now - timedelta(hours=1)
-        phone_counts = [t for t in phone_counts if t > cutoff_time]
-        self._message_counts[phone_key] = phone_counts
-
-        # Definir limites baseados no tipo de mensagem
-        if message_type == 'system_automatic':
-            # Limites mais permissivos para mensagens automáticas do sistema
-            max_per_hour = self.config.get('rate_limiting.max_system_messages_per_hour', 50)
-            max_per_minute = self.config.get('rate_limiting.max_system_messages_per_minute', 5)
-            burst_limit = self.config.get('rate_limiting.system_burst_limit', 3)
-        else:
-            # Limites mais restritivos para mensagens manuais
-            max_per_hour = self.config.get('rate_limiting.max_messages_per_hour', 100)
-            max_per_minute = self.config.get('rate_limiting.max_messages_per_minute', 10)
-            burst_limit = self.config.get('rate_limiting.burst_limit', 5)
-
-        # Verificar limite por hora
-        if len(phone_counts) >= max_per_hour:
-            return True
-
-        # Verificar limite por minuto (últimas mensagens)
-        recent_cutoff = now - timedelta(minutes=1)
-        recent_count = len([t for t in phone_counts if t > recent_cutoff])
-
-        if recent_count >= max_per_minute:
-            return True
-
-        # Verificar burst limit (últimos 10 segundos)
-        burst_cutoff = now - timedelta(seconds=10)
-        burst_count = len([t for t in phone_counts if t > burst_cutoff])
-
-        if burst_count >= burst_limit:
-            return True
-
-        return False
-
     def _check_phone_cache(self, phone: str) -> Dict[str, Any]:
         """Verifica número no cache."""
         with self._cache_lock:
@@ -540,9 +803,11 @@ class WhatsAppManager(QObject):
             ttl_hours = self.config.get('validation.phone_verification_ttl_hours', 24)
             if datetime.now() - cache_entry['timestamp'] > timedelta(hours=ttl_hours):
                 del self._phone_cache[phone]
-                self._save_persistent_cache()
+                self._cache_dirty = True
                 return {'action': 'verify', 'error': None}
 
+            self._phone_cache.move_to_end(phone)
+
             # Retornar resultado do cache
             if not cache_entry['exists']:
                 return {'action': 'block', 'error': 'Número não existe no WhatsApp'}
@@ -556,37 +821,38 @@ class WhatsAppManager(QObject):
                 'exists': exists,
                 'timestamp': datetime.now()
             }
-            self._save_persistent_cache()
+            self._phone_cache.move_to_end(phone)
 
-    def _record_message_attempt(self, message_id: str, phone: str, message: str):
-        """Registra tentativa de envio no histórico."""
-        history_entry = {
-            'id': message_id,
-            'phone': phone,
-            'message': message,
-            'timestamp': datetime.now().isoformat(),
-            'status': 'sent'  # será atualizado pelo worker
-        }
+            # Limite de tamanho: descarta os números usados há mais tempo
+            max_entries = self.config.get('validation.max_phone_verification_cache', 1000)
+            while len(self._phone_cache) > max_entries:
+                self._phone_cache.popitem(last=False)
 
-        self._message_history.append(history_entry)
+            self._cache_dirty = True
 
-        # Manter limite no histórico
-        max_entries = self.config.get('monitoring.max_history_entries', 10000)
-        if len(self._message_history) > max_entries:
-            self._message_history = self._message_history[-max_entries:]
+    def _record_message_attempt(self, message_id: str, phone: str, message: str):
+        """Registra tentativa de envio no histórico (status 'sent', atualizado pelo worker)."""
+        if not db.add_whatsapp_message(message_id, phone, message):
+            return
 
-        self._save_message_history()
+        # Manter limite no histórico em lote, não a cada envio
+        with self._history_lock:
+            self._history_inserts_since_prune += 1
+            if self._history_inserts_since_prune < HISTORY_PRUNE_INTERVAL:
+                return
+            self._history_inserts_since_prune = 0
+        self._prune_message_history()
 
     def _record_message_result(self, message_id: str, success: bool, error: Optional[str] = None):
         """Atualiza resultado da mensagem no histórico."""
-        for msg in reversed(self._message_history):
-            if msg['id'] == message_id:
-                msg['status'] = 'delivered' if success else 'failed'
-                if error:
-                    msg['error'] = error
-                msg['delivered_at'] = datetime.now().isoformat()
-                self._save_message_history()
-                break
+        db.update_whatsapp_message_status(message_id, success, error)
+
+    def _prune_message_history(self):
+        """Remove as mensagens mais antigas além de monitoring.max_history_entries."""
+        max_entries = self.config.get('monitoring.max_history_entries', 10000)
+        removed = db.prune_whatsapp_messages(max_entries)
+        if removed:
+            self.logger.log_message(f"Histórico de mensagens: {removed} entradas antigas removidas")
 
     # Métodos de persistência
     def _load_persistent_cache(self):
@@ -596,67 +862,69 @@ class WhatsAppManager(QObject):
             if os.path.exists(cache_file):
                 with open(cache_file, 'r', encoding='utf-8') as f:
                     cached_data = json.load(f)
-                    # Converter timestamps de volta para datetime
+                    # Converter timestamps de volta para datetime (o arquivo já está em ordem LRU)
                     for phone, data in cached_data.items():
                         data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-                    self._phone_cache = cached_data
+                    self._phone_cache = OrderedDict(cached_data)
         except Exception as e:
             self.logger.log_error(f"Falha ao carregar cache: {e}", error_type='cache_load_failed')
 
-    def _save_persistent_cache(self):
-        """Salva cache persistente."""
-        try:
-            cache_file = self.config.get_path('cache_file')
+    def _flush_persistent_cache(self):
+        """
+        Grava o cache de números em disco se houver alterações pendentes.
+        A cópia é feita sob o lock; a escrita (arquivo temporário + rename atômico)
+        acontece fora dele, sem bloquear o caminho de envio.
+        """
+        with self._cache_lock:
+            if not self._cache_dirty:
+                return
             # Converter datetimes para strings
             save_data = {}
             for phone, data in self._phone_cache.items():
                 save_data[phone] = data.copy()
                 save_data[phone]['timestamp'] = data['timestamp'].isoformat()
+            self._cache_dirty = False
 
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2, ensure_ascii=False)
+        try:
+            cache_file = self.config.get_path('cache_file')
+            temp_file = cache_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(save_data, f, ensure_ascii=False)
+            os.replace(temp_file, cache_file)
         except Exception as e:
+            with self._cache_lock:
+                self._cache_dirty = True  # tenta de novo no próximo ciclo
             self.logger.log_error(f"Falha ao salvar cache: {e}", error_type='cache_save_failed')
 
+    def flush_persistent_state(self):
+        """Grava em disco o estado pendente (cache de números). Chamado no encerramento."""
+        self._flush_persistent_cache()
+
     def _load_message_history(self):
-        """Carrega histórico de mensagens."""
+        """Importa o antigo whatsapp_history.json (se existir) e aplica a retenção do histórico."""
         try:
             history_file = self.config.get_path('history_file')
             if os.path.exists(history_file):
                 with open(history_file, 'r', encoding='utf-8') as f:
-                    self._message_history = json.load(f)
+                    entries = json.load(f)
+                imported = db.import_whatsapp_messages(entries)
+                if imported is not None:
+                    os.replace(history_file, history_file + '.migrated')
+                    self.logger.log_message(f"Histórico JSON importado para o banco: {imported} mensagens")
+            self._prune_message_history()
         except Exception as e:
             self.logger.log_error(f"Falha ao carregar histórico: {e}", error_type='history_load_failed')
 
-    def _save_message_history(self):
-        """Salva histórico de mensagens."""
-        try:
-            history_file = self.config.get_path('history_file')
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(self._message_history, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.logger.log_error(f"Falha ao salvar histórico: {e}", error_type='history_save_failed')
-
     # Métodos utilitários
     def _generate_message_id(self) -> str:
         """Gera ID único para mensagem."""
-        return hashlib.md5(f"{datetime.now().isoformat()}{id(self)}".encode()).hexdigest()
+        return uuid.uuid4().hex
 
     def _normalize_phone(self, phone: str) -> Optional[str]:
         """Normaliza número de telefone para comparação."""
         validation = self.config.validate_phone(phone)
         return validation['normalized'] if validation['valid'] else None
 
-    def _update_message_counts(self, phone: str):
-        """Atualiza contadores de mensagens para rate limiting."""
-        if phone not in self._message_counts:
-            self._message_counts[phone] = []
-        self._message_counts[phone].append(datetime.now())
-
-        # Limpar contadores antigos
-        cutoff = datetime.now() - timedelta(hours=1)
-        self._message_counts[phone] = [t for t in self._message_counts[phone] if t > cutoff]
-
     def _cleanup_session_files(self):
         """Remove arquivos da sessão."""
         try:
@@ -681,6 +949,13 @@ class WhatsAppManager(QObject):
         except Exception as e:
             self.logger.log_error(f"Erro no cleanup forçado: {e}", error_type='force_cleanup_failed')
 
+    def _start_cache_flush_timer(self):
+        """Inicia a gravação periódica (write-behind) do cache de números."""
+        self._cache_flush_timer = QTimer(self)
+        self._cache_flush_timer.timeout.connect(self._flush_persistent_cache)
+        interval_ms = int(self.config.get('validation.cache_flush_interval', CACHE_FLUSH_INTERVAL) * 1000)
+        self._cache_flush_timer.start(interval_ms)
+
     def _start_health_monitoring(self):
         """Inicia monitoramento de saúde."""
         self._health_timer = QTimer(self)
@@ -796,11 +1071,15 @@ class WhatsAppWorker(QThread):
         self._running.set()
         self._shutdown_event = threading.Event()
 
-        # Filas thread-safe
-        self._send_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
-        self._retry_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        # Mensagens do bridge (o loop de processamento bloqueia nesta fila, sem polling)
         self._message_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
 
+        # Fila de envio persistente (whatsapp_outbox): a thread de envio dorme até
+        # este evento (nova mensagem, conexão ou parada) ou até o próximo vencimento
+        self._outbox_event = threading.Event()
+        self._sender_thread: Optional[threading.Thread] = None
+        self._last_outbox_prune = 0.0
+
         # Componentes
         self.logger = manager.logger
         self.config = manager.config
@@ -834,12 +1113,16 @@ class WhatsAppWorker(QThread):
         """Loop principal do worker com sistema de retry robusto."""
         self.logger.log_connection("Worker WhatsApp iniciado")
 
+        # Uma única thread de envio por worker, que sobrevive às reconexões
+        self._sender_thread = threading.Thread(target=self._sender_loop, daemon=True, name='sender_loop')
+        self._sender_thread.start()
+
         try:
             while self._running.is_set():
                 try:
                     # Iniciar/processar conexão
                     if self._start_connection_with_retry():
-                        # Conexão estabelecida, iniciar processamento
+                        # Processo iniciado, processar mensagens até ele terminar
                         self._process_connection_loop()
                     else:
                         # Falha permanente, sair
@@ -851,13 +1134,12 @@ class WhatsAppWorker(QThread):
                                         error_type='worker_main_loop_error',
                                         traceback=traceback.format_exc())
 
-                    # Aguardar antes de tentar novamente
-                    if self._running.is_set():
-                        retry_delay = self.config.get_backoff_delay(min(self._connection_attempts, 5))
-                        self.logger.log_connection(f"Aguardando {retry_delay:.1f}s antes de retentar")
-                        time.sleep(retry_delay)
-                    else:
-                        break
+                # Aguardar antes de reconectar (interrompido imediatamente pela parada)
+                if self._running.is_set():
+                    self._cleanup_process()
+                    retry_delay = self.config.get_backoff_delay(max(1, min(self._connection_attempts, 5)))
+                    self.logger.log_connection(f"Aguardando {retry_delay:.1f}s antes de reconectar")
+                    self._shutdown_event.wait(retry_delay)
 
         except Exception as e:
             self.logger.log_error(f"Erro fatal no worker: {e}",
@@ -872,6 +1154,7 @@ class WhatsAppWorker(QThread):
         self.logger.log_connection("Solicitando parada do worker")
         self._running.clear()
         self._shutdown_event.set()
+        self._wake_threads()
 
         # Tentar shutdown graceful do processo
         if self.process:
@@ -880,22 +1163,78 @@ class WhatsAppWorker(QThread):
             except Exception as e:
                 self.logger.log_error(f"Erro ao enviar shutdown: {e}", error_type='shutdown_send_error')
 
-    def enqueue_send(self, phone: str, message: str, message_id: Optional[str] = None):
-        """Enfileira mensagem para envio."""
+    def _wake_threads(self):
+        """Acorda o loop de processamento e a thread de envio bloqueados."""
+        self._message_queue.put(_STOP)
+        self._outbox_event.set()
+
+    def enqueue_send(self, phone: str, message: str, message_id: Optional[str] = None,
+                     priority: int = WhatsAppManager.PRIORITY_NORMAL, dedupe_key: Optional[str] = None,
+                     delay: float = 0.0) -> Optional[bool]:
+        """
+        Grava a mensagem na fila de envio persistente e acorda a thread de envio.
+        Com delay > 0 a mensagem só é enviada depois de delay segundos.
+
+        Returns:
+            True se enfileirou, False se for duplicada (dedupe_key), None em caso de erro
+        """
         payload = {
             "action": "send",
             "phone": phone,
             "message": message,
             "message_id": message_id or self._generate_message_id(),
             "timestamp": datetime.now().isoformat(),
-            "retry_count": 0
         }
-        self._send_queue.put(payload)
-        self.logger.log_message("Mensagem enfileirada no worker",
-                              message_id=payload['message_id'],
-                              queue_size=self._send_queue.qsize())
+        queued = db.enqueue_whatsapp_outbox(payload['message_id'], payload, priority, dedupe_key, delay)
+        if queued:
+            self._outbox_event.set()
+            self.logger.log_message("Mensagem enfileirada no worker",
+                                  message_id=payload['message_id'],
+                                  priority=priority,
+                                  delay=round(delay, 1))
+        return queued
+
+    def enqueue_broadcast(self, recipients: List[Dict[str, str]], message: str, message_id: str,
+                          priority: int = WhatsAppManager.PRIORITY_BULK) -> Optional[bool]:
+        """
+        Grava um broadcast (uma mensagem, vários destinatários com seus message_ids) na
+        fila de envio persistente. O bridge envia um novo destinatário a cada
+        60000 / max_global_messages_per_minute ms, com broadcast_concurrency envios
+        simultâneos e até broadcast_jitter_ms de atraso aleatório.
 
-    def enqueue_media(self, chat_id: str, file_path: str, caption: str = ""):
+        Returns:
+            True se enfileirou, None em caso de erro
+        """
+        max_per_minute = self.config.get('rate_limiting.max_global_messages_per_minute', 30)
+        payload = {
+            "action": "broadcast",
+            "recipients": recipients,
+            "message": message,
+            "message_id": message_id,
+            "concurrency": self.config.get('messages.broadcast_concurrency', 2),
+            "interval_ms": int(60000 / max_per_minute) if max_per_minute > 0 else 0,
+            "jitter_ms": self.config.get('messages.broadcast_jitter_ms', 1500),
+            "timestamp": datetime.now().isoformat(),
+        }
+        queued = db.enqueue_whatsapp_outbox(message_id, payload, priority)
+        if queued:
+            self._outbox_event.set()
+            self.logger.log_message("Broadcast enfileirado no worker",
+                                  message_id=message_id,
+                                  recipients=len(recipients),
+                                  priority=priority)
+        return queued
+
+    @staticmethod
+    def _estimate_broadcast_seconds(payload: Dict[str, Any]) -> float:
+        """Duração máxima estimada (s) de um broadcast no bridge: compasso mais os envios."""
+        concurrency = max(1, int(payload.get('concurrency') or 1))
+        pause_ms = payload.get('interval_ms', 0) * concurrency + payload.get('jitter_ms', 0)
+        rounds = -(-len(payload.get('recipients', [])) // concurrency)
+        return rounds * (pause_ms / 1000.0 + BROADCAST_SEND_SECONDS)
+
+    def enqueue_media(self, chat_id: str, file_path: str, caption: str = "",
+                      priority: int = WhatsAppManager.PRIORITY_HIGH):
         """Enfileira um comando de envio de mídia para o bridge."""
         message_id = self._generate_message_id()
         payload = {
@@ -906,11 +1245,12 @@ class WhatsAppWorker(QThread):
             "message_id": message_id,
             "timestamp": datetime.now().isoformat(),
         }
-        self._send_queue.put(payload)
+        if not db.enqueue_whatsapp_outbox(message_id, payload, priority):
+            raise RuntimeError("Falha ao gravar a mídia na fila de envio")
+        self._outbox_event.set()
         self.logger.log_message("Comando de mídia enfileirado no worker",
                               message_id=message_id,
-                              chat_id=chat_id,
-                              queue_size=self._send_queue.qsize())
+                              chat_id=chat_id)
         return message_id
 
     def _start_connection_with_retry(self) -> bool:
@@ -926,8 +1266,7 @@ class WhatsAppWorker(QThread):
 
             try:
                 if self._establish_connection():
-                    self.logger.log_connection("Conexão estabelecida com sucesso")
-                    self._connection_attempts = 0  # Reset contador
+                    self.logger.log_connection("Processo do bridge iniciado")
                     return True
 
             except Exception as e:
@@ -952,7 +1291,11 @@ class WhatsAppWorker(QThread):
         return False
 
     def _establish_connection(self) -> bool:
-        """Estabelece conexão Node.js."""
+        """
+        Inicia o processo Node.js e as threads de leitura. Não espera pelo bridge:
+        saídas precoces chegam ao loop de processamento como fim do stdout, e o
+        contador de tentativas só é zerado quando o bridge informa "connected".
+        """
         try:
             # Verificar Node.js
             node_cmd = self._find_node_command()
@@ -974,26 +1317,16 @@ class WhatsAppWorker(QThread):
                     encoding='utf-8',
                     creationflags=(subprocess.CREATE_NO_WINDOW if hasattr(subprocess, "CREATE_NO_WINDOW") else 0),
                 )
+                process = self.process
+
+            # O bridge anterior não confirmará mais o que recebeu: reenviar
+            requeued = db.requeue_inflight_whatsapp_outbox()
+            if requeued:
+                self.logger.log_connection(f"{requeued} mensagens sem confirmação devolvidas à fila de envio")
 
             # Iniciar threads de comunicação
-            threading.Thread(target=self._read_stdout, daemon=True, name='stdout_reader').start()
-            threading.Thread(target=self._read_stderr, daemon=True, name='stderr_reader').start()
-            threading.Thread(target=self._sender_loop, daemon=True, name='sender_loop').start()
-
-            # Aguardar indicação de que processo iniciou
-            timeout = self.config.get('connection.connection_timeout', 30.0)
-            start_time = time.time()
-
-            while time.time() - start_time < timeout and self._running.is_set():
-                with self._process_lock:
-                    if self.process and self.process.poll() is not None:
-                        # Processo terminou, verificar se foi erro
-                        rc = self.process.returncode
-                        if rc != 0:
-                            stdout, stderr = self.process.communicate()
-                            raise RuntimeError(f"Processo Node.js falhou (código {rc}): {stderr}")
-                        break
-                time.sleep(0.1)
+            threading.Thread(target=self._read_stdout, args=(process,), daemon=True, name='stdout_reader').start()
+            threading.Thread(target=self._read_stderr, args=(process,), daemon=True, name='stderr_reader').start()
 
             return self._running.is_set()
 
@@ -1002,96 +1335,116 @@ class WhatsAppWorker(QThread):
             raise
 
     def _process_connection_loop(self):
-        """Loop de processamento enquanto conectado."""
+        """
+        Loop de processamento enquanto o processo estiver vivo. Bloqueia na fila de
+        mensagens do bridge; o leitor do stdout enfileira ("exit", processo) quando
+        o processo termina e stop() enfileira _STOP.
+        """
         self.logger.log_connection("Entrando no loop de processamento")
 
         while self._running.is_set():
-            try:
-                if self.process and self.process.poll() is not None:
-                    # Processo terminou
-                    rc = self.process.returncode
-                    self.logger.log_error(f"Processo Node.js terminou com código {rc}",
-                                        error_type='process_terminated',
-                                        return_code=rc)
-                    break
-
-                # Processar mensagens pendentes
-                self._process_pending_messages()
-
-                # Processar mensagens da fila thread-safe
-                self._process_message_queue()
+            msg = self._message_queue.get()
+            if msg is _STOP:
+                break
 
-                time.sleep(0.1)
+            if isinstance(msg, tuple):
+                _, process = msg
+                if process is not self.process:
+                    continue  # fim de um processo anterior
+                rc = process.poll()
+                self.manager.is_ready = False
+                self.logger.log_error(f"Processo Node.js terminou com código {rc}",
+                                    error_type='process_terminated',
+                                    return_code=rc)
+                break
 
+            try:
+                self._handle_bridge_message(msg)
             except Exception as e:
                 self.logger.log_error(f"Erro no loop de processamento: {e}",
                                     error_type='processing_loop_error',
                                     traceback=traceback.format_exc())
-                break
-
-    def _process_pending_messages(self):
-        """Processa mensagens na fila de envio."""
-        try:
-            while not self._send_queue.empty() and self._running.is_set():
-                payload = self._send_queue.get_nowait()
-                self._send_message_to_bridge(payload)
-                self._send_queue.task_done()
-        except queue.Empty:
-            pass
-
-    def _process_message_queue(self):
-        """Processa mensagens da fila thread-safe na thread principal."""
-        try:
-            while not self._message_queue.empty() and self._running.is_set():
-                msg = self._message_queue.get_nowait()
-                self._handle_bridge_message(msg)
-                self._message_queue.task_done()
-        except queue.Empty:
-            pass
 
-    def _send_message_to_bridge(self, payload: Dict[str, Any]):
-        """Envia mensagem para o bridge Node.js."""
+    def _send_message_to_bridge(self, payload: Dict[str, Any]) -> bool:
+        """Escreve uma mensagem da fila no stdin do bridge Node.js."""
         try:
             self._write_stdin_json(payload)
             self.logger.log_message("Mensagem enviada para bridge",
-                                  message_id=payload.get('message_id'),
-                                  retry_count=payload.get('retry_count', 0))
+                                  message_id=payload.get('message_id'))
+            return True
 
         except Exception as e:
             self.logger.log_error(f"Falha ao enviar mensagem para bridge: {e}",
                                 error_type='bridge_send_failed',
                                 message_id=payload.get('message_id'))
+            return False
 
-            # Re-enfileirar para retry se apropriado
-            if payload.get('retry_count', 0) < 3:
-                payload['retry_count'] = payload.get('retry_count', 0) + 1
-                self._retry_queue.put(payload)
+    def _next_outbox_wait(self) -> Optional[float]:
+        """Segundos até a próxima mensagem vencida da fila (None = aguardar um evento)."""
+        if not self.manager.is_ready:
+            return None  # acordada pelo status "connected"
+        next_due = db.get_whatsapp_outbox_next_due()
+        if next_due is None:
+            return None
+        return max(0.0, next_due - time.time())
 
     def _sender_loop(self):
-        """Loop para envio de mensagens para o bridge."""
+        """
+        Loop de envio para o bridge. Dorme até chegar uma mensagem, o bridge
+        conectar ou vencer a próxima tentativa da fila persistente (sem espera
+        ativa quando ociosa) e então esvazia a fila em lotes.
+        """
         while self._running.is_set():
             try:
-                # Processar mensagens normais
-                try:
-                    payload = self._send_queue.get(timeout=0.5)
-                    self._send_message_to_bridge(payload)
-                except queue.Empty:
-                    pass
-
-                # Processar retries
-                try:
-                    retry_payload = self._retry_queue.get_nowait()
-                    # Aguardar antes de retry
-                    time.sleep(1.0)
-                    self._send_message_to_bridge(retry_payload)
-                except queue.Empty:
-                    pass
+                self._outbox_event.wait(self._next_outbox_wait())
+                self._outbox_event.clear()
+                if self._running.is_set() and self.manager.is_ready:
+                    self._drain_outbox()
 
             except Exception as e:
                 self.logger.log_error(f"Erro no loop de envio: {e}",
                                     error_type='sender_loop_error',
                                     traceback=traceback.format_exc())
-                time.sleep(1.0)  # Evitar loop apertado em caso de erro
+                self._shutdown_event.wait(1.0)  # Evitar loop apertado em caso de erro
+
+    def _drain_outbox(self):
+        """Envia ao bridge as mensagens vencidas da fila, em lotes por prioridade."""
+        max_attempts = self.config.get('messages.outbox_max_attempts', 5)
+        ack_timeout = self.config.get('messages.outbox_ack_timeout', 60.0)
+
+        ttl_seconds = self.config.get('messages.outbox_ttl_hours', 24) * 3600
+        for entry in db.expire_whatsapp_outbox(max_attempts, ttl_seconds):
+            self.logger.log_error("Mensagem removida da fila de envio sem confirmação",
+                                error_type='outbox_expired', message_id=entry['message_id'])
+            payload = entry['payload']
+            if payload.get('action') == 'broadcast':
+                # O histórico tem uma entrada por destinatário (não pelo broadcast);
+                # o payload só guarda os que ainda não foram confirmados
+                message_ids = [r.get('message_id') for r in payload.get('recipients') or [] if r.get('message_id')]
+            else:
+                message_ids = [entry['message_id']]
+            for message_id in message_ids:
+                # O slot do manager registra a falha no histórico
+                self.message_result.emit(message_id, False, "Não entregue (fila de envio expirada)")
+
+        now = time.time()
+        if now - self._last_outbox_prune >= OUTBOX_PRUNE_INTERVAL:
+            self._last_outbox_prune = now
+            db.prune_whatsapp_outbox(self.config.get('messages.outbox_retention_hours', 24) * 3600)
+
+        while self._running.is_set() and self.manager.is_ready:
+            batch = db.claim_whatsapp_outbox_batch(OUTBOX_BATCH_SIZE, max_attempts, ack_timeout)
+            for entry in batch:
+                payload = entry['payload']
+                if payload.get('action') == 'broadcast':
+                    # O resultado agregado só chega depois de todos os envios compassados
+                    db.extend_whatsapp_outbox_deadline(entry['message_id'],
+                                                       ack_timeout + self._estimate_broadcast_seconds(payload))
+                if not self._send_message_to_bridge(payload):
+                    delay = self.config.get_backoff_delay(entry['attempts'])
+                    db.retry_whatsapp_outbox(entry['message_id'], delay, "Falha na escrita para o bridge")
+            if len(batch) < OUTBOX_BATCH_SIZE:
+                break
 
     def _write_stdin_json(self, obj: Dict[str, Any]):
         """Escreve dados JSON no stdin do processo."""
@@ -1108,14 +1461,13 @@ class WhatsAppWorker(QThread):
             else:
                 raise RuntimeError("Processo não disponível para escrita")
 
-    def _read_stdout(self):
-        """Lê saída padrão do processo Node.js."""
+    def _read_stdout(self, process: subprocess.Popen):
+        """Lê saída padrão do processo Node.js e avisa o loop quando ela termina."""
         try:
-            with self._process_lock:
-                if not self.process or not self.process.stdout:
-                    return
+            if not process.stdout:
+                return
 
-            for raw in self.process.stdout:
+            for raw in process.stdout:
                 if not self._running.is_set():
                     break
 
@@ -1134,8 +1486,14 @@ class WhatsAppWorker(QThread):
 
         except Exception as e:
             self.logger.log_error(f"Erro na leitura stdout: {e}", error_type='stdout_read_error')
+        finally:
+            try:
+                process.wait(timeout=5.0)
+            except Exception:
+                pass
+            self._message_queue.put(("exit", process))
 
-    def _read_stderr(self):
+    def _read_stderr(self, process: subprocess.Popen):
         """Lê saída de erro do processo Node.js."""
         # Palavras que indicam que não é um erro real, apenas informação de debug
         ignore_patterns = [
@@ -1165,11 +1523,10 @@ class WhatsAppWorker(QThread):
         ]
         
         try:
-            with self._process_lock:
-                if not self.process or not self.process.stderr:
-                    return
+            if not process.stderr:
+                return
 
-            for raw in self.process.stderr:
+            for raw in process.stderr:
                 if not self._running.is_set():
                     break
 
@@ -1201,6 +1558,10 @@ class WhatsAppWorker(QThread):
                 self._handle_log_message(msg)
             elif msg_type == "message_result":
                 self._handle_message_result(msg)
+            elif msg_type == "broadcast_progress":
+                self._handle_broadcast_progress(msg)
+            elif msg_type == "broadcast_result":
+                self._handle_broadcast_result(msg)
             elif msg_type == "debug_message":
                 # Processar mensagens de debug do wa_bridge.js
                 debug_data = msg.get("data", {})
@@ -1299,8 +1660,13 @@ class WhatsAppWorker(QThread):
         self.logger.log_connection(f"Status do bridge: {status}")
 
         if status == "connected":
+            self._connection_attempts = 0  # Reset contador
             self.manager.is_ready = True
+            self._outbox_event.set()  # Enviar o que acumulou na fila
             self.manager.status_updated.emit("✅ Conectado com sucesso!")
+        elif status.startswith("Conexão fechada"):
+            self.manager.is_ready = False
+            self.manager.status_updated.emit(status)
         elif status.startswith("Erro") or "falhou" in status.lower():
             self.manager.error_occurred.emit(status)
         else:
@@ -1351,6 +1717,20 @@ class WhatsAppWorker(QThread):
         success = msg.get('success', False)
         error = msg.get('error')
 
+        if not success and msg.get('retryable'):
+            # Bridge ainda não conectado ao WhatsApp: a mensagem volta para a fila
+            # e a thread de envio aguarda o status "connected"
+            self.manager.is_ready = False
+            db.retry_whatsapp_outbox(message_id, 0, error)
+            self.logger.log_message("Mensagem devolvida à fila (bridge desconectado)", message_id=message_id)
+            return
+
+        finished = db.finish_whatsapp_outbox(message_id, success, error)
+        if finished is False:
+            # Confirmação repetida de uma mensagem reenviada (entrega at-least-once)
+            self.logger.log_message("Confirmação duplicada ignorada", message_id=message_id)
+            return
+
         if success:
             self._messages_sent += 1
             self.logger.log_message("Mensagem entregue",
@@ -1369,19 +1749,82 @@ class WhatsAppWorker(QThread):
             exists = msg.get('phone_exists', False)
             self.manager._update_phone_cache(phone, exists)
 
-        # Notificar manager
+        # Notificar manager (o slot registra o resultado no histórico)
         self.message_result.emit(message_id, success, error or "")
-        self.manager._record_message_result(message_id, success, error)
+
+    def _handle_broadcast_progress(self, msg: Dict[str, Any]):
+        """
+        Processa a confirmação de um destinatário de broadcast: tira o destinatário da
+        fila (um reenvio do broadcast não manda de novo para ele) e adia o prazo de
+        confirmação dos que faltam.
+        """
+        broadcast_id = msg.get('broadcast_id')
+        message_id = msg.get('message_id')
+        success = msg.get('success', False)
+        error = msg.get('error')
+
+        payload = db.ack_whatsapp_outbox_broadcast_recipient(broadcast_id, message_id, success)
+        if payload is None:
+            self.logger.log_message("Confirmação duplicada ignorada", message_id=message_id,
+                                  broadcast_id=broadcast_id)
+            return
+
+        if payload.get('recipients'):
+            ack_timeout = self.config.get('messages.outbox_ack_timeout', 60.0)
+            db.extend_whatsapp_outbox_deadline(broadcast_id,
+                                               ack_timeout + self._estimate_broadcast_seconds(payload))
+
+        if success:
+            self._messages_sent += 1
+        else:
+            self._messages_failed += 1
+            self.logger.log_error(f"Falha no envio do broadcast: {error}",
+                                error_type='message_send_failed',
+                                message_id=message_id,
+                                broadcast_id=broadcast_id)
+
+        if msg.get('phone_validation_attempted'):
+            self.manager._update_phone_cache(msg.get('phone'), msg.get('phone_exists', False))
+
+        if message_id:
+            self.message_result.emit(message_id, success, error or "")
+
+    def _handle_broadcast_result(self, msg: Dict[str, Any]):
+        """
+        Processa o fim de um broadcast. Os destinatários já foram confirmados um a um
+        (_handle_broadcast_progress), que finaliza o broadcast ao confirmar o último.
+        """
+        broadcast_id = msg.get('message_id')
+        error = msg.get('error')
+
+        if msg.get('retryable'):
+            # Bridge desconectado: os destinatários ainda pendentes voltam para a fila
+            self.manager.is_ready = False
+            db.retry_whatsapp_outbox(broadcast_id, 0, error)
+            self.logger.log_message("Broadcast devolvido à fila (bridge desconectado)",
+                                  message_id=broadcast_id,
+                                  pending=msg.get('pending'))
+            return
+
+        if not msg.get('skipped'):
+            # Normalmente já finalizado pelo último destinatário; cobre broadcasts
+            # recusados pelo bridge (sem destinatários ou sem mensagem)
+            db.finish_whatsapp_outbox(broadcast_id, msg.get('success', False), error)
+
+        self.logger.log_message("Broadcast finalizado",
+                              message_id=broadcast_id,
+                              delivered=msg.get('delivered', 0),
+                              failed=msg.get('failed', 0),
+                              skipped=msg.get('skipped', 0),
+                              error=error)
 
     def _cleanup_worker(self):
         """Limpa recursos do worker."""
         self.logger.log_connection("Iniciando cleanup do worker")
 
         try:
+            self._wake_threads()
             self._cleanup_process()
-            self._send_queue = queue.Queue()  # Limpar filas
-            self._retry_queue = queue.Queue()
-            self._message_queue = queue.Queue()
         except Exception as e:
             self.logger.log_error(f"Erro no cleanup: {e}", error_type='worker_cleanup_error')
 
@@ -1429,4 +1872,4 @@ class WhatsAppWorker(QThread):
 
     def _generate_message_id(self) -> str:
         """Gera ID único para mensagem."""
-        return hashlib.md5(f"{datetime.now().isoformat()}{threading.current_thread().ident}".encode()).hexdigest()
+        return uuid.uuid4().hex
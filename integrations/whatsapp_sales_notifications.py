@@ -4,17 +4,139 @@ Integra com o sistema de vendas para enviar notificações quando vendas são re
 """
 import json
 import os
-from typing import Dict, List, Optional, Any
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Any, Callable
+from collections import deque
 from datetime import datetime, timedelta
 from decimal import Decimal
 import logging
 
 from .whatsapp_manager import WhatsAppManager
 from .whatsapp_config import get_whatsapp_config
+from config_manager import ConfigManager
 from utils import get_data_path
 import database as db
 from data.payment_method_repository import get_all_payment_methods
 
+# Validade máxima (s) do cache de destinatários, nome da loja, formas de pagamento e
+# templates. Salvar as configurações invalida o cache na hora; o prazo cobre alterações
+# feitas fora da tela de configurações (ex.: formas de pagamento vindas da sincronização).
+NOTIFICATION_CACHE_TTL = 300.0
+
+# Eventos aguardando a thread de notificações; com a fila cheia o evento é descartado
+# (a venda nunca espera pelo WhatsApp)
+NOTIFICATION_QUEUE_SIZE = 500
+
+# Janela (s) do limite max_sale_notifications_per_minute: acima dele, ou com o rate
+# limit por hora dos destinatários esgotado, as vendas são agrupadas em um único
+# resumo enviado ao fim da janela (ou quando o rate limit voltar a permitir)
+SALE_DIGEST_WINDOW = 60.0
+
+# Vendas listadas uma a uma no resumo; as demais entram só na contagem e no total
+# (um resumo acumulado por uma hora não pode passar de messages.max_message_length)
+SALE_DIGEST_MAX_LINES = 40
+
+# Sentinela que encerra a thread de notificações
+_STOP = object()
+
+# Layouts padrão das notificações do PDV. Podem ser substituídos pelo template de mesmo
+# nome em custom_message_templates (whatsapp_sales_notifications.json) ou em
+# messages.default_templates (whatsapp_config.json). Os valores chegam já formatados.
+DEFAULT_NOTIFICATION_TEMPLATES = {
+    'sale_summary': (
+        "✅ *VENDA REALIZADA* ✅\n\n"
+        "👤 *Cliente:* {customer_name}\n"
+        "🆔 *Pedido:* {order_number}\n"
+        "🗓️ *Data/Hora:* {date_time}\n\n"
+        "📋 *ITENS*\n{items}\n"
+        "{payment}\n"
+        "{discount}"
+        "*TOTAL GERAL: R$ {total_amount}*"
+    ),
+    'cash_opening_summary': (
+        "✅ *CAIXA ABERTO* ✅\n\n"
+        "*{store_name}*\n\n"
+        "🗓️ *Data/Hora:* {date_time}\n"
+        "👤 *Operador:* {operator}\n"
+        "💰 *Saldo Inicial:* R$ {initial_amount}\n"
+        "🆔 *Sessão:* #{session_id}\n\n"
+        "_Uma nova sessão de caixa foi iniciada._"
+    ),
+    'cash_closing_report': (
+        "❌ *FECHAMENTO DE CAIXA* ❌\n\n"
+        "🏪 *{store_name}*\n\n"
+        "📅 *Data:* {date}\n"
+        "👤 *Operador:* {operator}\n"
+        "🕐 *Horário:* {open_time} às {close_time}\n"
+        "🆔 *Sessão:* #{session_id}\n\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+        "{sales_summary}\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+        "{movements_summary}\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+        "{credit_summary}\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+        "💵 *RESUMO FINAL:*\n"
+        "  • Saldo Inicial: R$ {initial_amount}\n"
+        "  • Valor Esperado: R$ {expected_amount}\n"
+        "  • Valor Contado: R$ {final_amount}\n"
+        "  {difference_symbol} *Diferença:* {difference}\n"
+        "{observations}"
+    ),
+    'credit_created': (
+        "📝 *NOVO FIADO REGISTRADO* 📝\n\n"
+        "*Cliente:* {customer_name}\n"
+        "*Valor:* R$ {amount}\n"
+        "*Data:* {date_time}\n"
+        "*Operador:* {operator}\n"
+        "*ID do Fiado:* {credit_sale_id}"
+    ),
+    'credit_paid': (
+        "🎉 *FIADO QUITADO* 🎉\n\n"
+        "*Cliente:* {customer_name}\n"
+        "*Valor Total Pago:* R$ {total_paid}\n"
+        "*Data da Quitação:* {date_time}\n"
+        "*ID do Fiado:* {credit_sale_id}"
+    ),
+    'sale_digest': (
+        "📊 *RESUMO DE VENDAS* 📊\n\n"
+        "*{store_name}*\n\n"
+        "🕐 *Período:* {start_time} às {end_time}\n"
+        "🧾 *Vendas:* {count}\n\n"
+        "{sales}\n"
+        "*TOTAL: R$ {total_amount}*"
+    ),
+}
+
+# Campos de cada template (store_name vale para todos)
+NOTIFICATION_TEMPLATE_FIELDS = {
+    'sale_summary': ('customer_name', 'order_number', 'date_time', 'items', 'payment', 'discount', 'total_amount'),
+    'cash_opening_summary': ('date_time', 'operator', 'initial_amount', 'session_id'),
+    'cash_closing_report': ('date', 'operator', 'open_time', 'close_time', 'session_id', 'sales_summary',
+                            'movements_summary', 'credit_summary', 'initial_amount', 'expected_amount',
+                            'final_amount', 'difference_symbol', 'difference', 'observations'),
+    'credit_created': ('customer_name', 'amount', 'date_time', 'operator', 'credit_sale_id'),
+    'credit_paid': ('customer_name', 'total_paid', 'date_time', 'credit_sale_id'),
+    'sale_digest': ('start_time', 'end_time', 'count', 'sales', 'total_amount'),
+    'low_stock_alert': ('product_name', 'current_stock', 'min_stock'),
+}
+
+
+def _compile_template(name: str, source: str) -> Callable[..., str]:
+    """
+    Valida o template uma vez (sintaxe e campos, com uma renderização de teste) e
+    retorna o str.format ligado a ele. Lança ValueError se o template for inválido.
+    """
+    fields = ('store_name',) + NOTIFICATION_TEMPLATE_FIELDS.get(name, ())
+    try:
+        source.format(**{field: '' for field in fields})
+    except (KeyError, IndexError, ValueError, AttributeError) as e:
+        raise ValueError(f"template '{name}' inválido: {e!r}") from e
+    return source.format
+
+
 class WhatsAppSalesNotifier:
     """
     Notificador de vendas que envia mensagens automáticas via WhatsApp.
@@ -24,8 +146,21 @@ class WhatsAppSalesNotifier:
         self.manager = WhatsAppManager.get_instance()
         self.config = get_whatsapp_config()
         self._notification_settings_path = get_data_path('whatsapp_sales_notifications.json')
+        # Destinatários, nome da loja, formas de pagamento e templates compilados,
+        # montados uma vez e descartados ao salvar as configurações (invalidate_cache)
+        self._cache: Optional[Dict[str, Any]] = None
         self._load_notification_settings()
         self._recent_sale_ids = {}
+        self._recent_sale_ids_lock = threading.Lock()
+
+        # Fila de eventos (vendas, fiados) consumida por uma thread própria, iniciada
+        # no primeiro evento. Só a thread mexe nos envios recentes e no resumo pendente.
+        self._events: "queue.Queue[Any]" = queue.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+        self._consumer: Optional[threading.Thread] = None
+        self._consumer_lock = threading.Lock()
+        self._recent_sale_sends: deque = deque()
+        self._digest: List[Dict[str, Any]] = []
+        self._digest_deadline = 0.0
 
     def _load_notification_settings(self):
         """Carrega configurações de notificações."""
@@ -39,6 +174,7 @@ class WhatsAppSalesNotifier:
         except Exception as e:
             logging.error(f"Erro ao carregar configurações de notificações: {e}", exc_info=True)
             self.notification_settings = self._get_default_settings()
+        self.invalidate_cache()
 
     def _save_notification_settings(self):
         """Salva configurações de notificações."""
@@ -47,6 +183,59 @@ class WhatsAppSalesNotifier:
                 json.dump(self.notification_settings, f, indent=4, ensure_ascii=False)
         except Exception as e:
             logging.error(f"Erro ao salvar configurações de notificações: {e}", exc_info=True)
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """Descarta o cache de destinatários, loja, formas de pagamento e templates."""
+        self._cache = None
+
+    def _get_cache(self) -> Dict[str, Any]:
+        """
+        Retorna o cache das notificações, montando-o se estiver vazio ou vencido.
+        É trocado por inteiro (sem lock): duas threads no máximo o montam duas vezes.
+        """
+        cache = self._cache
+        if cache is not None and time.monotonic() - cache['built_at'] < NOTIFICATION_CACHE_TTL:
+            return cache
+
+        cache = {
+            'built_at': time.monotonic(),
+            'recipients': self._load_notification_recipients(),
+            'store_name': self._load_store_name(),
+            'payment_methods': self._load_payment_method_names(),
+            'templates': {},
+        }
+        self._cache = cache
+        return cache
+
+    def _render(self, template_name: str, **values) -> Optional[str]:
+        """Renderiza um template de notificação (compilado na primeira vez que é usado)."""
+        cache = self._get_cache()
+        render = cache['templates'].get(template_name)
+        if render is None:
+            render = self._compile_notification_template(template_name)
+            if render is None:
+                return None
+            cache['templates'][template_name] = render
+        return render(store_name=cache['store_name'], **values)
+
+    def _compile_notification_template(self, template_name: str) -> Optional[Callable[..., str]]:
+        """
+        Compila o template pela ordem custom_message_templates, messages.default_templates
+        (WhatsAppConfig) e layout padrão; um template personalizado inválido é ignorado.
+        """
+        custom = (self.notification_settings.get('custom_message_templates') or {}).get(template_name)
+        candidates = [custom, self.config.get_template(template_name),
+                      DEFAULT_NOTIFICATION_TEMPLATES.get(template_name)]
+        for source in candidates:
+            if not source:
+                continue
+            try:
+                return _compile_template(template_name, source)
+            except ValueError as e:
+                logging.warning(f"Ignorando template de notificação personalizado: {e}")
+        logging.error(f"Template de notificação '{template_name}' não encontrado.")
+        return None
 
     def _get_default_settings(self) -> Dict[str, Any]:
         """Retorna configurações padrão."""
@@ -57,6 +246,7 @@ class WhatsAppSalesNotifier:
             'notification_recipients': [],
             'detailed_payment_breakdown': True,
             'minimum_sale_value': 0.0,
+            'max_sale_notifications_per_minute': 3,  # acima disso, um resumo por minuto (0 = sem limite por minuto)
             'notification_delay': 0,  # segundos
             'custom_message_templates': {},
             'last_notification_times': {}
@@ -64,7 +254,7 @@ class WhatsAppSalesNotifier:
 
     def notify_sale(self, sale_data: Dict[str, Any], payment_details: List[Dict[str, Any]], change_amount: float) -> bool:
         """
-        Notifica uma venda realizada.
+        Notifica uma venda realizada (na thread de quem chamou; o fluxo de venda usa enqueue_sale).
 
         Args:
             sale_data: Dados da venda (id, customer_name, total_amount, etc.)
@@ -75,10 +265,184 @@ class WhatsAppSalesNotifier:
             bool: True se notificou com sucesso
         """
         try:
-            # Anti-duplication check
-            sale_id = sale_data.get('id')
-            now = datetime.now()
+            if not self._should_notify_sale(sale_data):
+                return True  # sem reenvio
+            return self._send_sale_notification(sale_data, payment_details, change_amount)
+
+        except Exception as e:
+            logging.error(f"Erro ao notificar venda: {e}", exc_info=True)
+            return False
+
+    def enqueue_sale(self, sale_data: Dict[str, Any], payment_details: List[Dict[str, Any]], change_amount: float) -> bool:
+        """
+        Enfileira a notificação de uma venda e retorna imediatamente: verificações,
+        montagem da mensagem e envio ficam na thread de notificações.
 
+        Returns:
+            bool: True se enfileirou, False se a fila estiver cheia (notificação descartada)
+        """
+        event = {
+            'id': sale_data.get('id'),
+            'session_sale_id': sale_data.get('session_sale_id'),
+            'customer_name': sale_data.get('customer_name'),
+            'total_amount': sale_data.get('total_amount', 0.0),
+            'discount_value': sale_data.get('discount_value', 0.0),
+            # Cópias: a tela de vendas limpa a lista de itens logo depois
+            'items': [dict(item) for item in sale_data.get('items', [])],
+            'payments': [dict(payment) for payment in payment_details],
+            'change_amount': change_amount,
+            'sold_at': datetime.now(),
+        }
+        return self._enqueue_event(('sale', event))
+
+    def enqueue_credit_created(self, credit_sale_id: int) -> bool:
+        """Enfileira a notificação de um novo fiado (ver enqueue_sale)."""
+        return self._enqueue_event(('credit_created', credit_sale_id))
+
+    def stop(self, timeout: float = 5.0):
+        """Encerra a thread de notificações, enviando antes o resumo pendente."""
+        with self._consumer_lock:
+            consumer = self._consumer
+        if consumer is None or not consumer.is_alive():
+            return
+        try:
+            self._events.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning("Fila de notificações cheia ao encerrar; eventos pendentes descartados.")
+            return
+        consumer.join(timeout)
+
+    def _enqueue_event(self, event) -> bool:
+        """Coloca um evento na fila sem bloquear, iniciando a thread de notificações se preciso."""
+        with self._consumer_lock:
+            if self._consumer is None or not self._consumer.is_alive():
+                self._consumer = threading.Thread(target=self._consume_events, daemon=True,
+                                                  name='sales_notifier')
+                self._consumer.start()
+        try:
+            self._events.put_nowait(event)
+            return True
+        except queue.Full:
+            logging.warning(f"Fila de notificações cheia; notificação '{event[0]}' descartada.")
+            return False
+
+    def _consume_events(self):
+        """
+        Thread de notificações. Bloqueia na fila de eventos (ou até o fim da janela
+        do resumo pendente) e envia as notificações fora do fluxo de venda.
+        """
+        while True:
+            timeout = max(0.0, self._digest_deadline - time.monotonic()) if self._digest else None
+            try:
+                event = self._events.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+
+            try:
+                if event is _STOP:
+                    self._flush_sale_digest(force=True)
+                    return
+                if event is not None:
+                    kind, payload = event
+                    if kind == 'sale':
+                        self._process_sale_event(payload)
+                    elif kind == 'credit_created':
+                        self.notify_credit_created(payload)
+                if self._digest and time.monotonic() >= self._digest_deadline:
+                    self._flush_sale_digest()
+            except Exception as e:
+                logging.error(f"Erro na thread de notificações do WhatsApp: {e}", exc_info=True)
+
+    def _process_sale_event(self, sale: Dict[str, Any]):
+        """
+        Envia a notificação da venda ou, passado o limite max_sale_notifications_per_minute
+        na janela ou com o rate limit dos destinatários esgotado (ex.: o limite por hora
+        de mensagens automáticas), guarda a venda no resumo enviado ao fim da janela.
+        """
+        if not self._should_notify_sale(sale):
+            return
+
+        limit = self.notification_settings.get('max_sale_notifications_per_minute', 3)
+        now = time.monotonic()
+        while self._recent_sale_sends and now - self._recent_sale_sends[0] >= SALE_DIGEST_WINDOW:
+            self._recent_sale_sends.popleft()
+
+        if not self._digest and (limit <= 0 or len(self._recent_sale_sends) < limit):
+            wait = self._sale_rate_limit_wait()
+            if wait <= 0:
+                self._recent_sale_sends.append(now)
+                self._send_sale_notification(sale, sale['payments'], sale['change_amount'])
+                return
+            self._digest_deadline = now + max(SALE_DIGEST_WINDOW, wait)
+        elif not self._digest:
+            self._digest_deadline = now + SALE_DIGEST_WINDOW
+        self._digest.append(sale)
+
+    def _sale_rate_limit_wait(self) -> float:
+        """Maior espera do rate limiter (mensagens automáticas) entre os destinatários."""
+        waits = []
+        for phone in self._get_notification_recipients():
+            try:
+                waits.append(self.manager.get_rate_limit_wait(phone, 'system_automatic'))
+            except Exception as e:
+                logging.error(f"Erro ao consultar o rate limit de {phone}: {e}", exc_info=True)
+        return max(waits, default=0.0)
+
+    def _flush_sale_digest(self, force: bool = False):
+        """
+        Envia o resumo das vendas agrupadas na janela. Com o rate limit esgotado o
+        resumo continua juntando vendas até o próximo envio permitido (force envia
+        assim mesmo; o WhatsAppManager adia a mensagem na fila).
+        """
+        if not self._digest:
+            return
+        if not force:
+            wait = self._sale_rate_limit_wait()
+            if wait > 0:
+                self._digest_deadline = time.monotonic() + wait
+                return
+
+        sales, self._digest = self._digest, []
+        self._recent_sale_sends.append(time.monotonic())
+
+        lines = []
+        total = Decimal(0)
+        for sale in sales:
+            amount = Decimal(sale.get('total_amount', 0))
+            total += amount
+            order = sale.get('session_sale_id') if sale.get('session_sale_id') is not None else sale.get('id', 'N/A')
+            customer = (sale.get('customer_name') or '').strip() or 'Consumidor Final'
+            if len(lines) < SALE_DIGEST_MAX_LINES:
+                lines.append(f"  - Pedido {order} ({customer}): R$ {amount:.2f}\n")
+        if len(sales) > SALE_DIGEST_MAX_LINES:
+            lines.append(f"  ... e mais {len(sales) - SALE_DIGEST_MAX_LINES} vendas\n")
+
+        message = self._render('sale_digest',
+                               start_time=sales[0]['sold_at'].strftime('%H:%M'),
+                               end_time=sales[-1]['sold_at'].strftime('%H:%M'),
+                               count=len(sales),
+                               sales=''.join(lines),
+                               total_amount=f"{total:.2f}")
+        if not message:
+            return
+
+        digest_id = f"{sales[0].get('id')}-{sales[-1].get('id')}"
+        for phone in self._get_notification_recipients():
+            try:
+                result = self.manager.send_message(phone, message, message_type='system_automatic',
+                                                   dedupe_key=f"sale_digest:{digest_id}:{phone}")
+                if not result.get('success'):
+                    logging.warning(f"Falha ao enviar resumo de vendas para {phone}: {result.get('error')}")
+            except Exception as e:
+                logging.error(f"Erro ao enviar resumo de vendas para {phone}: {e}", exc_info=True)
+
+    def _should_notify_sale(self, sale_data: Dict[str, Any]) -> bool:
+        """Aplica a deduplicação, as chaves de ativação e o valor mínimo da venda."""
+        # Anti-duplication check
+        sale_id = sale_data.get('id')
+        now = datetime.now()
+
+        with self._recent_sale_ids_lock:
             # Clean up old entries from the cache (older than 1 minute)
             cleanup_time = now - timedelta(minutes=1)
             keys_to_delete = [k for k, v in self._recent_sale_ids.items() if v < cleanup_time]
@@ -90,50 +454,55 @@ class WhatsAppSalesNotifier:
                 time_since_notification = now - self._recent_sale_ids[sale_id]
                 if time_since_notification < timedelta(seconds=15):
                     logging.warning(f"Tentativa de notificação duplicada bloqueada para a venda ID: {sale_id}")
-                    return True  # Return True to signal success and prevent re-queueing
+                    return False
 
-            if not db.are_notifications_globally_enabled():
-                logging.info("Envio de notificação de venda ignorado (desativado globalmente).")
-                return True
+        if not db.are_notifications_globally_enabled():
+            logging.info("Envio de notificação de venda ignorado (desativado globalmente).")
+            return False
 
-            # Verificar se notificações estão habilitadas
-            if not self.notification_settings.get('enable_sale_notifications', False):
-                return True
+        # Verificar se notificações estão habilitadas
+        if not self.notification_settings.get('enable_sale_notifications', False):
+            return False
 
-            # Verificar valor mínimo
-            min_value = self.notification_settings.get('minimum_sale_value', 0.0)
-            if float(sale_data.get('total_amount', 0)) < min_value:
-                return True
-            
-            # Add sale ID to cache before sending
-            if sale_id:
+        # Verificar valor mínimo
+        min_value = self.notification_settings.get('minimum_sale_value', 0.0)
+        if float(sale_data.get('total_amount', 0)) < min_value:
+            return False
+
+        # Add sale ID to cache before sending
+        if sale_id:
+            with self._recent_sale_ids_lock:
                 self._recent_sale_ids[sale_id] = now
+        return True
 
-            # Construir mensagem detalhada
-            message = self._build_sale_message(sale_data, payment_details, change_amount)
+    def _send_sale_notification(self, sale_data: Dict[str, Any], payment_details: List[Dict[str, Any]],
+                                change_amount: float) -> bool:
+        """Monta a mensagem da venda e a envia para todos os destinatários."""
+        sale_id = sale_data.get('id')
 
-            if not message:
-                return False
+        # Construir mensagem detalhada
+        message = self._build_sale_message(sale_data, payment_details, change_amount)
 
-            # Enviar para todos os destinatários configurados
-            recipients = self._get_notification_recipients()
-            success_count = 0
+        if not message:
+            return False
 
-            for phone in recipients:
-                try:
-                    result = self.manager.send_message(phone, message, message_type='system_automatic')
-                    if result.get('success'):
-                        success_count += 1
-                    else:
-                        logging.warning(f"Falha ao enviar notificação para {phone}: {result.get('error')}")
-                except Exception as e:
-                    logging.error(f"Erro ao enviar notificação para {phone}: {e}", exc_info=True)
+        # Enviar para todos os destinatários configurados
+        recipients = self._get_notification_recipients()
+        success_count = 0
 
-            return success_count > 0
+        for phone in recipients:
+            try:
+                # dedupe_key: a fila de envio não aceita a mesma venda duas vezes para o número
+                result = self.manager.send_message(phone, message, message_type='system_automatic',
+                                                   dedupe_key=f"sale:{sale_id}:{phone}" if sale_id else None)
+                if result.get('success'):
+                    success_count += 1
+                else:
+                    logging.warning(f"Falha ao enviar notificação para {phone}: {result.get('error')}")
+            except Exception as e:
+                logging.error(f"Erro ao enviar notificação para {phone}: {e}", exc_info=True)
 
-        except Exception as e:
-            logging.error(f"Erro ao notificar venda: {e}", exc_info=True)
-            return False
+        return success_count > 0
 
     def notify_cash_opening(self, user_name: str, initial_amount: float, summary_dict: Dict[str, Any]) -> bool:
         """Notifica abertura de caixa."""
@@ -148,15 +517,13 @@ class WhatsAppSalesNotifier:
             # Correção do Bug de Horário: Captura a hora exata do envio
             now_str = datetime.now().strftime('%d/%m/%Y %H:%M')
 
-            message = (
-                f"✅ *CAIXA ABERTO* ✅\n\n"
-                f"*{self._get_store_name()}*\n\n"
-                f"🗓️ *Data/Hora:* {now_str}\n"
-                f"👤 *Operador:* {user_name}\n"
-                f"💰 *Saldo Inicial:* R$ {initial_amount:.2f}\n"
-                f"🆔 *Sessão:* #{summary_dict.get('id', 'N/A')}\n\n"
-                f"_Uma nova sessão de caixa foi iniciada._"
-            )
+            message = self._render('cash_opening_summary',
+                                   date_time=now_str,
+                                   operator=user_name,
+                                   initial_amount=f"{initial_amount:.2f}",
+                                   session_id=summary_dict.get('id', 'N/A'))
+            if not message:
+                return False
 
             recipients = self._get_notification_recipients()
             success_count = 0
@@ -249,27 +616,24 @@ class WhatsAppSalesNotifier:
             observations = report.get('observations', '')
             obs_summary = f"\n📝 *OBSERVAÇÕES:*\n_{observations}_\n" if observations else ""
 
-            message = (
-                f"❌ *FECHAMENTO DE CAIXA* ❌\n\n"
-                f"🏪 *{self._get_store_name()}*\n\n"
-                f"📅 *Data:* {open_time.split(' ')[0]}\n"
-                f"👤 *Operador:* {user_name}\n"
-                f"🕐 *Horário:* {open_time.split(' ')[1]} às {close_time}\n"
-                f"🆔 *Sessão:* #{session.get('id', 'N/A')}\n\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"{sales_summary}\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"{movements_summary}\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"{credit_summary}\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"💵 *RESUMO FINAL:*\n"
-                f"  • Saldo Inicial: R$ {initial:.2f}\n"
-                f"  • Valor Esperado: R$ {expected:.2f}\n"
-                f"  • Valor Contado: R$ {final:.2f}\n"
-                f"  {diff_symbol} *Diferença:* {diff_text}\n"
-                f"{obs_summary}"
-            )
+            open_date, _, open_hour = open_time.partition(' ')
+            message = self._render('cash_closing_report',
+                                   date=open_date,
+                                   operator=user_name,
+                                   open_time=open_hour,
+                                   close_time=close_time,
+                                   session_id=session.get('id', 'N/A'),
+                                   sales_summary=sales_summary,
+                                   movements_summary=movements_summary,
+                                   credit_summary=credit_summary,
+                                   initial_amount=f"{initial:.2f}",
+                                   expected_amount=f"{expected:.2f}",
+                                   final_amount=f"{final:.2f}",
+                                   difference_symbol=diff_symbol,
+                                   difference=diff_text,
+                                   observations=obs_summary)
+            if not message:
+                return False
 
             recipients = self._get_notification_recipients()
             success_count = 0
@@ -288,12 +652,12 @@ class WhatsAppSalesNotifier:
             if not self.notification_settings.get('enable_low_stock_alerts', False):
                 return True
 
-            template = self.config.get_template('low_stock_alert')
-            message = template.format(
-                product_name=product_data.get('description', 'Produto'),
-                current_stock=product_data.get('stock_quantity', 0),
-                min_stock=product_data.get('min_stock', 0)
-            )
+            message = self._render('low_stock_alert',
+                                   product_name=product_data.get('description', 'Produto'),
+                                   current_stock=product_data.get('stock_quantity', 0),
+                                   min_stock=product_data.get('min_stock', 0))
+            if not message:
+                return False
 
             recipients = self._get_notification_recipients()
             success_count = 0
@@ -313,7 +677,8 @@ class WhatsAppSalesNotifier:
         """Constrói a mensagem de notificação de venda detalhada."""
         try:
             # --- Coleta de Dados ---
-            now_str = datetime.now().strftime('%d/%m/%Y %H:%M')
+            # Vendas enfileiradas guardam o horário da venda (sold_at)
+            now_str = (sale_data.get('sold_at') or datetime.now()).strftime('%d/%m/%Y %H:%M')
             session_sale_id = sale_data.get("session_sale_id")
 
             # Correção para nome do cliente
@@ -342,8 +707,7 @@ class WhatsAppSalesNotifier:
                     items_str += f"  - {desc} ({qty} un) - R$ {total_price:.2f}\n"
 
             # --- Construção do Pagamento (com detalhamento) ---
-            payment_methods_from_db = db.get_all_payment_methods()
-            payment_method_map = {method['id']: method['name'] for method in payment_methods_from_db}
+            payment_method_map = self._get_cache()['payment_methods']
 
             total_paid = sum(Decimal(p['amount']) for p in payment_details)
             payment_str = f"💰 *PAGAMENTO*\n"
@@ -371,18 +735,14 @@ class WhatsAppSalesNotifier:
             if discount_value > 0:
                 discount_str = f"*Desconto:* R$ {discount_value:.2f}\n"
 
-            message = (
-                f"✅ *VENDA REALIZADA* ✅\n\n"
-                f"👤 *Cliente:* {customer_name}\n"
-                f"🆔 *Pedido:* {display_sale_id}\n"
-                f"🗓️ *Data/Hora:* {now_str}\n\n"
-                f"📋 *ITENS*\n{items_str}\n"
-                f"{payment_str}\n"
-                f"{discount_str}"
-                f"*TOTAL GERAL: R$ {total_amount:.2f}*"
-            )
-            
-            return message
+            return self._render('sale_summary',
+                                customer_name=customer_name,
+                                order_number=display_sale_id,
+                                date_time=now_str,
+                                items=items_str,
+                                payment=payment_str,
+                                discount=discount_str,
+                                total_amount=f"{total_amount:.2f}")
 
         except Exception as e:
             logging.error(f"Erro ao construir mensagem de venda detalhada: {e}", exc_info=True)
@@ -390,12 +750,19 @@ class WhatsAppSalesNotifier:
 
     def _get_notification_recipients(self) -> List[str]:
         """Retorna lista de destinatários para notificações, incluindo o grupo configurado."""
+        return list(self._get_cache()['recipients'])
+
+    def _get_store_name(self) -> str:
+        """Obtém nome da loja."""
+        return self._get_cache()['store_name']
+
+    def _load_notification_recipients(self) -> List[str]:
+        """Lê os destinatários das configurações, do banco e do grupo de notificação."""
         # Pega destinatários individuais das configurações de notificação
-        recipients = self.notification_settings.get('notification_recipients', [])
+        recipients = list(self.notification_settings.get('notification_recipients', []))
 
         # Incluir configuração global se existir (número do admin/gerente)
         try:
-            import database as db
             global_number = db.load_setting('whatsapp_notification_number', '')
             if global_number and global_number not in recipients:
                 recipients.append(global_number)
@@ -413,18 +780,22 @@ class WhatsAppSalesNotifier:
         # Remove duplicados para garantir que cada ID seja único
         return list(dict.fromkeys(recipients))
 
-
-
-    def _get_store_name(self) -> str:
-        """Obtém nome da loja."""
+    def _load_store_name(self) -> str:
+        """Lê o nome da loja do config.json."""
         try:
-            import database as db
-            config = db.load_config()
-            return config.get('store', {}).get('name', 'PDV')
+            return ConfigManager().get_section('store').get('name') or 'PDV'
         except Exception as e:
             logging.debug(f"Erro ao obter nome da loja: {e}")
             return 'PDV'
 
+    def _load_payment_method_names(self) -> Dict[Any, str]:
+        """Lê o mapa id -> nome das formas de pagamento."""
+        try:
+            return {method['id']: method['name'] for method in get_all_payment_methods()}
+        except Exception as e:
+            logging.error(f"Erro ao obter formas de pagamento: {e}", exc_info=True)
+            return {}
+
     # Métodos para configuração das notificações
     def enable_sale_notifications(self, enabled: bool):
         """Habilita/desabilita notificações de vendas."""
@@ -473,14 +844,14 @@ class WhatsAppSalesNotifier:
                 return False
 
             now_str = datetime.now().strftime('%d/%m/%Y %H:%M')
-            message = (
-                f"📝 *NOVO FIADO REGISTRADO* 📝\n\n"
-                f"*Cliente:* {details['customer_name']}\n"
-                f"*Valor:* R$ {details['amount']:.2f}\n"
-                f"*Data:* {now_str}\n"
-                f"*Operador:* {details['username']}\n"
-                f"*ID do Fiado:* {credit_sale_id}"
-            )
+            message = self._render('credit_created',
+                                   customer_name=details['customer_name'],
+                                   amount=f"{details['amount']:.2f}",
+                                   date_time=now_str,
+                                   operator=details['username'],
+                                   credit_sale_id=credit_sale_id)
+            if not message:
+                return False
 
             recipients = self._get_notification_recipients()
             success_count = 0
@@ -504,13 +875,13 @@ class WhatsAppSalesNotifier:
                 return False
 
             now_str = datetime.now().strftime('%d/%m/%Y %H:%M')
-            message = (
-                f"🎉 *FIADO QUITADO* 🎉\n\n"
-                f"*Cliente:* {details['customer_name']}\n"
-                f"*Valor Total Pago:* R$ {details['total_paid']:.2f}\n"
-                f"*Data da Quitação:* {now_str}\n"
-                f"*ID do Fiado:* {credit_sale_id}"
-            )
+            message = self._render('credit_paid',
+                                   customer_name=details['customer_name'],
+                                   total_paid=f"{details['total_paid']:.2f}",
+                                   date_time=now_str,
+                                   credit_sale_id=credit_sale_id)
+            if not message:
+                return False
 
             recipients = self._get_notification_recipients()
             success_count = 0
@@ -536,3 +907,13 @@ def get_whatsapp_sales_notifier() -> WhatsAppSalesNotifier:
     if _sales_notifier_instance is None:
         _sales_notifier_instance = WhatsAppSalesNotifier()
     return _sales_notifier_instance
+
+def stop_sales_notifier():
+    """Encerra a thread de notificações (se o notificador já foi criado)."""
+    if _sales_notifier_instance is not None:
+        _sales_notifier_instance.stop()
+
+def invalidate_sales_notifier_cache():
+    """Descarta o cache do notificador (se já criado) após salvar configurações usadas nas mensagens."""
+    if _sales_notifier_instance is not None:
+        _sales_notifier_instance.invalidate_cache()
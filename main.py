@@ -8,7 +8,7 @@ import logging
 import yoyo
 
 from data.connection import DB_FILE
-from data.migration_fixes import check_and_fix_sync_columns
+from data.migration_fixes import check_and_fix_sync_columns, ensure_id_map_triggers, ensure_sync_outbox_triggers, ensure_sync_status_indexes, ensure_sync_base_triggers
 from data.schema import apply_automatic_fixes
 
 # Configuracao basica de logging
@@ -88,6 +88,7 @@ import database as db
 import updater
 from log_handler import QtLogHandler
 from aviso_scheduler import AvisoScheduler
+from stats_scheduler import StatsScheduler
 
 from backup_scheduler import backup_manager
 
@@ -217,6 +218,16 @@ class PDVApplication:
                 logging.error(f"Erro durante verificação de correção das colunas de sincronização: {e}")
                 # Não interrompe a inicialização por causa deste erro
 
+            # Mapa de IDs local <-> web (tradução de FKs), outbox da sincronização em background
+            # índices parciais das pendências e snapshots para o merge de edições concorrentes
+            try:
+                ensure_id_map_triggers()
+                ensure_sync_outbox_triggers()
+                ensure_sync_status_indexes()
+                ensure_sync_base_triggers()
+            except Exception as e:
+                logging.error(f"Erro ao preparar triggers e índices da sincronização: {e}")
+
             # Aplica correções automáticas de Python após as migrações
             try:
                 apply_automatic_fixes()
@@ -276,6 +287,13 @@ class PDVApplication:
         # Inicia a verificação de atualização em segundo plano
         self.start_background_update_check()
 
+        # Inicia o pré-cálculo noturno das estatísticas usadas nos relatórios comparativos
+        try:
+            self.stats_scheduler = StatsScheduler()
+            self.stats_scheduler.start_scheduler()
+        except Exception as e:
+            logging.error(f"Erro ao iniciar o StatsScheduler: {e}")
+
         try:
             from integrations.whatsapp_manager import WhatsAppManager
             
@@ -333,6 +351,24 @@ class PDVApplication:
         if hasattr(self, 'aviso_scheduler') and self.aviso_scheduler:
             self.aviso_scheduler.stop_scheduler()
             logging.info("AvisoScheduler parado.")
+
+        if hasattr(self, 'stats_scheduler') and self.stats_scheduler:
+            self.stats_scheduler.stop_scheduler()
+
+        # Envia o resumo de vendas pendente para a fila do WhatsApp
+        try:
+            from integrations.whatsapp_sales_notifications import stop_sales_notifier
+            stop_sales_notifier()
+        except Exception as e:
+            logging.error(f"Erro ao parar o notificador de vendas: {e}")
+
+        # Grava o estado pendente do WhatsApp (cache de números) antes de fechar o banco
+        try:
+            from integrations.whatsapp_manager import WhatsAppManager
+            if WhatsAppManager._instance:
+                WhatsAppManager._instance.flush_persistent_state()
+        except Exception as e:
+            logging.error(f"Erro ao gravar o estado do WhatsApp: {e}")
         
         # Parar Backup Manager
         try:
@@ -0,0 +1,57 @@
+-- Migration: Add sales_daily_rollup table and keyset pagination index
+-- Description: Keeps per-day sales count and revenue up to date through triggers,
+-- so the sales history can show period totals without a COUNT(*) over the sales table.
+-- Also adds an index matching the keyset pagination order (sale_date, id).
+
+CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+    sale_day TEXT PRIMARY KEY, -- 'YYYY-MM-DD'
+    sales_count INTEGER NOT NULL DEFAULT 0,
+    total_cents INTEGER NOT NULL DEFAULT 0
+);
+
+-- Preenche a tabela com o histórico existente (apenas vendas fora do modo treinamento)
+INSERT OR REPLACE INTO sales_daily_rollup (sale_day, sales_count, total_cents)
+SELECT DATE(sale_date), COUNT(*), COALESCE(SUM(total_amount), 0)
+FROM sales
+WHERE training_mode = 0
+GROUP BY DATE(sale_date);
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_daily_rollup_insert
+AFTER INSERT ON sales
+WHEN NEW.training_mode = 0
+BEGIN
+    INSERT INTO sales_daily_rollup (sale_day, sales_count, total_cents)
+    VALUES (DATE(NEW.sale_date), 1, NEW.total_amount)
+    ON CONFLICT(sale_day) DO UPDATE SET
+        sales_count = sales_count + 1,
+        total_cents = total_cents + excluded.total_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_daily_rollup_delete
+AFTER DELETE ON sales
+WHEN OLD.training_mode = 0
+BEGIN
+    UPDATE sales_daily_rollup
+    SET sales_count = sales_count - 1,
+        total_cents = total_cents - OLD.total_amount
+    WHERE sale_day = DATE(OLD.sale_date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_daily_rollup_update
+AFTER UPDATE OF sale_date, total_amount, training_mode ON sales
+BEGIN
+    UPDATE sales_daily_rollup
+    SET sales_count = sales_count - 1,
+        total_cents = total_cents - OLD.total_amount
+    WHERE sale_day = DATE(OLD.sale_date) AND OLD.training_mode = 0;
+
+    INSERT INTO sales_daily_rollup (sale_day, sales_count, total_cents)
+    SELECT DATE(NEW.sale_date), 1, NEW.total_amount
+    WHERE NEW.training_mode = 0
+    ON CONFLICT(sale_day) DO UPDATE SET
+        sales_count = sales_count + 1,
+        total_cents = total_cents + excluded.total_cents;
+END;
+
+-- Índice para a paginação por cursor: filtra training_mode e percorre (sale_date, id)
+CREATE INDEX IF NOT EXISTS idx_sales_training_date ON sales (training_mode, sale_date);
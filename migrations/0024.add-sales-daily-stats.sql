@@ -0,0 +1,16 @@
+-- Migration: Add sales_daily_stats table
+-- Description: Compact per-day baselines (revenue, sales, items, kg and hourly curve),
+-- precomputed nightly by the stats scheduler for days that are already closed.
+-- Comparative reports read the baseline period from this table instead of
+-- aggregating the sales history again.
+
+CREATE TABLE IF NOT EXISTS sales_daily_stats (
+    stat_day TEXT PRIMARY KEY, -- 'YYYY-MM-DD'
+    weekday INTEGER NOT NULL, -- 0 = domingo ... 6 = sábado (strftime('%w'))
+    sales_count INTEGER NOT NULL DEFAULT 0,
+    revenue_cents INTEGER NOT NULL DEFAULT 0,
+    items_count INTEGER NOT NULL DEFAULT 0,
+    weight_kg REAL NOT NULL DEFAULT 0,
+    hourly_cents TEXT NOT NULL DEFAULT '[]', -- JSON com 24 valores (centavos por hora)
+    computed_at TEXT
+);
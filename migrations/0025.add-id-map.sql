@@ -0,0 +1,15 @@
+-- Migration: Add id_map table
+-- Description: Local <-> web id translation table used by the sync to resolve
+-- foreign keys in batch (one IN (...) query per parent table) instead of one
+-- lookup per row. It is kept up to date by triggers on each synced table,
+-- created by ensure_id_map_triggers() (data/migration_fixes.py) once the
+-- id_web column is guaranteed to exist.
+
+CREATE TABLE IF NOT EXISTS id_map (
+    table_name TEXT NOT NULL,
+    local_id INTEGER NOT NULL,
+    web_id TEXT NOT NULL,
+    PRIMARY KEY (table_name, local_id)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_id_map_web ON id_map (table_name, web_id);
@@ -0,0 +1,15 @@
+-- Migration: Add sync_outbox table
+-- Description: Change notifications for the background sync service. Each synced
+-- table gets triggers (created by ensure_sync_outbox_triggers() in
+-- data/migration_fixes.py, once the sync columns are guaranteed to exist) that
+-- record every row left in a pending_* sync status. There is at most one entry
+-- per record: a new change replaces the entry, moving it to a higher id.
+
+CREATE TABLE IF NOT EXISTS sync_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    local_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_outbox_record ON sync_outbox (table_name, local_id);
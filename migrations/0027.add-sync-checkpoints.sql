@@ -0,0 +1,13 @@
+-- Migration: Add sync_checkpoints table
+-- Description: Per-table download checkpoints. synced_until is the timestamp up to
+-- which the table is fully downloaded; cursor_updated_at / cursor_id are the
+-- (updated_at, id) of the last web record committed in the current window, written
+-- in the same transaction as each chunk so an interrupted sync resumes from there.
+
+CREATE TABLE IF NOT EXISTS sync_checkpoints (
+    table_name TEXT PRIMARY KEY,
+    synced_until TEXT,
+    cursor_updated_at TEXT,
+    cursor_id INTEGER,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,29 @@
+-- Migration: Add sync_metrics table
+-- Description: Ring table with the telemetry of the last sync runs (full sync or
+-- background push). Each run has one row per table plus a totals row
+-- (table_name = '*'). Older runs are pruned by the collector.
+
+CREATE TABLE IF NOT EXISTS sync_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    kind TEXT NOT NULL, -- 'full' (sincronização completa) | 'push' (envio em background)
+    table_name TEXT NOT NULL, -- '*' = totais da execução
+    started_at TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL DEFAULT 0,
+    rows_up INTEGER NOT NULL DEFAULT 0,
+    rows_down INTEGER NOT NULL DEFAULT 0,
+    bytes_up INTEGER NOT NULL DEFAULT 0,
+    bytes_down INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    latency_p50_ms INTEGER,
+    latency_p95_ms INTEGER,
+    latency_max_ms INTEGER,
+    build_ms INTEGER NOT NULL DEFAULT 0, -- montagem de payloads (tradução de FKs, tipos)
+    network_ms INTEGER NOT NULL DEFAULT 0, -- soma das latências HTTP
+    db_ms INTEGER NOT NULL DEFAULT 0, -- gravações no SQLite
+    backlog INTEGER NOT NULL DEFAULT 0 -- pendências restantes ao final da execução
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_metrics_run ON sync_metrics (run_id);
@@ -0,0 +1,33 @@
+-- Migration: Add sync_base and sync_conflicts tables
+-- Description: Conflict-aware merge of concurrent edits (two terminals editing the
+-- same row between syncs).
+-- sync_base keeps, for each row with a pending local edit, the last version known
+-- to be in sync with the web (the common ancestor of the three-way merge). It is
+-- filled by triggers created by ensure_sync_base_triggers() (data/migration_fixes.py)
+-- when a synced row becomes 'pending_update' and removed when it is synced again.
+-- sync_conflicts is the queue of rows changed on both sides, detected by the
+-- download or before uploading an update, and resolved in batch by the SyncManager.
+
+CREATE TABLE IF NOT EXISTS sync_base (
+    table_name TEXT NOT NULL,
+    local_id INTEGER NOT NULL,
+    data TEXT NOT NULL, -- JSON da última versão sincronizada
+    local_modified_at TEXT NOT NULL, -- UTC da última alteração local (last-writer-wins)
+    PRIMARY KEY (table_name, local_id)
+);
+
+CREATE TABLE IF NOT EXISTS sync_conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    local_id INTEGER NOT NULL,
+    id_web TEXT NOT NULL,
+    web_updated_at TEXT,
+    web_data TEXT NOT NULL, -- JSON da versão da web (já com as FKs locais)
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'resolved')),
+    resolution TEXT, -- JSON {campo: 'local' | 'web' | 'soma'}
+    detected_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    resolved_at TEXT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_conflicts_pending
+ON sync_conflicts (table_name, local_id) WHERE status = 'pending';
@@ -0,0 +1,12 @@
+-- Migration: Add terminal_id to cash_sessions, sales and sale_items
+-- Description: Identity of the checkout terminal (config.json "terminal.id") that
+-- created the row, for stores with more than one terminal sharing the catalog
+-- through the sync. In store mode ("terminal.store_mode") the column is uploaded
+-- (the Supabase tables need a terminal_id text column) and each terminal only
+-- downloads its own cash sessions, sales and sale items.
+
+ALTER TABLE cash_sessions ADD COLUMN terminal_id TEXT;
+ALTER TABLE sales ADD COLUMN terminal_id TEXT;
+ALTER TABLE sale_items ADD COLUMN terminal_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_cash_sessions_terminal_status ON cash_sessions (terminal_id, status);
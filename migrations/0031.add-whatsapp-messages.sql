@@ -0,0 +1,19 @@
+-- Migration: Add whatsapp_messages table
+-- Description: WhatsApp message history (replaces whatsapp_history.json, which was
+-- rewritten in full on every send and delivery ack). One row per message id;
+-- sending appends a row, the bridge ack updates it in place. Retention is kept
+-- by the WhatsAppManager (monitoring.max_history_entries), pruning the oldest ids.
+
+CREATE TABLE IF NOT EXISTS whatsapp_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT NOT NULL UNIQUE,
+    phone TEXT NOT NULL,
+    message TEXT,
+    status TEXT NOT NULL DEFAULT 'sent', -- 'sent' | 'delivered' | 'failed'
+    error TEXT,
+    created_at TEXT NOT NULL,
+    delivered_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_whatsapp_messages_phone ON whatsapp_messages (phone, id);
+CREATE INDEX IF NOT EXISTS idx_whatsapp_messages_created_at ON whatsapp_messages (created_at);
@@ -0,0 +1,28 @@
+-- Migration: Add whatsapp_outbox table
+-- Description: Durable queue of outgoing WhatsApp messages (send / send_media).
+-- send_message writes the bridge payload here and the worker drains it in batches,
+-- by priority (lower = more urgent) and id. A claimed row stays 'inflight' until
+-- the bridge acknowledges it; rows not acknowledged in time (or left inflight by a
+-- bridge that died) are sent again: delivery is at-least-once. Finished rows
+-- ('sent' / 'failed') are kept for a while so dedupe_key also blocks late
+-- duplicates, then pruned by the worker. Times are epoch seconds.
+
+CREATE TABLE IF NOT EXISTS whatsapp_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT NOT NULL UNIQUE,
+    dedupe_key TEXT, -- ex.: 'sale:<id>:<telefone>'; NULL = sem deduplicação
+    payload TEXT NOT NULL, -- JSON enviado ao bridge
+    priority INTEGER NOT NULL DEFAULT 5,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'inflight', 'sent', 'failed')),
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_whatsapp_outbox_dedupe
+ON whatsapp_outbox (dedupe_key) WHERE dedupe_key IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_whatsapp_outbox_due
+ON whatsapp_outbox (priority, id) WHERE status IN ('pending', 'inflight');
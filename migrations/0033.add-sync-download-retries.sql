@@ -0,0 +1,16 @@
+-- Migration: Add sync_download_retries table
+-- Description: Web records that could not be written locally during a download
+-- (payload not built, or the row failed even when written one by one). The table
+-- checkpoint still moves past them, so they are kept here and fetched again by id
+-- at the next sync until they are written, disappear from the web or reach the
+-- retry limit (DOWNLOAD_RETRY_MAX_ATTEMPTS in data/sync_manager.py).
+
+CREATE TABLE IF NOT EXISTS sync_download_retries (
+    table_name TEXT NOT NULL,
+    id_web TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    last_error TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, id_web)
+);
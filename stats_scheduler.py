@@ -0,0 +1,58 @@
+import logging
+from datetime import datetime
+from PyQt6.QtCore import QTimer, QObject, QThreadPool, pyqtSignal
+import database as db
+from ui.worker import EnhancedWorker
+
+class StatsScheduler(QObject):
+    """
+    Agendador do pré-cálculo noturno das estatísticas diárias usadas como base
+    nos relatórios comparativos. Roda uma vez por dia (ou na abertura do sistema,
+    se o cálculo do dia ainda não foi feito), sempre em background.
+    """
+
+    stats_refreshed = pyqtSignal(int)  # número de dias gravados
+
+    SETTING_KEY = 'daily_stats_last_refresh'
+
+    def __init__(self):
+        super().__init__()
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.check_and_refresh)
+        self.is_running = False
+
+        logging.info("StatsScheduler inicializado.")
+
+    def start_scheduler(self):
+        """Inicia o agendador, verificando a cada 30 minutos se o dia virou."""
+        self.timer.start(30 * 60 * 1000)
+        self.check_and_refresh()
+        logging.info("StatsScheduler iniciado.")
+
+    def stop_scheduler(self):
+        """Para o agendador."""
+        self.timer.stop()
+        logging.info("StatsScheduler parado.")
+
+    def check_and_refresh(self):
+        """Dispara o pré-cálculo se ele ainda não foi executado hoje."""
+        today = datetime.now().strftime('%Y-%m-%d')
+        if self.is_running or db.load_setting(self.SETTING_KEY, '') == today:
+            return
+
+        self.is_running = True
+        worker = EnhancedWorker(db.refresh_daily_stats)
+        worker.signals.finished.connect(lambda days: self._on_refresh_finished(days, today))
+        worker.signals.error.connect(self._on_refresh_error)
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_refresh_finished(self, days, day_str):
+        self.is_running = False
+        if days is None:
+            return  # Falhou; tenta novamente na próxima verificação
+        db.save_setting(self.SETTING_KEY, day_str)
+        self.stats_refreshed.emit(days)
+
+    def _on_refresh_error(self, error):
+        self.is_running = False
+        logging.error(f"Erro no pré-cálculo das estatísticas diárias: {error[0]}")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Teste de carga da sincronização, sem internet, usando o Supabase local
+(data/fake_supabase.py).
+
+Cria dois bancos do PDV em uma pasta temporária (dois "terminais"), popula o
+primeiro com N vendas, itens, vendas fiado e pagamentos e mede os ciclos:
+  1. envio completo (todas as linhas pendentes do terminal A);
+  2. download completo (terminal B vazio);
+  3. envio incremental (parte dos produtos/clientes alterada + novas vendas);
+  4. download incremental (terminal B).
+
+Para cada ciclo mostra o tempo total e as métricas do SyncManager (linhas,
+requisições, latências e tempo de montagem/rede/SQLite). Com a mesma semente e
+os mesmos parâmetros, os resultados são comparáveis entre versões do código.
+Com --store-mode, os terminais usam o modo loja (terminal B não baixa as vendas
+do terminal A), para comparar volume e tamanho do banco com o modo padrão.
+
+Uso:
+    python sync_benchmark.py --sales 5000 --latency-ms 30
+"""
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SUMMARY_COLUMNS = (
+    ('Ciclo', 'cycle'),
+    ('Tempo (s)', 'elapsed'),
+    ('Linhas ↑', 'rows_up'),
+    ('Linhas ↓', 'rows_down'),
+    ('Req.', 'requests'),
+    ('p50 (ms)', 'latency_p50_ms'),
+    ('p95 (ms)', 'latency_p95_ms'),
+    ('Montagem (ms)', 'build_ms'),
+    ('Rede (ms)', 'network_ms'),
+    ('SQLite (ms)', 'db_ms'),
+    ('Linhas/s', 'rows_per_second'),
+    ('Pendências', 'backlog'),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Teste de carga da sincronização com o Supabase local.")
+    parser.add_argument('--sales', type=int, default=5000, help="Vendas geradas no terminal A (padrão: 5000)")
+    parser.add_argument('--items', type=int, default=3, help="Itens por venda (padrão: 3)")
+    parser.add_argument('--credit-ratio', type=float, default=0.1, help="Fração das vendas que são fiado (padrão: 0.1)")
+    parser.add_argument('--products', type=int, default=200, help="Produtos cadastrados (padrão: 200)")
+    parser.add_argument('--customers', type=int, default=500, help="Clientes cadastrados (padrão: 500)")
+    parser.add_argument('--changed-ratio', type=float, default=0.05,
+                        help="Fração de produtos/clientes alterados no envio incremental (padrão: 0.05)")
+    parser.add_argument('--new-sales-ratio', type=float, default=0.1,
+                        help="Novas vendas no envio incremental, em fração de --sales (padrão: 0.1)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Latência simulada por requisição (padrão: 0)")
+    parser.add_argument('--store-mode', action='store_true', help="Terminais no modo loja (downloads filtrados por terminal)")
+    parser.add_argument('--seed', type=int, default=42, help="Semente dos dados gerados (padrão: 42)")
+    parser.add_argument('--workdir', help="Pasta de trabalho (padrão: pasta temporária, removida ao final)")
+    parser.add_argument('--verbose', action='store_true', help="Mostra os logs da sincronização")
+    return parser.parse_args()
+
+
+def prepare_database(path):
+    """Cria um banco do PDV como o main.py: migrações do yoyo + correções e triggers de sincronização."""
+    import yoyo
+    from yoyo.backends.core.sqlite3 import SQLiteBackend
+    from yoyo.connections import parse_uri
+    from yoyo.migrations import default_migration_table
+    import data.connection as connection
+    import data.migration_fixes as migration_fixes
+
+    connection.close_connection_pool()
+    connection.DB_FILE = path
+
+    conn = connection.get_db_connection()
+    conn.execute("CREATE TABLE IF NOT EXISTS yoyo_lock (locked INT DEFAULT 1, pid INT, ctime TEXT, PRIMARY KEY (locked))")
+    conn.commit()
+    conn.close()
+
+    backend = SQLiteBackend(parse_uri(f'sqlite:///{path}'), default_migration_table)
+    migrations = yoyo.read_migrations(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+    for migration in backend.to_apply(migrations):
+        try:
+            backend.apply_one(migration)
+        except connection.sqlite3.OperationalError as e:
+            error_message = str(e).lower()
+            if 'duplicate column' in error_message or 'already another table or index with this name' in error_message:
+                backend.mark_migrations([migration])
+            else:
+                raise
+
+    # O cache de 24h da verificação fica na pasta de trabalho (cada banco é novo)
+    migration_fixes.CACHE_FILE = os.path.join(os.path.dirname(path), '.sync_check_cache.json')
+    if os.path.exists(migration_fixes.CACHE_FILE):
+        os.remove(migration_fixes.CACHE_FILE)
+    migration_fixes.check_and_fix_sync_columns()
+    migration_fixes.ensure_id_map_triggers()
+    migration_fixes.ensure_sync_outbox_triggers()
+    migration_fixes.ensure_sync_status_indexes()
+    migration_fixes.ensure_sync_base_triggers()
+
+
+def use_database(path):
+    import data.connection as connection
+    connection.close_connection_pool()
+    connection.DB_FILE = path
+
+
+def use_terminal(path, terminal_id, store_mode):
+    """Aponta o sistema para o banco e a identidade (config.json) de um terminal."""
+    from config_manager import ConfigManager
+    from data.terminal import reload_terminal_config
+
+    use_database(path)
+    ConfigManager().update_section('terminal', {'id': terminal_id, 'store_mode': store_mode})
+    reload_terminal_config()
+
+
+def database_size_mb(path):
+    import sqlite3
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size / (1024 * 1024)
+    finally:
+        conn.close()
+
+
+def seed_database(args, rng):
+    """Popula o terminal A com cadastros e o histórico de vendas (tudo 'pending_create')."""
+    from data.connection import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("INSERT INTO users (username, password_hash, role) VALUES ('bench', 'x', 'operador')")
+    user_id = cursor.lastrowid
+    cursor.execute("INSERT INTO product_groups (name) VALUES ('Benchmark')")
+    group_id = cursor.lastrowid
+
+    cursor.executemany(
+        "INSERT INTO products (description, barcode, price, stock, sale_type, group_id) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Produto {i}", f"BENCH{i:06d}", rng.randint(100, 5000), 1000, 'unit', group_id)
+         for i in range(args.products)]
+    )
+    product_ids = [row[0] for row in cursor.execute("SELECT id FROM products WHERE barcode LIKE 'BENCH%'")]
+
+    cursor.executemany(
+        "INSERT INTO customers (name, cpf, phone, credit_limit) VALUES (?, ?, ?, ?)",
+        [(f"Cliente {i}", f"{i:011d}", f"8899{i:07d}", 50000) for i in range(args.customers)]
+    )
+    customer_ids = [row[0] for row in cursor.execute("SELECT id FROM customers WHERE name LIKE 'Cliente %'")]
+
+    conn.commit()
+    conn.close()
+
+    add_sales(args.sales, args, rng, user_id, product_ids, customer_ids)
+    return user_id, product_ids, customer_ids
+
+
+def add_sales(count, args, rng, user_id, product_ids, customer_ids):
+    """Gera 'count' vendas com itens, sessões de caixa (200 vendas cada), vendas fiado e pagamentos."""
+    from data.connection import get_db_connection
+    from data.terminal import get_terminal_id
+
+    terminal_id = get_terminal_id()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    start = datetime.now() - timedelta(days=30)
+
+    session_id = None
+    for i in range(count):
+        sale_date = start + timedelta(seconds=i * 30)
+        if i % 200 == 0:
+            cursor.execute(
+                "INSERT INTO cash_sessions (user_id, open_time, initial_amount, status, terminal_id) VALUES (?, ?, 10000, 'closed', ?)",
+                (user_id, sale_date.strftime('%Y-%m-%d %H:%M:%S'), terminal_id)
+            )
+            session_id = cursor.lastrowid
+
+        items = []
+        for _ in range(args.items):
+            quantity = rng.randint(1, 3)
+            unit_price = rng.randint(100, 5000)
+            items.append((rng.choice(product_ids), quantity, unit_price, quantity * unit_price))
+        total = sum(item[3] for item in items)
+
+        cursor.execute(
+            "INSERT INTO sales (sale_date, total_amount, user_id, cash_session_id, terminal_id) VALUES (?, ?, ?, ?, ?)",
+            (sale_date.strftime('%Y-%m-%d %H:%M:%S'), total, user_id, session_id, terminal_id)
+        )
+        sale_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price, terminal_id) VALUES (?, ?, ?, ?, ?, ?)",
+            [(sale_id, *item, terminal_id) for item in items]
+        )
+
+        if rng.random() < args.credit_ratio:
+            cursor.execute(
+                "INSERT INTO credit_sales (customer_id, sale_id, amount, status, user_id) VALUES (?, ?, ?, 'pending', ?)",
+                (rng.choice(customer_ids), sale_id, total, user_id)
+            )
+            if rng.random() < 0.5:
+                cursor.execute(
+                    "INSERT INTO credit_payments (credit_sale_id, amount_paid, user_id, payment_method, cash_session_id) "
+                    "VALUES (?, ?, ?, 'Dinheiro', ?)",
+                    (cursor.lastrowid, total // 2, user_id, session_id)
+                )
+
+    conn.commit()
+    conn.close()
+
+
+def change_records(args, rng, user_id, product_ids, customer_ids):
+    """Altera parte dos produtos e clientes ('pending_update') e registra novas vendas."""
+    from data.connection import get_db_connection
+
+    conn = get_db_connection()
+    changed_products = rng.sample(product_ids, max(1, int(len(product_ids) * args.changed_ratio)))
+    changed_customers = rng.sample(customer_ids, max(1, int(len(customer_ids) * args.changed_ratio)))
+    conn.executemany(
+        "UPDATE products SET price = price + 10, sync_status = 'pending_update' WHERE id = ?",
+        [(product_id,) for product_id in changed_products]
+    )
+    conn.executemany(
+        "UPDATE customers SET credit_limit = credit_limit + 1000, sync_status = 'pending_update' WHERE id = ?",
+        [(customer_id,) for customer_id in changed_customers]
+    )
+    conn.commit()
+    conn.close()
+
+    add_sales(max(1, int(args.sales * args.new_sales_ratio)), args, rng, user_id, product_ids, customer_ids)
+
+
+def run_cycle(manager, name, upload):
+    """Executa um ciclo de envio ou download e retorna a linha de totais das métricas."""
+    manager.metrics.begin_run(f'bench-{name}')
+    start = time.perf_counter()
+    if upload:
+        manager._sync_pending_creates()
+        manager._sync_pending_updates()
+    else:
+        new_sync_timestamp = datetime.now(timezone.utc).isoformat()
+        if manager._sync_web_to_local(new_sync_timestamp):
+            manager.settings_repo.save_setting('last_sync_timestamp', new_sync_timestamp)
+    elapsed = time.perf_counter() - start
+    manager._finish_metrics()
+
+    totals = dict(manager.last_run_metrics or {})
+    rows = totals.get('rows_up', 0) + totals.get('rows_down', 0)
+    totals.update({
+        'cycle': name,
+        'elapsed': f"{elapsed:.2f}",
+        'rows_per_second': int(rows / elapsed) if elapsed else 0,
+    })
+    return totals
+
+
+def print_summary(results):
+    headers = [header for header, _ in SUMMARY_COLUMNS]
+    table = [[str(result.get(key) if result.get(key) is not None else '-') for _, key in SUMMARY_COLUMNS]
+             for result in results]
+    widths = [max(len(header), *(len(row[i]) for row in table)) for i, header in enumerate(headers)]
+
+    print()
+    print('  '.join(header.rjust(width) for header, width in zip(headers, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in table:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+    print()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='pdv-sync-bench-')
+    # Antes de importar o sistema: pdv.db e config.json ficam na pasta de trabalho
+    os.environ['APPDATA'] = workdir
+
+    from data.fake_supabase import FakeSupabaseClient
+    from data.sync_manager import SyncManager
+
+    rng = random.Random(args.seed)
+    terminal_a = os.path.join(workdir, 'terminal_a.db')
+    terminal_b = os.path.join(workdir, 'terminal_b.db')
+    for path in (terminal_a, terminal_b):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    try:
+        print(f"Pasta de trabalho: {workdir}")
+        prepare_database(terminal_b)
+        prepare_database(terminal_a)
+        use_terminal(terminal_a, 'terminal-a', args.store_mode)
+
+        start = time.perf_counter()
+        user_id, product_ids, customer_ids = seed_database(args, rng)
+        print(f"Terminal A populado com {args.sales} vendas em {time.perf_counter() - start:.2f}s.")
+
+        server = FakeSupabaseClient(os.path.join(workdir, 'supabase.db'), latency_ms=args.latency_ms)
+        manager = SyncManager()
+        manager.api_client.client = server
+        manager.api_client._initialized = True
+
+        results = [run_cycle(manager, 'envio completo', upload=True)]
+
+        use_terminal(terminal_b, 'terminal-b', args.store_mode)
+        results.append(run_cycle(manager, 'download completo', upload=False))
+
+        use_terminal(terminal_a, 'terminal-a', args.store_mode)
+        change_records(args, rng, user_id, product_ids, customer_ids)
+        results.append(run_cycle(manager, 'envio incremental', upload=True))
+
+        use_terminal(terminal_b, 'terminal-b', args.store_mode)
+        results.append(run_cycle(manager, 'download incremental', upload=False))
+
+        print_summary(results)
+        print(f"Requisições ao Supabase local: {server.request_count}")
+        use_database(terminal_a)
+        print(f"Tamanho do banco: terminal A {database_size_mb(terminal_a):.2f} MB, "
+              f"terminal B {database_size_mb(terminal_b):.2f} MB")
+        server.close()
+    finally:
+        use_database(terminal_a)
+        import data.connection as connection
+        connection.close_connection_pool()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
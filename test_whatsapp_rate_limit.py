@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Teste do rate limit das notificações automáticas do WhatsApp.
+
+Simula um dia movimentado (uma venda a cada 30 s por horas) notificando o gerente
+e o grupo: nenhuma notificação pode ser recusada e os envios agendados na fila
+precisam respeitar os limites de rajada, minuto e hora de cada destinatário.
+
+Uso: python -m pytest -q test_whatsapp_rate_limit.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['APPDATA'] = tempfile.mkdtemp()
+
+import pytest
+
+pytest.importorskip('PyQt6')
+pytest.importorskip('yoyo')
+pytest.importorskip('requests')
+
+from PyQt6.QtCore import QCoreApplication
+
+import database as db
+import sync_benchmark
+from integrations import whatsapp_manager as wm
+from integrations import whatsapp_sales_notifications as wsn
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+RECIPIENTS = ['5588999990001', '120363000000000001@g.us']
+SALE_INTERVAL = 30.0
+SALES = 240
+
+
+class FakeClock:
+    """Relógio controlado pelo teste (substitui time.monotonic no rate limiter)."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeWorker:
+    """Worker que só registra o que seria gravado na fila de envio."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.scheduled = {}
+        self.messages = {}
+        self.delays = []
+
+    def isRunning(self):
+        return True
+
+    def enqueue_send(self, phone, message, message_id, priority=None, dedupe_key=None, delay=0.0):
+        self.scheduled.setdefault(phone, []).append(self.clock() + delay)
+        self.messages.setdefault(phone, []).append(message)
+        self.delays.append(delay)
+        return True
+
+
+@pytest.fixture(scope='module')
+def manager():
+    db_path = os.path.join(os.environ['APPDATA'], 'rate_limit.db')
+    sync_benchmark.prepare_database(db_path)
+    return wm.WhatsAppManager()
+
+
+def max_in_window(timestamps, window):
+    """Maior quantidade de envios em qualquer janela [t, t + window)."""
+    timestamps = sorted(timestamps)
+    best = start = 0
+    for end, sent_at in enumerate(timestamps):
+        while sent_at - timestamps[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def test_sustained_sale_notifications_are_deferred_not_refused(manager):
+    clock = FakeClock()
+    manager._rate_limiter = wm.SlidingWindowRateLimiter(manager.config, clock=clock)
+    worker = FakeWorker(clock)
+    manager._worker_thread = worker
+
+    deferred = 0
+    for sale in range(SALES):
+        for phone in RECIPIENTS:
+            result = manager.send_message(phone, f"Venda {sale}", message_type='system_automatic',
+                                          dedupe_key=f"sale:{sale}:{phone}")
+            assert result['success'], result
+            deferred += 'deferred' in result
+        clock.now += SALE_INTERVAL
+
+    # 240 vendas em 2 h passam do limite por hora: parte foi adiada, nada recusado
+    assert deferred > 0
+    limits = manager._rate_limiter._limits('system_automatic')
+    windows = (wm.SlidingWindowRateLimiter.BURST_WINDOW,
+               wm.SlidingWindowRateLimiter.MINUTE_WINDOW,
+               wm.SlidingWindowRateLimiter.HOUR_WINDOW)
+    assert len(worker.scheduled) == len(RECIPIENTS)
+    for phone, timestamps in worker.scheduled.items():
+        assert len(timestamps) == SALES
+        for window, limit in zip(windows, limits):
+            assert max_in_window(timestamps, window) <= limit, (phone, window)
+
+
+def test_sale_digest_waits_for_the_hourly_limit(manager, monkeypatch):
+    clock = FakeClock()
+    manager._rate_limiter = wm.SlidingWindowRateLimiter(manager.config, clock=clock)
+    worker = FakeWorker(clock)
+    manager._worker_thread = worker
+    monkeypatch.setattr(wsn, 'time', SimpleNamespace(monotonic=clock))
+
+    db.set_global_notification_status(True)
+    notifier = wsn.WhatsAppSalesNotifier()
+    notifier.manager = manager
+    notifier.notification_settings.update(enable_sale_notifications=True, minimum_sale_value=0,
+                                          notification_recipients=RECIPIENTS)
+    notifier.invalidate_cache()
+
+    for sale_id in range(1, SALES + 1):
+        if notifier._digest and clock() >= notifier._digest_deadline:
+            notifier._flush_sale_digest()
+        notifier._process_sale_event({
+            'id': sale_id, 'session_sale_id': sale_id, 'customer_name': f"Cliente {sale_id}",
+            'total_amount': 10.0, 'discount_value': 0.0, 'items': [], 'payments': [],
+            'change_amount': 0.0, 'sold_at': datetime.now(),
+        })
+        clock.now += SALE_INTERVAL
+    while notifier._digest:
+        clock.now = max(clock.now, notifier._digest_deadline)
+        notifier._flush_sale_digest()
+
+    # Resumos só saem quando o rate limit permite: nenhuma mensagem fica adiada na fila
+    assert worker.delays and not any(worker.delays)
+    limits = manager._rate_limiter._limits('system_automatic')
+    for phone, messages in worker.messages.items():
+        assert max_in_window(worker.scheduled[phone], wm.SlidingWindowRateLimiter.HOUR_WINDOW) <= limits[2]
+        # Toda venda chega ao destinatário, sozinha ou dentro de um resumo
+        notified = 0
+        for message in messages:
+            digest = re.search(r"Vendas:\* (\d+)", message)
+            notified += int(digest.group(1)) if digest else 1
+        assert notified == SALES, phone
+
+
+def test_manual_messages_are_still_refused(manager):
+    clock = FakeClock()
+    manager._rate_limiter = wm.SlidingWindowRateLimiter(manager.config, clock=clock)
+    manager._worker_thread = FakeWorker(clock)
+
+    burst_limit = manager._rate_limiter._limits('normal')[0]
+    results = [manager.send_message(RECIPIENTS[0], f"Mensagem {i}") for i in range(burst_limit + 1)]
+    assert all(result['success'] for result in results[:burst_limit])
+    assert results[-1]['error_type'] == 'rate_limited'
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main(['-q', __file__]))
@@ -27,6 +27,8 @@ class CashPage(QWidget):
 
     # Sinal emitido quando o estado do caixa muda (aberto/fechado)
     cash_session_changed = pyqtSignal()
+    # Usado para trazer o evento de venda (publicado em qualquer thread) para a thread da UI
+    _sale_event_received = pyqtSignal(dict)
 
     def __init__(self, current_user):
         super().__init__()
@@ -47,10 +49,18 @@ class CashPage(QWidget):
         self.setup_ui()
         self.load_initial_data()
 
-        # Timer para atualizações em tempo real (pode ser menos frequente agora)
+        # As vendas da sessão disparam a atualização por evento (agrupadas em 1s);
+        # o timer fica apenas como reconciliação para movimentações e outras mudanças
+        self.sale_refresh_timer = QTimer(self)
+        self.sale_refresh_timer.setSingleShot(True)
+        self.sale_refresh_timer.setInterval(1000)
+        self.sale_refresh_timer.timeout.connect(self.update_live_data)
+        self._sale_event_received.connect(self.on_sale_registered)
+        db.subscribe_sale_registered(self._on_sale_event)
+
         self.update_timer = QTimer(self)
         self.update_timer.timeout.connect(self.update_live_data)
-        self.update_timer.start(30000) # Atualiza a cada 30 segundos
+        self.update_timer.start(300000) # Reconcilia a cada 5 minutos
 
     def setup_ui(self):
         main_layout = QHBoxLayout(self)
@@ -80,6 +90,15 @@ class CashPage(QWidget):
     def update_live_data(self):
         self.cash_manager.get_status_async()
 
+    def _on_sale_event(self, event):
+        # Pode ser chamado fora da thread principal: o sinal enfileira o evento
+        self._sale_event_received.emit(event)
+
+    def on_sale_registered(self, event):
+        """Agenda a atualização do resumo quando uma venda da sessão aberta é registrada."""
+        if self.session_id and event.get('cash_session_id') == self.session_id:
+            self.sale_refresh_timer.start()
+
     def on_status_updated(self, session):
         self.session_id = session['id'] if session else None
         self.update_status_card(session)
@@ -658,4 +677,6 @@ Caixa aberto com sucesso no sistema PDV."""
 
     def closeEvent(self, event):
         self.update_timer.stop()
+        self.sale_refresh_timer.stop()
+        db.unsubscribe_sale_registered(self._on_sale_event)
         super().closeEvent(event)
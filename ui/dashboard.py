@@ -6,8 +6,6 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QColor, QFont
 from PyQt6.QtCore import Qt
-from decimal import Decimal
-from datetime import datetime, timedelta
 import logging
 
 try:
@@ -19,7 +17,7 @@ except ImportError:
 
 
 from ui.theme import ThemeManager
-from ui.worker import run_in_thread
+from ui.dashboard_metrics import DashboardMetricsAggregator
 import database as db
 
 class ModernCard(QFrame):
@@ -57,9 +55,12 @@ class ModernDashboard(QWidget):
         self.printer_handler = printer_handler
 
         self.kpi_labels = {}
-        self._last_update_time = None  # Debounce para evitar múltiplas atualizações
-        self._pending_update = False
         self.setup_ui()
+
+        # Métricas mantidas em memória e atualizadas pelo evento de venda registrada
+        self.metrics = DashboardMetricsAggregator(self)
+        self.metrics.metrics_reset.connect(self._on_metrics_reset)
+        self.metrics.sale_applied.connect(self._on_sale_applied)
         self.update_dashboard_data() # Carga inicial
 
         # Conexões assíncronas para o status da balança
@@ -254,179 +255,141 @@ class ModernDashboard(QWidget):
         return widget
 
     def update_dashboard_data(self, cash_session=None):
-        """Inicia a atualização dos dados em background com debounce de 2s."""
-        from ui.worker import thread_manager
-        
-        # Debounce: evita múltiplas atualizações em menos de 2 segundos
-        now = datetime.now()
-        if self._last_update_time and (now - self._last_update_time).total_seconds() < 2:
-            logging.debug("Dashboard: Atualização ignorada (debounce de 2s)")
+        """
+        Informa a sessão de caixa atual ao agregador de métricas.
+        O banco só é consultado se a sessão ou o dia mudaram; as vendas chegam por evento.
+        """
+        self.metrics.set_cash_session(cash_session)
+        self.update_peripherals_status()
+
+    def redraw(self):
+        """Redesenha o dashboard a partir do estado em memória (ex: troca de tema)."""
+        self._on_metrics_reset(self.metrics.snapshot())
+
+    def _on_metrics_reset(self, data):
+        """Redesenha o dashboard inteiro após a carga/reconciliação (Main Thread)."""
+        if not data:
             return
-        
-        self._last_update_time = now
-        
-        # Função wrapper para ser executada
-        def fetch_data():
-            return self._fetch_dashboard_data(cash_session)
 
-        # Inicia worker
-        op_id = run_in_thread("update_dashboard", fetch_data)
-        
-        # Recupera o worker para conectar o sinal
-        if op_id in thread_manager.active_threads:
-            worker = thread_manager.active_threads[op_id]
-            worker.signals.finished.connect(self._on_dashboard_data_ready)
-
-    def _fetch_dashboard_data(self, cash_session=None):
-        """Busca os dados do banco (Executado em thread separada)."""
-        data = {}
         try:
-            # 1. KPIs
-            if cash_session:
-                num_sales, total_revenue = db.get_sales_summary_by_session(cash_session['id'])
-                avg_ticket = total_revenue / num_sales if num_sales > 0 else Decimal('0.00')
-                data['kpis'] = {
-                    'revenue': f"R$ {total_revenue:.2f}",
-                    'sales_count': str(num_sales),
-                    'avg_ticket': f"R$ {avg_ticket:.2f}"
-                }
-            else:
-                data['kpis'] = {
-                    'revenue': "R$ 0.00",
-                    'sales_count': "0",
-                    'avg_ticket': "R$ 0.00"
-                }
-
-            # 2. Sales by Hour
-            today_str = datetime.now().strftime('%Y-%m-%d')
-            sales_by_hour = db.get_sales_by_hour(today_str)
-            data['sales_by_hour'] = sales_by_hour
-
-            # 3. Sales by Category
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=7)
-            sales_by_category = db.get_sales_by_product_group(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-            data['sales_by_category'] = sales_by_category
+            self._render_kpis(data.get('kpis', {}))
+            self._render_sales_by_hour(data.get('sales_by_hour', []))
+            self._render_sales_by_category(data.get('sales_by_category', []))
+            self._render_latest_sales(data.get('latest_sales', []))
+            self.update_peripherals_status()
 
-            # 4. Latest Sales
-            latest_sales = db.get_latest_sales(limit=5)
-            data['latest_sales'] = latest_sales
+        except Exception as e:
+            logging.error(f"Erro ao atualizar UI do dashboard: {e}", exc_info=True)
 
-            return data
+    def _on_sale_applied(self, delta):
+        """Atualiza apenas as partes do dashboard afetadas por uma nova venda."""
+        try:
+            if delta['kpis_changed']:
+                self._render_kpis(self.metrics.kpis())
+            if delta['hour_changed']:
+                self._render_sales_by_hour(self.metrics.hourly())
+            if delta['categories_changed']:
+                self._render_sales_by_category(self.metrics.categories())
+            self._render_latest_sales(list(self.metrics.latest_sales))
 
         except Exception as e:
-            logging.error(f"Erro ao buscar dados do dashboard: {e}", exc_info=True)
-            return None
-
-    def _on_dashboard_data_ready(self, data):
-        """Atualiza a UI com os dados recebidos (Executado na Main Thread)."""
-        if not data:
-            return
+            logging.error(f"Erro ao aplicar venda no dashboard: {e}", exc_info=True)
+
+    def _render_kpis(self, kpis):
+        self.kpi_labels["revenue"].setText(kpis.get('revenue', 'R$ 0.00'))
+        self.kpi_labels["sales_count"].setText(kpis.get('sales_count', '0'))
+        self.kpi_labels["avg_ticket"].setText(kpis.get('avg_ticket', 'R$ 0.00'))
+
+    def _render_sales_by_hour(self, sales_data):
+        if self.bar_graph_item:  # Só atualiza se o gráfico existir
+            if sales_data:
+                hours = [item['hour'] for item in sales_data]
+                totals = [float(item['total']) for item in sales_data]
+                self.bar_graph_item.setOpts(x=hours, height=totals)
+            else:
+                self.bar_graph_item.setOpts(x=[], height=[])
 
-        try:
-            # 1. KPIs
-            kpis = data.get('kpis', {})
-            self.kpi_labels["revenue"].setText(kpis.get('revenue', 'R$ 0.00'))
-            self.kpi_labels["sales_count"].setText(kpis.get('sales_count', '0'))
-            self.kpi_labels["avg_ticket"].setText(kpis.get('avg_ticket', 'R$ 0.00'))
-
-            # 2. Sales by Hour
-            sales_data = data.get('sales_by_hour', [])
-            if self.bar_graph_item:  # Só atualiza se o gráfico existir
-                if sales_data:
-                    hours = [item['hour'] for item in sales_data]
-                    totals = [float(item['total']) for item in sales_data]
-                    self.bar_graph_item.setOpts(x=hours, height=totals)
-                else:
-                    self.bar_graph_item.setOpts(x=[], height=[])
-
-            # 3. Sales by Category (Lista de Progresso Refatorada)
-            sales_cat = data.get('sales_by_category', [])
-            tm = ThemeManager()
-            
-            # Limpa layout existente
-            while self.category_list_layout.count():
-                child = self.category_list_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
+    def _render_sales_by_category(self, sales_cat):
+        """Lista de progresso das vendas por categoria."""
+        tm = ThemeManager()
+        
+        # Limpa layout existente
+        while self.category_list_layout.count():
+            child = self.category_list_layout.takeAt(0)
+            if child.widget():
+                child.widget().deleteLater()
+        
+        if sales_cat:
+            total_revenue = sum(item['total'] for item in sales_cat)
+            base_colors = [
+                tm.get_color("PRIMARY"), tm.get_color("SECONDARY"), 
+                tm.get_color("SUCCESS"), tm.get_color("INFO"), 
+                tm.get_color("WARNING"), tm.get_color("ERROR")
+            ]
             
-            if sales_cat:
-                total_revenue = sum(item['total'] for item in sales_cat)
-                base_colors = [
-                    tm.get_color("PRIMARY"), tm.get_color("SECONDARY"), 
-                    tm.get_color("SUCCESS"), tm.get_color("INFO"), 
-                    tm.get_color("WARNING"), tm.get_color("ERROR")
-                ]
+            for i, item in enumerate(sales_cat):
+                percentage = (item['total'] / total_revenue * 100) if total_revenue > 0 else 0
+                color = base_colors[i % len(base_colors)]
                 
-                for i, item in enumerate(sales_cat):
-                    percentage = (item['total'] / total_revenue * 100) if total_revenue > 0 else 0
-                    color = base_colors[i % len(base_colors)]
-                    
-                    item_widget = QWidget()
-                    item_layout = QVBoxLayout(item_widget)
-                    item_layout.setContentsMargins(0, 0, 0, 0)
-                    item_layout.setSpacing(5)
-                    
-                    # Cabeçalho (Nome e Valor)
-                    header_layout = QHBoxLayout()
-                    name_label = QLabel(item['group_name'])
-                    name_label.setStyleSheet("font-weight: bold; font-size: 14px;")
-                    
-                    value_label = QLabel(f"R$ {item['total']:.2f} ({percentage:.1f}%)")
-                    value_label.setStyleSheet(f"color: {color}; font-weight: bold;")
-                    
-                    header_layout.addWidget(name_label)
-                    header_layout.addStretch()
-                    header_layout.addWidget(value_label)
-                    item_layout.addLayout(header_layout)
-                    
-                    # Barra de Progresso
-                    pbar = QProgressBar()
-                    pbar.setRange(0, 100)
-                    pbar.setValue(int(percentage))
-                    pbar.setTextVisible(False)
-                    pbar.setFixedHeight(8)
-                    pbar.setStyleSheet(f"""
-                        QProgressBar {{
-                            border: none;
-                            background-color: {tm.get_color('GRAY_LIGHTER')};
-                            border-radius: 4px;
-                        }}
-                        QProgressBar::chunk {{
-                            background-color: {color};
-                            border-radius: 4px;
-                        }}
-                    """)
-                    item_layout.addWidget(pbar)
-                    
-                    self.category_list_layout.addWidget(item_widget)
+                item_widget = QWidget()
+                item_layout = QVBoxLayout(item_widget)
+                item_layout.setContentsMargins(0, 0, 0, 0)
+                item_layout.setSpacing(5)
                 
-                self.category_list_layout.addStretch() # Empurra tudo pra cima
-            else:
-                empty_label = QLabel("Nenhuma venda registrada ainda.")
-                empty_label.setStyleSheet(f"color: {tm.get_color('GRAY')}; font-style: italic;")
-                empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.category_list_layout.addWidget(empty_label)
-
-            # 4. Latest Sales
-            latest = data.get('latest_sales', [])
-            self.latest_sales_table.setRowCount(0)
-            if latest:
-                self.latest_sales_table.setRowCount(len(latest))
-                for i, sale in enumerate(latest):
-                    time_cell = QTableWidgetItem(sale['sale_date'].strftime('%H:%M:%S'))
-                    user_cell = QTableWidgetItem(sale['username'])
-                    amount_cell = QTableWidgetItem(f"R$ {sale['total_amount']:.2f}")
-                    amount_cell.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-
-                    self.latest_sales_table.setItem(i, 0, time_cell)
-                    self.latest_sales_table.setItem(i, 1, user_cell)
-                    self.latest_sales_table.setItem(i, 2, amount_cell)
-
-            self.update_peripherals_status()
-
-        except Exception as e:
-            logging.error(f"Erro ao atualizar UI do dashboard: {e}", exc_info=True)
+                # Cabeçalho (Nome e Valor)
+                header_layout = QHBoxLayout()
+                name_label = QLabel(item['group_name'])
+                name_label.setStyleSheet("font-weight: bold; font-size: 14px;")
+                
+                value_label = QLabel(f"R$ {item['total']:.2f} ({percentage:.1f}%)")
+                value_label.setStyleSheet(f"color: {color}; font-weight: bold;")
+                
+                header_layout.addWidget(name_label)
+                header_layout.addStretch()
+                header_layout.addWidget(value_label)
+                item_layout.addLayout(header_layout)
+                
+                # Barra de Progresso
+                pbar = QProgressBar()
+                pbar.setRange(0, 100)
+                pbar.setValue(int(percentage))
+                pbar.setTextVisible(False)
+                pbar.setFixedHeight(8)
+                pbar.setStyleSheet(f"""
+                    QProgressBar {{
+                        border: none;
+                        background-color: {tm.get_color('GRAY_LIGHTER')};
+                        border-radius: 4px;
+                    }}
+                    QProgressBar::chunk {{
+                        background-color: {color};
+                        border-radius: 4px;
+                    }}
+                """)
+                item_layout.addWidget(pbar)
+                
+                self.category_list_layout.addWidget(item_widget)
+            
+            self.category_list_layout.addStretch() # Empurra tudo pra cima
+        else:
+            empty_label = QLabel("Nenhuma venda registrada ainda.")
+            empty_label.setStyleSheet(f"color: {tm.get_color('GRAY')}; font-style: italic;")
+            empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.category_list_layout.addWidget(empty_label)
+
+    def _render_latest_sales(self, latest):
+        self.latest_sales_table.setRowCount(0)
+        if latest:
+            self.latest_sales_table.setRowCount(len(latest))
+            for i, sale in enumerate(latest):
+                time_cell = QTableWidgetItem(sale['sale_date'].strftime('%H:%M:%S'))
+                user_cell = QTableWidgetItem(sale['username'])
+                amount_cell = QTableWidgetItem(f"R$ {sale['total_amount']:.2f}")
+                amount_cell.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+                self.latest_sales_table.setItem(i, 0, time_cell)
+                self.latest_sales_table.setItem(i, 1, user_cell)
+                self.latest_sales_table.setItem(i, 2, amount_cell)
 
     def update_peripherals_status(self):
         # Status da Impressora (a balança é atualizada por sinais)
@@ -0,0 +1,235 @@
+from PyQt6.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+from collections import deque
+from decimal import Decimal
+from datetime import datetime, timedelta
+import logging
+
+from ui.worker import EnhancedWorker
+import database as db
+
+# Intervalo da reconciliação periódica com o SQLite (corrige qualquer divergência
+# do estado em memória, ex: vendas canceladas ou registradas por outro processo)
+RECONCILE_INTERVAL_MS = 10 * 60 * 1000
+LATEST_SALES_LIMIT = 5
+CATEGORY_WINDOW_DAYS = 7
+
+
+class DashboardMetricsAggregator(QObject):
+    """
+    Mantém em memória as métricas do dashboard (KPIs da sessão, histograma por hora
+    do dia, vendas por categoria e últimas vendas), atualizadas pelo evento de
+    venda registrada.
+
+    O SQLite só é consultado na carga inicial, na reconciliação periódica e quando
+    a sessão de caixa ou o dia mudam.
+    """
+
+    # Estado completo, no formato consumido pelo dashboard
+    metrics_reset = pyqtSignal(dict)
+    # Delta de uma venda aplicada ao estado: {'sale', 'kpis_changed', 'hour_changed', 'categories_changed'}
+    sale_applied = pyqtSignal(dict)
+
+    # Usado para trazer o evento (que pode ser publicado em qualquer thread) para a thread do objeto
+    _sale_event_received = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cash_session_id = None
+        self.day = datetime.now().strftime('%Y-%m-%d')
+        self.session_count = 0
+        self.session_revenue = Decimal('0.00')
+        self.sales_by_hour = {}
+        self.sales_by_category = {}
+        self.latest_sales = deque(maxlen=LATEST_SALES_LIMIT)
+
+        self._loaded = False
+        self._reconciling = False
+        self._reconcile_requested = False
+        self._buffered_events = []
+
+        self._sale_event_received.connect(self._apply_sale_event)
+        db.subscribe_sale_registered(self._on_sale_registered)
+        self.destroyed.connect(lambda: db.unsubscribe_sale_registered(self._on_sale_registered))
+
+        self.reconcile_timer = QTimer(self)
+        self.reconcile_timer.timeout.connect(self.reconcile)
+        self.reconcile_timer.start(RECONCILE_INTERVAL_MS)
+
+    def stop(self):
+        """Interrompe a reconciliação e deixa de receber eventos de venda."""
+        self.reconcile_timer.stop()
+        db.unsubscribe_sale_registered(self._on_sale_registered)
+
+    def set_cash_session(self, cash_session):
+        """
+        Informa a sessão de caixa atual. Só recarrega do banco se ainda não houve
+        carga, se a sessão mudou ou se o dia virou.
+        """
+        session_id = cash_session['id'] if cash_session else None
+        today = datetime.now().strftime('%Y-%m-%d')
+        if not self._loaded or session_id != self.cash_session_id or today != self.day:
+            self.cash_session_id = session_id
+            self.reconcile()
+
+    # --- Reconciliação com o banco ---
+
+    def reconcile(self):
+        """Recarrega todo o estado a partir do SQLite em background."""
+        if self._reconciling:
+            self._reconcile_requested = True
+            return
+
+        self._reconciling = True
+        self._buffered_events = []
+        cash_session_id = self.cash_session_id
+
+        worker = EnhancedWorker(self._load_snapshot, cash_session_id)
+        worker.signals.finished.connect(self._on_snapshot_loaded)
+        worker.signals.error.connect(self._on_snapshot_error)
+        QThreadPool.globalInstance().start(worker)
+
+    @staticmethod
+    def _load_snapshot(cash_session_id):
+        """Busca o estado completo do banco (executado em thread separada)."""
+        try:
+            now = datetime.now()
+            today = now.strftime('%Y-%m-%d')
+            # Lido antes das demais consultas: eventos com ID maior que este,
+            # recebidos durante a carga, são reaplicados ao final
+            last_sale_id = db.get_last_sale_id()
+
+            if cash_session_id:
+                session_count, session_revenue = db.get_sales_summary_by_session(cash_session_id)
+            else:
+                session_count, session_revenue = 0, Decimal('0.00')
+
+            start_date = now - timedelta(days=CATEGORY_WINDOW_DAYS)
+            return {
+                'cash_session_id': cash_session_id,
+                'day': today,
+                'last_sale_id': last_sale_id,
+                'session_count': session_count,
+                'session_revenue': session_revenue,
+                'sales_by_hour': db.get_sales_by_hour(today),
+                'sales_by_category': db.get_sales_by_product_group(start_date.strftime('%Y-%m-%d'), today),
+                'latest_sales': db.get_latest_sales(limit=LATEST_SALES_LIMIT),
+            }
+        except Exception as e:
+            logging.error(f"Erro ao carregar métricas do dashboard: {e}", exc_info=True)
+            return None
+
+    def _on_snapshot_loaded(self, snapshot):
+        self._reconciling = False
+        buffered, self._buffered_events = self._buffered_events, []
+
+        if snapshot and snapshot['cash_session_id'] == self.cash_session_id:
+            self.day = snapshot['day']
+            self.session_count = snapshot['session_count']
+            self.session_revenue = snapshot['session_revenue']
+            self.sales_by_hour = {item['hour']: item['total'] for item in snapshot['sales_by_hour']}
+            self.sales_by_category = {item['group_name']: item['total'] for item in snapshot['sales_by_category']}
+            self.latest_sales = deque(snapshot['latest_sales'], maxlen=LATEST_SALES_LIMIT)
+            self._loaded = True
+
+            for event in buffered:
+                if event['sale_id'] > snapshot['last_sale_id']:
+                    self._apply_to_state(event)
+
+            self.metrics_reset.emit(self.snapshot())
+        elif snapshot:
+            # A sessão mudou durante a carga; o resultado já está desatualizado
+            self._reconcile_requested = True
+
+        if self._reconcile_requested:
+            self._reconcile_requested = False
+            self.reconcile()
+
+    def _on_snapshot_error(self, error):
+        self._reconciling = False
+        logging.error(f"Erro na reconciliação das métricas do dashboard: {error[1] if len(error) > 1 else error}")
+
+    # --- Eventos de venda ---
+
+    def _on_sale_registered(self, event):
+        # Pode ser chamado fora da thread principal: o sinal enfileira o evento
+        self._sale_event_received.emit(event)
+
+    def _apply_sale_event(self, event):
+        if event.get('training_mode'):
+            return
+        if self._reconciling:
+            self._buffered_events.append(event)
+            return
+        if not self._loaded:
+            return
+
+        if not event['sale_date'].startswith(self.day):
+            # Primeira venda de um novo dia: o histograma e a janela de categorias mudam
+            self.reconcile()
+            return
+
+        delta = self._apply_to_state(event)
+        self.sale_applied.emit(delta)
+
+    def _apply_to_state(self, event):
+        """Aplica uma venda ao estado em memória e retorna o que mudou."""
+        total = Decimal(event['total_amount'])
+        sale_date = datetime.strptime(event['sale_date'], '%Y-%m-%d %H:%M:%S')
+
+        kpis_changed = bool(self.cash_session_id) and event.get('cash_session_id') == self.cash_session_id
+        if kpis_changed:
+            self.session_count += 1
+            self.session_revenue += total
+
+        hour_changed = event['sale_date'].startswith(self.day)
+        if hour_changed:
+            self.sales_by_hour[sale_date.hour] = self.sales_by_hour.get(sale_date.hour, Decimal('0.00')) + total
+
+        categories_changed = False
+        for item in event.get('items', []):
+            if item.get('group_name'):
+                self.sales_by_category[item['group_name']] = (
+                    self.sales_by_category.get(item['group_name'], Decimal('0.00')) + Decimal(item['total_price'])
+                )
+                categories_changed = True
+
+        sale = {
+            'id': event['sale_id'],
+            'sale_date': sale_date,
+            'total_amount': total,
+            'username': event.get('username') or 'N/A'
+        }
+        self.latest_sales.appendleft(sale)
+
+        return {
+            'sale': sale,
+            'kpis_changed': kpis_changed,
+            'hour_changed': hour_changed,
+            'categories_changed': categories_changed
+        }
+
+    # --- Leitura do estado ---
+
+    def kpis(self):
+        avg_ticket = self.session_revenue / self.session_count if self.session_count > 0 else Decimal('0.00')
+        return {
+            'revenue': f"R$ {self.session_revenue:.2f}",
+            'sales_count': str(self.session_count),
+            'avg_ticket': f"R$ {avg_ticket:.2f}"
+        }
+
+    def hourly(self):
+        return [{'hour': hour, 'total': total} for hour, total in sorted(self.sales_by_hour.items())]
+
+    def categories(self):
+        ordered = sorted(self.sales_by_category.items(), key=lambda item: item[1], reverse=True)
+        return [{'group_name': name, 'total': total} for name, total in ordered if total > 0]
+
+    def snapshot(self):
+        """Estado completo no formato usado pelo dashboard."""
+        return {
+            'kpis': self.kpis(),
+            'sales_by_hour': self.hourly(),
+            'sales_by_category': self.categories(),
+            'latest_sales': list(self.latest_sales)
+        }
@@ -30,6 +30,7 @@ from ui.log_console_dialog import LogConsoleDialog
 from hardware.scale_handler import ScaleHandler
 from hardware.printer_handler import PrinterHandler
 from data.sync_manager import SyncManager
+from data.sync_service import SyncService
 from ui.worker import run_in_thread
 import database as db
 import logging
@@ -67,6 +68,9 @@ class ModernMainWindow(QMainWindow):
             self.config.get('printer', {})
         )
         self.sync_manager = SyncManager()
+        # Envio contínuo das alterações locais (outbox) para o Supabase
+        self.sync_service = SyncService(self.sync_manager)
+        self.sync_service.start()
 
         # Integração com WhatsApp para notificações
         try:
@@ -416,7 +420,10 @@ class ModernMainWindow(QMainWindow):
             self.pages["dashboard"].update_dashboard_data(self.current_cash_session)
     
     def update_data(self):
-        """Atualiza dados do dashboard"""
+        """
+        Mantém o dashboard ciente da sessão de caixa atual. As métricas de vendas
+        chegam por evento; o banco só é consultado se a sessão ou o dia mudarem.
+        """
         if "dashboard" in self.pages:
             self.pages["dashboard"].update_dashboard_data(self.current_cash_session)
 
@@ -440,7 +447,7 @@ class ModernMainWindow(QMainWindow):
         
         # Atualiza componentes que precisam de atualização manual (ex: gráficos)
         if "dashboard" in self.pages:
-            self.pages["dashboard"].update_dashboard_data(self.current_cash_session)
+            self.pages["dashboard"].redraw()
         
         self.update_status_bar()
         logging.info(f"Tema alterado para: {new_theme}")
@@ -453,6 +460,7 @@ class ModernMainWindow(QMainWindow):
         """Garante que os handlers de hardware sejam parados corretamente ao fechar."""
         logging.info("Fechando a janela principal. Parando handlers.")
         self.scale_handler.stop()
+        self.sync_service.stop()
         super().closeEvent(event)
 
     def keyPressEvent(self, event):
@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 import database as db
+from integrations.whatsapp_sales_notifications import invalidate_sales_notifier_cache
 
 class PaymentMethodManagementWidget(QWidget):
     def __init__(self):
@@ -76,6 +77,7 @@ class PaymentMethodManagementWidget(QWidget):
             success, message = db.add_payment_method(name)
         
         if success:
+            invalidate_sales_notifier_cache()
             QMessageBox.information(self, "Sucesso", "Forma de pagamento salva com sucesso.")
             self.load_payment_methods()
         else:
@@ -93,6 +95,7 @@ class PaymentMethodManagementWidget(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             success, message = db.delete_payment_method(self.current_method_id)
             if success:
+                invalidate_sales_notifier_cache()
                 QMessageBox.information(self, "Sucesso", "Forma de pagamento excluída com sucesso.")
                 self.load_payment_methods()
             else:
@@ -1,16 +1,19 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
     QTableWidgetItem, QHeaderView, QGroupBox, QGridLayout, QDateEdit, QTabWidget,
-    QFileDialog, QMessageBox, QDialog, QTextEdit, QDialogButtonBox, QLineEdit
+    QFileDialog, QMessageBox, QDialog, QTextEdit, QDialogButtonBox, QLineEdit,
+    QInputDialog, QProgressDialog, QComboBox
 )
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import Qt, QDate, QThreadPool
 from PyQt6.QtGui import QFont
 import database as db
 import csv
+import os
+import threading
 from datetime import datetime, timedelta
 from decimal import Decimal
 from utils import format_currency
-from .worker import Worker
+from .worker import Worker, EnhancedWorker
 
 class ReportsPage(QWidget):
     """Página para visualização de relatórios."""
@@ -18,6 +21,7 @@ class ReportsPage(QWidget):
     def __init__(self):
         super().__init__()
         self.current_report_data = None  # Armazena os dados do último relatório gerado
+        self.full_export_worker = None  # Worker da exportação completa em andamento
         self.setup_ui()
 
     def setup_ui(self):
@@ -38,11 +42,13 @@ class ReportsPage(QWidget):
         stock_tab = self.create_stock_report_tab()
         cash_history_tab = self.create_cash_history_tab()
         credit_tab = self.create_credit_report_tab() # Nova aba
+        comparative_tab = self.create_comparative_report_tab()
 
         tab_widget.addTab(sales_tab, "Vendas")
         tab_widget.addTab(credit_tab, "Crédito") # Adicionada
         tab_widget.addTab(stock_tab, "Estoque")
         tab_widget.addTab(cash_history_tab, "Histórico de Caixa")
+        tab_widget.addTab(comparative_tab, "Comparativo")
 
         # Conecta o sinal de mudança de aba
         tab_widget.currentChanged.connect(self.on_tab_changed)
@@ -54,7 +60,7 @@ class ReportsPage(QWidget):
 
     def on_tab_changed(self, index):
         """Chamado quando o usuário muda de aba."""
-        # 0: Vendas, 1: Crédito, 2: Estoque, 3: Histórico de Caixa
+        # 0: Vendas, 1: Crédito, 2: Estoque, 3: Histórico de Caixa, 4: Comparativo
         if index == 3: # Aba de Histórico de Caixa
             self.generate_cash_history_report()
 
@@ -84,6 +90,9 @@ class ReportsPage(QWidget):
         export_button = QPushButton("Exportar para CSV")
         export_button.clicked.connect(self.export_report_to_csv)
 
+        self.full_export_button = QPushButton("Exportar Dados Completos")
+        self.full_export_button.setToolTip("Exporta todas as vendas, itens ou pagamentos do período (CSV/XLSX)")
+        self.full_export_button.clicked.connect(self.export_full_dataset)
 
         filter_layout.addWidget(QLabel("De:"))
         filter_layout.addWidget(self.start_date_edit)
@@ -95,6 +104,7 @@ class ReportsPage(QWidget):
         filter_layout.addWidget(month_button)
         filter_layout.addWidget(generate_button)
         filter_layout.addWidget(export_button)
+        filter_layout.addWidget(self.full_export_button)
         layout.addWidget(filter_group)
 
         # Conexões dos botões de filtro
@@ -196,6 +206,68 @@ class ReportsPage(QWidget):
 
         return widget
 
+    def create_comparative_report_tab(self):
+        """Cria a aba de comparação de um período com uma base (semana, mês, ano...)."""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setSpacing(20)
+
+        filter_group = QGroupBox("Período e Base de Comparação")
+        filter_layout = QHBoxLayout(filter_group)
+
+        self.comp_start_date_edit = QDateEdit(calendarPopup=True)
+        self.comp_start_date_edit.setDisplayFormat("dd/MM/yyyy")
+        self.comp_start_date_edit.setDate(QDate.currentDate())
+        self.comp_end_date_edit = QDateEdit(calendarPopup=True)
+        self.comp_end_date_edit.setDisplayFormat("dd/MM/yyyy")
+        self.comp_end_date_edit.setDate(QDate.currentDate())
+
+        self.comp_baseline_combo = QComboBox()
+        for key, label in db.COMPARISON_BASELINES.items():
+            self.comp_baseline_combo.addItem(label, userData=key)
+
+        self.comp_generate_button = QPushButton("Comparar")
+        self.comp_generate_button.setObjectName("modern_button_primary")
+        self.comp_generate_button.clicked.connect(self.generate_comparative_report)
+
+        filter_layout.addWidget(QLabel("De:"))
+        filter_layout.addWidget(self.comp_start_date_edit)
+        filter_layout.addWidget(QLabel("Até:"))
+        filter_layout.addWidget(self.comp_end_date_edit)
+        filter_layout.addWidget(QLabel("Comparar com:"))
+        filter_layout.addWidget(self.comp_baseline_combo)
+        filter_layout.addStretch()
+        filter_layout.addWidget(self.comp_generate_button)
+        layout.addWidget(filter_group)
+
+        self.comp_baseline_label = QLabel("")
+        layout.addWidget(self.comp_baseline_label)
+
+        details_layout = QHBoxLayout()
+
+        metrics_group = QGroupBox("Indicadores")
+        metrics_layout = QVBoxLayout(metrics_group)
+        self.comp_metrics_table = QTableWidget()
+        self.comp_metrics_table.setColumnCount(4)
+        self.comp_metrics_table.setHorizontalHeaderLabels(["Indicador", "Período", "Base", "Variação"])
+        self.comp_metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.comp_metrics_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        metrics_layout.addWidget(self.comp_metrics_table)
+        details_layout.addWidget(metrics_group)
+
+        hourly_group = QGroupBox("Faturamento por Hora")
+        hourly_layout = QVBoxLayout(hourly_group)
+        self.comp_hourly_table = QTableWidget()
+        self.comp_hourly_table.setColumnCount(4)
+        self.comp_hourly_table.setHorizontalHeaderLabels(["Hora", "Período", "Base", "Variação"])
+        self.comp_hourly_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.comp_hourly_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        hourly_layout.addWidget(self.comp_hourly_table)
+        details_layout.addWidget(hourly_group)
+
+        layout.addLayout(details_layout)
+        return widget
+
     def create_credit_report_tab(self):
         """Cria a aba principal para todos os relatórios de crédito."""
         widget = QWidget()
@@ -583,6 +655,80 @@ class ReportsPage(QWidget):
             self.products_table.setItem(row, 1, QTableWidgetItem(str(item['quantity_sold'])))
             self.products_table.setItem(row, 2, QTableWidgetItem(f"R$ {item['revenue']:.2f}"))
 
+    def generate_comparative_report(self):
+        """Gera o relatório comparativo em background."""
+        start_date = self.comp_start_date_edit.date().toString("yyyy-MM-dd")
+        end_date = self.comp_end_date_edit.date().toString("yyyy-MM-dd")
+        baseline = self.comp_baseline_combo.currentData()
+
+        self.comp_generate_button.setEnabled(False)
+        self.comp_generate_button.setText("Comparando...")
+
+        worker = Worker(db.get_comparative_report, start_date, end_date, baseline)
+        worker.signals.finished.connect(self.on_comparative_report_ready)
+        worker.signals.error.connect(self.on_report_error)
+        worker.signals.finished.connect(self.on_comparative_report_finished)
+        worker.signals.error.connect(self.on_comparative_report_finished)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_comparative_report_ready(self, report):
+        """Slot chamado quando o relatório comparativo está pronto."""
+        current = report['current']
+        base = report['baseline_metrics']
+        variation = report['variation']
+
+        periods = ", ".join(
+            f"{datetime.strptime(s, '%Y-%m-%d').strftime('%d/%m/%Y')}" if s == e else
+            f"{datetime.strptime(s, '%Y-%m-%d').strftime('%d/%m/%Y')} a {datetime.strptime(e, '%Y-%m-%d').strftime('%d/%m/%Y')}"
+            for s, e in report['baseline_periods']
+        )
+        self.comp_baseline_label.setText(f"<b>Base:</b> {report['baseline_label']} ({periods})")
+
+        rows = [
+            ("Faturamento", format_currency(current['revenue']), format_currency(base['revenue']), variation['revenue']),
+            ("Vendas", str(current['sales_count']), str(base['sales_count']), variation['sales_count']),
+            ("Ticket Médio", format_currency(current['average_ticket']), format_currency(base['average_ticket']), variation['average_ticket']),
+            ("Itens por Venda", f"{current['items_per_sale']:.2f}", f"{base['items_per_sale']:.2f}", variation['items_per_sale']),
+            ("Peso Vendido (kg)", f"{current['weight_kg']:.3f}", f"{base['weight_kg']:.3f}", variation['weight_kg']),
+        ]
+        self.comp_metrics_table.setRowCount(0)
+        for row, (label, current_value, base_value, change) in enumerate(rows):
+            self.comp_metrics_table.insertRow(row)
+            self.comp_metrics_table.setItem(row, 0, QTableWidgetItem(label))
+            self.comp_metrics_table.setItem(row, 1, QTableWidgetItem(current_value))
+            self.comp_metrics_table.setItem(row, 2, QTableWidgetItem(base_value))
+            self.comp_metrics_table.setItem(row, 3, self._variation_item(change))
+
+        # Curva por hora: apenas as horas com movimento em algum dos períodos
+        self.comp_hourly_table.setRowCount(0)
+        for hour in range(24):
+            current_value, base_value = current['hourly'][hour], base['hourly'][hour]
+            if not current_value and not base_value:
+                continue
+            change = float((current_value - base_value) / base_value * 100) if base_value else None
+            row = self.comp_hourly_table.rowCount()
+            self.comp_hourly_table.insertRow(row)
+            self.comp_hourly_table.setItem(row, 0, QTableWidgetItem(f"{hour:02d}h"))
+            self.comp_hourly_table.setItem(row, 1, QTableWidgetItem(format_currency(current_value)))
+            self.comp_hourly_table.setItem(row, 2, QTableWidgetItem(format_currency(base_value)))
+            self.comp_hourly_table.setItem(row, 3, self._variation_item(change))
+
+    def _variation_item(self, change):
+        """Célula de variação percentual colorida (verde para alta, vermelho para queda)."""
+        if change is None:
+            return QTableWidgetItem("—")
+        item = QTableWidgetItem(f"{change:+.1f}%")
+        if change > 0:
+            item.setForeground(Qt.GlobalColor.darkGreen)
+        elif change < 0:
+            item.setForeground(Qt.GlobalColor.red)
+        return item
+
+    def on_comparative_report_finished(self, *args):
+        """Reabilita o botão do relatório comparativo."""
+        self.comp_generate_button.setEnabled(True)
+        self.comp_generate_button.setText("Comparar")
+
     def on_report_error(self, error_info):
         """Slot chamado quando há erro na geração do relatório."""
         error, traceback_str = error_info
@@ -671,3 +817,73 @@ class ReportsPage(QWidget):
                 QMessageBox.information(self, "Sucesso", f"Relatório exportado com sucesso para:\n{fileName}")
             except Exception as e:
                 QMessageBox.critical(self, "Erro ao Exportar", f"Ocorreu um erro ao salvar o arquivo CSV:\n{e}")
+
+    def export_full_dataset(self):
+        """
+        Exporta um conjunto de dados completo do período (vendas, itens ou pagamentos)
+        direto do banco para o disco, em background, com progresso e cancelamento.
+        """
+        if self.full_export_worker is not None:
+            QMessageBox.information(self, "Exportação em andamento", "Aguarde a exportação atual terminar.")
+            return
+
+        labels = [definition['label'] for definition in db.EXPORT_DATASETS.values()]
+        label, ok = QInputDialog.getItem(self, "Exportar Dados Completos", "Conjunto de dados:", labels, 0, False)
+        if not ok:
+            return
+        dataset = next(key for key, definition in db.EXPORT_DATASETS.items() if definition['label'] == label)
+
+        start_date = self.start_date_edit.date().toString("yyyy-MM-dd")
+        end_date = self.end_date_edit.date().toString("yyyy-MM-dd")
+
+        file_filter = "Arquivos CSV (*.csv)"
+        if db.OPENPYXL_AVAILABLE:
+            file_filter += ";;Planilhas Excel (*.xlsx)"
+        default_filename = f"{dataset}_{start_date}_a_{end_date}.csv"
+        fileName, selected_filter = QFileDialog.getSaveFileName(self, f"Exportar {label}", default_filename, file_filter)
+        if not fileName:
+            return
+        if selected_filter.startswith("Planilhas") and not fileName.lower().endswith('.xlsx'):
+            fileName = f"{os.path.splitext(fileName)[0]}.xlsx"
+
+        cancel_event = threading.Event()
+        progress_dialog = QProgressDialog(f"Exportando {label.lower()}...", "Cancelar", 0, 100, self)
+        progress_dialog.setWindowTitle("Exportar Dados Completos")
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setValue(0)
+
+        worker = EnhancedWorker(db.export_dataset, dataset, start_date, end_date, fileName,
+                                cancel_event=cancel_event)
+        worker.kwargs['progress_callback'] = worker.update_progress
+
+        def on_progress(value, message):
+            progress_dialog.setValue(value)
+            progress_dialog.setLabelText(message)
+
+        def on_cancel():
+            cancel_event.set()
+            worker.cancel()
+
+        worker.signals.progress.connect(on_progress)
+        worker.signals.finished.connect(lambda result: self.on_full_export_finished(result, progress_dialog))
+        worker.signals.cancelled.connect(lambda: self.on_full_export_finished({'cancelled': True}, progress_dialog))
+        worker.signals.error.connect(lambda error_info: self.on_full_export_finished({'error': str(error_info[0])}, progress_dialog))
+        progress_dialog.canceled.connect(on_cancel)
+
+        self.full_export_worker = worker
+        self.full_export_button.setEnabled(False)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_full_export_finished(self, result, progress_dialog):
+        """Slot chamado quando a exportação completa termina (sucesso, erro ou cancelamento)."""
+        self.full_export_worker = None
+        self.full_export_button.setEnabled(True)
+        progress_dialog.close()
+
+        if result.get('cancelled'):
+            QMessageBox.information(self, "Exportação Cancelada", "A exportação foi cancelada. Nenhum arquivo foi gravado.")
+        elif result.get('error'):
+            QMessageBox.critical(self, "Erro ao Exportar", f"Ocorreu um erro ao exportar os dados:\n{result['error']}")
+        else:
+            QMessageBox.information(self, "Sucesso", f"{result['rows']} linhas exportadas com sucesso para:\n{result['file_path']}")
@@ -4,17 +4,49 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QDate, Qt, QThreadPool
 import database as db
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from .worker import Worker
 import logging
 
+class SaleItemsCache:
+    """Cache LRU dos itens de venda, indexado pelo ID global da venda."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, sale_id):
+        items = self._entries.get(sale_id)
+        if items is not None:
+            self._entries.move_to_end(sale_id)
+        return items
+
+    def __contains__(self, sale_id):
+        return sale_id in self._entries
+
+    def update(self, items_by_sale):
+        for sale_id, items in items_by_sale.items():
+            self._entries[sale_id] = items
+            self._entries.move_to_end(sale_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
 class SalesHistoryPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.threadpool = QThreadPool()
-        # Estado da paginação
+        # Estado da paginação (por cursor sobre (sale_date, id))
         self.current_page = 0
         self.page_limit = 100
+        self.current_period = None
+        self.page_cursors = [None]  # page_cursors[i] = cursor para carregar a página i
+        self._prefetched_pages = {}  # (período, cursor) -> resultado já carregado em background
+        self._request_id = 0
+        # Itens das vendas: carregados em lote por página e mantidos em LRU
+        self.items_cache = SaleItemsCache()
+        self._items_loading = set()
+        self.neighbour_prefetch = 10  # vendas vizinhas carregadas junto em caso de cache miss
         self.setup_ui()
         self.load_today_sales()
 
@@ -113,14 +145,14 @@ class SalesHistoryPage(QWidget):
 
     def apply_date_filter(self):
         # Reseta para a primeira página quando aplicar novo filtro
-        self.current_page = 0
+        self.reset_pagination()
         start_date = self.start_date_edit.selectedDate().toString("yyyy-MM-dd")
         end_date = self.end_date_edit.selectedDate().toString("yyyy-MM-dd")
         self.load_sales_history(start_date, end_date)
 
     def load_today_sales(self):
         # Reseta para a primeira página quando carregar dados de hoje
-        self.current_page = 0
+        self.reset_pagination()
         today = datetime.now().strftime("%Y-%m-%d")
         self.start_date_edit.setSelectedDate(QDate.currentDate())
         self.end_date_edit.setSelectedDate(QDate.currentDate())
@@ -137,6 +169,7 @@ class SalesHistoryPage(QWidget):
             self.load_today_sales()
 
     def load_yesterday_sales(self):
+        self.reset_pagination()
         yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
         qdate_yesterday = QDate.fromString(yesterday, "yyyy-MM-dd")
         self.start_date_edit.setSelectedDate(qdate_yesterday)
@@ -144,6 +177,7 @@ class SalesHistoryPage(QWidget):
         self.load_sales_history(yesterday, yesterday)
     
     def load_this_month_sales(self):
+        self.reset_pagination()
         today = datetime.now()
         start_of_month = today.replace(day=1).strftime("%Y-%m-%d")
         end_of_month = today.strftime("%Y-%m-%d")
@@ -151,32 +185,87 @@ class SalesHistoryPage(QWidget):
         self.end_date_edit.setSelectedDate(QDate.fromString(end_of_month, "yyyy-MM-dd"))
         self.load_sales_history(start_of_month, end_of_month)
 
+    def reset_pagination(self):
+        """Volta para a primeira página e descarta cursores e páginas pré-carregadas."""
+        self.current_period = None
+        self.current_page = 0
+        self.page_cursors = [None]
+        self._prefetched_pages.clear()
+
     def load_sales_history(self, start_date, end_date):
+        period = (start_date, end_date)
+        if period != self.current_period:
+            self.reset_pagination()
+            self.current_period = period
+
+        page_cursor = self.page_cursors[self.current_page]
+        self._request_id += 1
+        request_id = self._request_id
+
+        # Página já pré-carregada em background: exibe imediatamente
+        prefetched = self._prefetched_pages.pop((period, page_cursor), None)
+        if prefetched is not None:
+            self._on_sales_page_loaded(prefetched, request_id)
+            return
+
         self.sales_table.setRowCount(0)
         self.sale_details_table.setRowCount(0)
         self.show_message_in_table(self.sales_table, "Carregando histórico...")
-        worker = Worker(db.get_sales_with_payment_methods_by_period, start_date, end_date, self.page_limit, self.current_page * self.page_limit)
-        worker.signals.finished.connect(self.populate_sales_table)
+        worker = Worker(db.get_sales_with_payment_methods_by_period, start_date, end_date, self.page_limit, after=page_cursor)
+        worker.signals.finished.connect(lambda result: self._on_sales_page_loaded(result, request_id))
         worker.signals.error.connect(lambda err: logging.error(f"Erro ao carregar histórico de vendas: {err}"))
         self.threadpool.start(worker)
 
+    def _on_sales_page_loaded(self, result, request_id):
+        # Ignora respostas de requisições já substituídas por outra navegação
+        if request_id != self._request_id:
+            return
+
+        self.populate_sales_table(result)
+        self.load_items_for_sales([sale['id'] for sale in result.get('sales', [])] if isinstance(result, dict) else [])
+
+        next_cursor = result.get('next_cursor') if isinstance(result, dict) else None
+        if next_cursor:
+            del self.page_cursors[self.current_page + 1:]
+            self.page_cursors.append(next_cursor)
+            self.prefetch_page(self.current_period, next_cursor)
+
+    def prefetch_page(self, period, page_cursor):
+        """Carrega a próxima página em background para que 'Próximo' seja instantâneo."""
+        key = (period, page_cursor)
+        if key in self._prefetched_pages:
+            return
+
+        def store(result):
+            if self.current_period == period:
+                self._prefetched_pages[key] = result
+                self.load_items_for_sales([sale['id'] for sale in result.get('sales', [])])
+
+        worker = Worker(db.get_sales_with_payment_methods_by_period, period[0], period[1], self.page_limit, after=page_cursor)
+        worker.signals.finished.connect(store)
+        worker.signals.error.connect(lambda err: logging.debug(f"Falha ao pré-carregar página do histórico: {err}"))
+        self.threadpool.start(worker)
+
     def populate_sales_table(self, result):
         self.sales_table.setRowCount(0)
+        self.sale_details_table.setRowCount(0)
 
         # Verifica se o resultado é um dicionário (novo formato) ou lista (compatibilidade)
         if isinstance(result, dict):
             sales = result.get('sales', [])
             total_count = result.get('total_count', 0)
+            has_next = result.get('has_next', False)
         else:
             # Compatibilidade com código antigo
             sales = result
             total_count = len(sales) if sales else 0
+            has_next = False
 
         if not sales:
             self.show_message_in_table(self.sales_table, "Nenhuma venda encontrada para o período")
             self.total_sales_label.setText("<b>Total de Vendas:</b> R$ 0.00")
             self.num_sales_label.setText("<b>Nº de Vendas:</b> 0")
-            self.update_pagination_controls(0)
+            self.update_pagination_controls(0, False)
             return
 
         total_value = 0
@@ -192,39 +281,80 @@ class SalesHistoryPage(QWidget):
             self.sales_table.setItem(row, 1, QTableWidgetItem(sale['sale_date']))
             self.sales_table.setItem(row, 2, QTableWidgetItem(sale.get('customer_name') or '--'))
             self.sales_table.setItem(row, 3, QTableWidgetItem(f"{sale['total_amount']:.2f}"))
-            payment_text = sale.get('payment_methods_str', 'N/A')
+            payment_text = sale.get('payment_methods_str') or 'N/A'
             self.sales_table.setItem(row, 4, QTableWidgetItem(payment_text))
             self.sales_table.setItem(row, 5, QTableWidgetItem(sale['username'] or 'N/A'))
             total_value += sale['total_amount']
 
+        # Total do período (vem dos rollups diários); cai para a soma da página se ausente
+        if isinstance(result, dict) and result.get('total_amount') is not None:
+            total_value = result['total_amount']
+
         self.total_sales_label.setText(f"<b>Total de Vendas:</b> R$ {total_value:.2f}")
         self.num_sales_label.setText(f"<b>Nº de Vendas:</b> {total_count}")
-        self.update_pagination_controls(total_count)
+        self.update_pagination_controls(total_count, has_next)
 
-    def display_sale_items(self):
-        selected_rows = self.sales_table.selectionModel().selectedRows()
-        self.sale_details_table.setRowCount(0)
-        if not selected_rows:
+    def load_items_for_sales(self, sale_ids):
+        """Busca em uma única consulta os itens das vendas que ainda não estão no cache."""
+        missing = [sale_id for sale_id in sale_ids
+                   if sale_id not in self.items_cache and sale_id not in self._items_loading]
+        if not missing:
             return
 
-        selected_row = selected_rows[0].row()
-        item = self.sales_table.item(selected_row, 0)
+        self._items_loading.update(missing)
+        worker = Worker(db.get_items_for_sales, missing)
+        worker.signals.finished.connect(self._on_items_loaded)
+        worker.signals.error.connect(lambda err, ids=missing: self._on_items_error(ids, err))
+        self.threadpool.start(worker)
+
+    def _on_items_loaded(self, items_by_sale):
+        self._items_loading.difference_update(items_by_sale.keys())
+        self.items_cache.update(items_by_sale)
+
+        # Se a venda selecionada estava aguardando este lote, exibe agora
+        selected_sale_id = self._selected_sale_id()
+        if selected_sale_id in items_by_sale:
+            self.populate_items_table(items_by_sale[selected_sale_id])
 
+    def _on_items_error(self, sale_ids, err):
+        self._items_loading.difference_update(sale_ids)
+        logging.error(f"Erro ao buscar itens da venda: {err}")
+
+    def _selected_sale_id(self):
+        selected_rows = self.sales_table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        item = self.sales_table.item(selected_rows[0].row(), 0)
         # Pega o ID global da venda, que foi armazenado no item da tabela
-        sale_id = item.data(Qt.ItemDataRole.UserRole) if item else None
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
 
+    def display_sale_items(self):
+        self.sale_details_table.setRowCount(0)
+        sale_id = self._selected_sale_id()
         if not sale_id:
             return
 
-        try:
-            self.show_message_in_table(self.sale_details_table, "Carregando itens...")
-            worker = Worker(db.get_items_for_sale, sale_id)
-            worker.signals.finished.connect(self.populate_items_table)
-            worker.signals.error.connect(lambda err: logging.error(f"Erro ao buscar itens da venda: {err}"))
-            self.threadpool.start(worker)
-        except ValueError:
+        items = self.items_cache.get(sale_id)
+        if items is not None:
+            self.populate_items_table(items)
             return
 
+        self.show_message_in_table(self.sale_details_table, "Carregando itens...")
+        if sale_id in self._items_loading:
+            return  # O lote que contém esta venda já está a caminho
+
+        # Cache miss: busca a venda selecionada junto com as vizinhas visíveis
+        selected_row = self.sales_table.selectionModel().selectedRows()[0].row()
+        first_row = max(0, selected_row - self.neighbour_prefetch)
+        last_row = min(self.sales_table.rowCount() - 1, selected_row + self.neighbour_prefetch)
+        neighbour_ids = [sale_id]
+        for row in range(first_row, last_row + 1):
+            item = self.sales_table.item(row, 0)
+            neighbour_id = item.data(Qt.ItemDataRole.UserRole) if item else None
+            if neighbour_id and neighbour_id != sale_id:
+                neighbour_ids.append(neighbour_id)
+        self.load_items_for_sales(neighbour_ids)
+
     def populate_items_table(self, items):
         self.sale_details_table.setRowCount(0)
         if not items:
@@ -249,23 +379,20 @@ class SalesHistoryPage(QWidget):
         table.setSpan(0, 0, 1, table.columnCount())
 
     def prev_page(self):
-        if self.current_page > 0:
+        if self.current_page > 0 and self.current_period:
             self.current_page -= 1
-            start_date = self.start_date_edit.selectedDate().toString("yyyy-MM-dd")
-            end_date = self.end_date_edit.selectedDate().toString("yyyy-MM-dd")
-            self.load_sales_history(start_date, end_date)
+            self.load_sales_history(*self.current_period)
 
     def next_page(self):
-        self.current_page += 1
-        start_date = self.start_date_edit.selectedDate().toString("yyyy-MM-dd")
-        end_date = self.end_date_edit.selectedDate().toString("yyyy-MM-dd")
-        self.load_sales_history(start_date, end_date)
+        if self.current_period and self.current_page + 1 < len(self.page_cursors):
+            self.current_page += 1
+            self.load_sales_history(*self.current_period)
 
-    def update_pagination_controls(self, total_count):
+    def update_pagination_controls(self, total_count, has_next=False):
         total_pages = (total_count + self.page_limit - 1) // self.page_limit
         if total_pages == 0:
             total_pages = 1
 
         self.page_label.setText(f"Página {self.current_page + 1} de {total_pages}")
         self.prev_button.setEnabled(self.current_page > 0)
-        self.next_button.setEnabled(self.current_page < total_pages - 1)
+        self.next_button.setEnabled(has_next)
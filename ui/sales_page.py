@@ -501,10 +501,10 @@ class SalesPage(QWidget):
             try:
                 from integrations.whatsapp_sales_notifications import get_whatsapp_sales_notifier
                 sales_notifier = get_whatsapp_sales_notifier()
-                # A função `notify_sale` espera `payment_details` e `change_amount` separadamente
+                # Só enfileira: a notificação é montada e enviada pela thread do notificador
                 payment_details = sale_data.get('payments', [])
                 change = sale_data.get('change_amount', 0.0)
-                sales_notifier.notify_sale(sale_data, payment_details, float(change))
+                sales_notifier.enqueue_sale(sale_data, payment_details, float(change))
             except Exception as e:
                 logging.warning(f"Erro ao enviar notificação de venda via WhatsApp: {e}")
 
@@ -608,6 +608,9 @@ class SalesPage(QWidget):
                 conn.commit()
                 logging.info(f"Transação de venda a crédito concluída com sucesso. SaleID: {sale_id}, CreditID: {credit_sale_id}")
 
+                # A venda usou a transação externa: o evento só é publicado após o commit
+                db.publish_sale_registered(sale_data.get('event'))
+
                 # Post-transaction actions (Notifications, UI updates)
                 try:
                     # Log audit (Best effort, own connection)
@@ -625,7 +628,7 @@ class SalesPage(QWidget):
                 try:
                     from integrations.whatsapp_sales_notifications import get_whatsapp_sales_notifier
                     notifier = get_whatsapp_sales_notifier()
-                    notifier.notify_credit_created(credit_sale_id)
+                    notifier.enqueue_credit_created(credit_sale_id)
                 except Exception as e:
                     logging.warning(f"Erro ao enviar notificação de fiado criado via WhatsApp: {e}")
 
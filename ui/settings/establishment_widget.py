@@ -54,4 +54,6 @@ class EstablishmentWidget(QWidget):
             "cnpj": self.store_cnpj_input.text(),
         }
         self.config_manager.update_section('store', store_data)
+        from integrations.whatsapp_sales_notifications import invalidate_sales_notifier_cache
+        invalidate_sales_notifier_cache()  # nome da loja nas notificações
         QMessageBox.information(self, "Sucesso", "Informações do estabelecimento salvas!")
@@ -5,17 +5,38 @@ from PyQt6.QtWidgets import (
     QLineEdit,
     QPushButton,
     QMessageBox,
-    QGroupBox
+    QGroupBox,
+    QCheckBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView
 )
 from PyQt6.QtCore import Qt
 from config_manager import ConfigManager
+import database as db
 
 class SupabaseWidget(QWidget):
+    # Colunas da tabela de métricas por tabela: (título, chave)
+    METRICS_COLUMNS = [
+        ("Tabela", 'table_name'),
+        ("Enviadas", 'rows_up'),
+        ("Recebidas", 'rows_down'),
+        ("Req.", 'requests'),
+        ("p95 (ms)", 'latency_p95_ms'),
+        ("Rede (ms)", 'network_ms'),
+        ("Montagem (ms)", 'build_ms'),
+        ("Banco (ms)", 'db_ms'),
+        ("Erros", 'errors'),
+        ("Pendentes", 'backlog'),
+    ]
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.config_manager = ConfigManager()
         self.setup_ui()
         self.load_config_to_ui()
+        self.load_metrics()
 
     def setup_ui(self):
         layout = QGridLayout(self)
@@ -34,6 +55,23 @@ class SupabaseWidget(QWidget):
         group_layout.addWidget(QLabel("Chave de Acesso (public-anon):"), 1, 0)
         group_layout.addWidget(self.supabase_key_input, 1, 1)
 
+        self.gzip_uploads_checkbox = QCheckBox("Compactar envios grandes (gzip)")
+        self.gzip_uploads_checkbox.setToolTip("Ative apenas se o servidor aceitar requisições compactadas (Content-Encoding: gzip).")
+        group_layout.addWidget(self.gzip_uploads_checkbox, 2, 1)
+
+        # Identidade do terminal (lojas com mais de um caixa sincronizando o mesmo catálogo)
+        self.terminal_id_input = QLineEdit()
+        self.terminal_id_input.setToolTip("Identificador único deste caixa (ex: caixa1). Gravado nas sessões de caixa e vendas.")
+        group_layout.addWidget(QLabel("ID do Terminal:"), 3, 0)
+        group_layout.addWidget(self.terminal_id_input, 3, 1)
+
+        self.store_mode_checkbox = QCheckBox("Modo loja (vários terminais)")
+        self.store_mode_checkbox.setToolTip(
+            "Envia o ID do terminal e baixa apenas as sessões de caixa e vendas deste terminal.\n"
+            "Requer a coluna terminal_id nas tabelas cash_sessions, sales e sale_items do Supabase."
+        )
+        group_layout.addWidget(self.store_mode_checkbox, 4, 1)
+
         group_box.setLayout(group_layout)
         layout.addWidget(group_box, 0, 0, 1, 2)
 
@@ -41,15 +79,83 @@ class SupabaseWidget(QWidget):
         save_button.clicked.connect(self.save_config)
         layout.addWidget(save_button, 1, 0, 1, 2)
 
+        # Telemetria da última sincronização (tabela sync_metrics)
+        metrics_box = QGroupBox("Métricas da Última Sincronização")
+        metrics_layout = QGridLayout()
+
+        self.metrics_summary_label = QLabel()
+        self.metrics_summary_label.setWordWrap(True)
+        metrics_layout.addWidget(self.metrics_summary_label, 0, 0, 1, 2)
+
+        self.metrics_table = QTableWidget(0, len(self.METRICS_COLUMNS))
+        self.metrics_table.setHorizontalHeaderLabels([label for label, _ in self.METRICS_COLUMNS])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.metrics_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.metrics_table.verticalHeader().setVisible(False)
+        metrics_layout.addWidget(self.metrics_table, 1, 0, 1, 2)
+
+        refresh_metrics_button = QPushButton("Atualizar Métricas")
+        refresh_metrics_button.clicked.connect(self.load_metrics)
+        metrics_layout.addWidget(refresh_metrics_button, 2, 1)
+
+        metrics_box.setLayout(metrics_layout)
+        layout.addWidget(metrics_box, 2, 0, 1, 2)
+
     def load_config_to_ui(self):
         supabase_config = self.config_manager.get_section('supabase')
         self.supabase_url_input.setText(supabase_config.get('url', ''))
         self.supabase_key_input.setText(supabase_config.get('key', ''))
+        self.gzip_uploads_checkbox.setChecked(bool(supabase_config.get('gzip_uploads', False)))
+
+        terminal_config = db.get_terminal_config()
+        self.terminal_id_input.setText(terminal_config.get('id', ''))
+        self.store_mode_checkbox.setChecked(bool(terminal_config.get('store_mode', False)))
 
     def save_config(self):
-        supabase_data = {
+        supabase_data = dict(self.config_manager.get_section('supabase'))
+        supabase_data.update({
             "url": self.supabase_url_input.text(),
             "key": self.supabase_key_input.text(),
-        }
+            "gzip_uploads": self.gzip_uploads_checkbox.isChecked(),
+        })
         self.config_manager.update_section('supabase', supabase_data)
+
+        terminal_data = dict(self.config_manager.get_section('terminal'))
+        terminal_id = self.terminal_id_input.text().strip()
+        if terminal_id:
+            terminal_data['id'] = terminal_id
+        terminal_data['store_mode'] = self.store_mode_checkbox.isChecked()
+        self.config_manager.update_section('terminal', terminal_data)
+        db.reload_terminal_config()
+
         QMessageBox.information(self, "Sucesso", "Configurações do Supabase salvas com sucesso!")
+
+    def load_metrics(self):
+        """Mostra os totais e as métricas por tabela da última sincronização."""
+        runs = db.get_sync_metrics_runs(limit=1)
+        if not runs:
+            self.metrics_summary_label.setText("Nenhuma sincronização registrada ainda.")
+            self.metrics_table.setRowCount(0)
+            return
+
+        run = runs[0]
+        kind = "Sincronização completa" if run['kind'] == 'full' else "Envio automático"
+        local_ms = run['build_ms'] + run['db_ms']
+        latency = (f"p50 {run['latency_p50_ms']} ms / p95 {run['latency_p95_ms']} ms"
+                   if run['latency_p50_ms'] is not None else "sem requisições")
+        self.metrics_summary_label.setText(
+            f"<b>{kind}</b> em {run['started_at']} — {run['duration_ms']} ms<br>"
+            f"Linhas: {run['rows_up']} enviadas, {run['rows_down']} recebidas "
+            f"({run['bytes_up'] / 1024:.1f} KB / {run['bytes_down'] / 1024:.1f} KB)<br>"
+            f"Latência HTTP: {latency} — retentativas: {run['retries']}, erros: {run['errors']}<br>"
+            f"Tempo local: {local_ms} ms (montagem {run['build_ms']} ms, banco {run['db_ms']} ms) — "
+            f"rede: {run['network_ms']} ms<br>"
+            f"Pendências restantes: {run['backlog']}"
+        )
+
+        tables = db.get_sync_metrics_tables(run['run_id'])
+        self.metrics_table.setRowCount(len(tables))
+        for row_index, table in enumerate(tables):
+            for column_index, (_, key) in enumerate(self.METRICS_COLUMNS):
+                value = table.get(key)
+                self.metrics_table.setItem(row_index, column_index, QTableWidgetItem("-" if value is None else str(value)))
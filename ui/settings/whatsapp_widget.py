@@ -460,6 +460,8 @@ class WhatsAppWidget(QWidget):
             wa_config = get_whatsapp_config()
             wa_config.set('advanced.GROUP_NOTIFICATION_ID', group_id)
             wa_config.save_config()
+            from integrations.whatsapp_sales_notifications import invalidate_sales_notifier_cache
+            invalidate_sales_notifier_cache()
             QMessageBox.information(self, "Sucesso", "ID do Grupo para notificações salvo com sucesso!")
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Não foi possível salvar o ID do Grupo.\n\nErro: {e}")
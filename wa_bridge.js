@@ -178,6 +178,75 @@ function safeLog(obj) {
 
     startSock();
 
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    // message_ids de destinatários de broadcast já enviados (ou em envio) por este
+    // processo: um broadcast reenviado pelo PDV (prazo de confirmação esgotado) não
+    // manda a mensagem de novo para eles. Guarda só os mais recentes.
+    const BROADCAST_HANDLED_MAX = 5000;
+    const broadcastHandled = new Set();
+
+    function markBroadcastHandled(message_id) {
+        broadcastHandled.add(message_id);
+        if (broadcastHandled.size > BROADCAST_HANDLED_MAX) {
+            broadcastHandled.delete(broadcastHandled.values().next().value);
+        }
+    }
+
+    // Envia um texto e retorna o resultado no formato 'message_result'
+    async function sendText(recipientId, text, message_id) {
+        let response = {
+            type: 'message_result',
+            message_id: message_id,
+            success: false,
+            error: null,
+            phone: recipientId,
+            phone_validation_attempted: false,
+            phone_exists: false
+        };
+
+        try {
+            // Verificar se sock está conectado antes de tentar enviar
+            if (!sock || !sock.user || !sock.user.id) {
+                response.error = 'WhatsApp não está conectado. Aguarde a conexão.';
+                response.retryable = true; // o PDV mantém a mensagem na fila até conectar
+                return response;
+            }
+
+            // Se for um ID de grupo ou LID, envie diretamente sem verificar.
+            if (recipientId.endsWith('@g.us') || recipientId.endsWith('@lid')) {
+                await sock.sendMessage(recipientId, { text });
+                response.success = true;
+                return response;
+            }
+
+            // Se não for um grupo, é um usuário. Prossiga com a validação.
+            const jid = recipientId.endsWith('@s.whatsapp.net') ? recipientId : recipientId.replace(/[^\d]/g, '') + '@s.whatsapp.net';
+
+            const [result] = await sock.onWhatsApp(jid);
+            if (!result?.exists) {
+                response.phone_validation_attempted = true;
+                response.phone_exists = false;
+                response.error = `O número ${recipientId} não existe no WhatsApp.`;
+                return response;
+            }
+
+            response.phone_validation_attempted = true;
+            response.phone_exists = true;
+
+            // Use o JID retornado pela verificação, pois ele pode ser corrigido pelo servidor
+            const correctJid = result.jid;
+            await sock.sendMessage(correctJid, { text });
+            response.success = true;
+
+        } catch (e) {
+            response.error = 'Falha ao enviar mensagem: ' + (e?.message || e.toString());
+        }
+        return response;
+    }
+
     // Leitura de comandos via STDIN (NDJSON)
     const readline = require('readline');
     const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
@@ -196,61 +265,85 @@ function safeLog(obj) {
         if (msg.action === 'send') {
             const recipientId = msg.phone || '';
             const text = msg.message || '';
-            const message_id = msg.message_id || null;
 
             if (!recipientId || !text) return;
 
+            safeLog(await sendText(recipientId, text, msg.message_id || null));
+            return;
+        }
+
+        if (msg.action === 'broadcast') {
+            // Uma mensagem para vários destinatários. Os envios são compassados aqui:
+            // 'concurrency' envios simultâneos, um novo envio a cada 'interval_ms' (no total)
+            // mais um atraso aleatório de até 'jitter_ms'. Cada destinatário é confirmado
+            // assim que termina ('broadcast_progress'), para o PDV não reenviar a ele se o
+            // broadcast voltar para a fila; ao fim vem o resumo ('broadcast_result').
+            const recipients = Array.isArray(msg.recipients) ? msg.recipients : [];
+            const text = msg.message || '';
+            const concurrency = Math.max(1, parseInt(msg.concurrency, 10) || 1);
+            const intervalMs = Math.max(0, parseInt(msg.interval_ms, 10) || 0);
+            const jitterMs = Math.max(0, parseInt(msg.jitter_ms, 10) || 0);
+
             let response = {
-                type: 'message_result',
-                message_id: message_id,
+                type: 'broadcast_result',
+                message_id: msg.message_id || null,
                 success: false,
                 error: null,
-                phone: recipientId,
-                phone_validation_attempted: false,
-                phone_exists: false
+                delivered: 0,
+                failed: 0,
+                pending: 0,
+                skipped: 0
             };
 
-            try {
-                // Verificar se sock está conectado antes de tentar enviar
-                if (!sock || !sock.user || !sock.user.id) {
-                    response.error = 'WhatsApp não está conectado. Aguarde a conexão.';
-                    safeLog(response);
-                    return;
-                }
-
-                // Se for um ID de grupo ou LID, envie diretamente sem verificar.
-                if (recipientId.endsWith('@g.us') || recipientId.endsWith('@lid')) {
-                    await sock.sendMessage(recipientId, { text });
-                    response.success = true;
-                    safeLog(response);
-                    return;
-                }
+            if (!recipients.length || !text) {
+                response.error = 'Broadcast sem destinatários ou sem mensagem.';
+                safeLog(response);
+                return;
+            }
 
-                // Se não for um grupo, é um usuário. Prossiga com a validação.
-                const jid = recipientId.endsWith('@s.whatsapp.net') ? recipientId : recipientId.replace(/[^\d]/g, '') + '@s.whatsapp.net';
+            if (!sock || !sock.user || !sock.user.id) {
+                response.error = 'WhatsApp não está conectado. Aguarde a conexão.';
+                response.retryable = true; // o PDV mantém o broadcast na fila até conectar
+                response.pending = recipients.length;
+                safeLog(response);
+                return;
+            }
 
-                const [result] = await sock.onWhatsApp(jid);
-                if (!result?.exists) {
-                    response.phone_validation_attempted = true;
-                    response.phone_exists = false;
-                    response.error = `O número ${recipientId} não existe no WhatsApp.`;
-                    safeLog(response);
-                    return;
+            // Destinatários já enviados (ou em envio) por este processo ficam de fora
+            const queue = recipients.filter(r => !(r && r.message_id && broadcastHandled.has(r.message_id)));
+            response.skipped = recipients.length - queue.length;
+            queue.forEach(r => { if (r && r.message_id) markBroadcastHandled(r.message_id); });
+
+            let next = 0;
+            const worker = async () => {
+                while (next < queue.length) {
+                    const recipient = queue[next++] || {};
+                    const result = await sendText(recipient.phone || '', text, recipient.message_id || null);
+                    if (result.retryable) {
+                        // Desconectou no meio do broadcast: fica para o reenvio
+                        broadcastHandled.delete(recipient.message_id);
+                        response.pending++;
+                        response.error = result.error;
+                        continue;
+                    }
+                    if (result.success) {
+                        response.delivered++;
+                    } else {
+                        response.failed++;
+                    }
+                    safeLog({ ...result, type: 'broadcast_progress', broadcast_id: response.message_id });
+                    if (next < queue.length) {
+                        await sleep(intervalMs * concurrency + Math.random() * jitterMs);
+                    }
                 }
+            };
+            await Promise.all(Array.from({ length: Math.min(concurrency, queue.length) }, worker));
 
-                response.phone_validation_attempted = true;
-                response.phone_exists = true;
-
-                // Use o JID retornado pela verificação, pois ele pode ser corrigido pelo servidor
-                const correctJid = result.jid;
-                await sock.sendMessage(correctJid, { text });
-                response.success = true;
-                safeLog(response);
-
-            } catch (e) {
-                response.error = 'Falha ao enviar mensagem: ' + (e?.message || e.toString());
-                safeLog(response);
+            response.success = response.delivered > 0;
+            if (response.pending) {
+                response.retryable = true;
             }
+            safeLog(response);
             return;
         }
 
@@ -276,6 +369,7 @@ function safeLog(obj) {
                 // Verificar se sock está conectado antes de tentar enviar
                 if (!sock || !sock.user || !sock.user.id) {
                     response.error = 'WhatsApp não está conectado. Aguarde a conexão.';
+                    response.retryable = true; // o PDV mantém a mensagem na fila até conectar
                     safeLog(response);
                     return;
                 }